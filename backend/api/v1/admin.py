@@ -28,6 +28,16 @@ def get_metrics(user_id, role):
     except Exception as e:
         return error_response(f'Failed to retrieve metrics: {str(e)}', 500)
 
+@admin_bp.route('/metrics/engine', methods=['GET'])
+@admin_required
+def get_engine_metrics(user_id, role):
+    """Get per-method engine metrics"""
+    try:
+        metrics = performance_monitor.get_engine_metrics()
+        return success_response(metrics, 'Engine metrics retrieved successfully')
+    except Exception as e:
+        return error_response(f'Failed to retrieve engine metrics: {str(e)}', 500)
+
 @admin_bp.route('/metrics/reset', methods=['POST'])
 @admin_required
 def reset_metrics(user_id, role):
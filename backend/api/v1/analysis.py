@@ -14,8 +14,9 @@ from engine.stegnox_engine import StegnoxEngine
 from storage.storage_service import StorageService
 from ...auth.auth import token_required
 from ...utils.response import success_response, error_response
-from ...utils.file_utils import save_uploaded_file
+from ...utils.file_utils import read_uploaded_file, save_uploaded_file
 from ...utils.cache import cached
+from ...utils.performance import performance_monitor
 from ...utils.rate_limit import rate_limit
 
 # Create blueprint
@@ -29,10 +30,16 @@ storage_service = None
 def before_request():
     """Initialize services before each request"""
     global engine, storage_service
-    if engine is None:
-        engine = StegnoxEngine()
     if storage_service is None:
-        storage_service = StorageService(storage_dir=current_app.config['STORAGE_DIR'])
+        storage_service = StorageService(storage_dir=current_app.config['STORAGE_DIR'],
+                                         pixel_cache_size=current_app.config.get('PIXEL_CACHE_SIZE', 0))
+    if engine is None:
+        engine = StegnoxEngine(
+            pixel_cache=storage_service.pixel_cache,
+            result_cache=storage_service.result_cache,
+            profile=current_app.config.get('ENGINE_PROFILING', False),
+            metrics_sink=performance_monitor.record_engine_metric
+        )
 
 @analysis_bp.route('/analyze', methods=['POST'])
 @token_required
@@ -47,37 +54,34 @@ def analyze_image(user_id, role):
     if file.filename == '':
         return error_response('No selected file', 400)
 
-    # Save file
-    filepath = save_uploaded_file(file)
-    if not filepath:
+    # Read the upload into memory; it is decoded straight from this buffer
+    data, filename = read_uploaded_file(file)
+    if data is None:
         return error_response('Invalid file', 400)
 
     # Get methods from request
     methods = request.form.get('methods', 'all')
 
+    # Memory tracing slows every request in the process while it runs, so only
+    # admins may ask for it, per request
+    options = {}
+    if role == 'admin' and request.form.get('trace_memory', 'false').lower() == 'true':
+        options = {'profile': True, 'trace_memory': True}
+
     try:
         # Analyze image
         if methods == 'all':
-            results = engine.extract_all_methods(filepath)
+            results = engine.extract_all_methods(data, **options)
         else:
             # Parse methods
-            method_list = methods.split(',')
-            results = {}
-
-            for method_name in method_list:
-                method_name = method_name.strip()
-                method = getattr(engine, method_name, None)
-
-                if method and callable(method):
-                    results[method_name] = method(filepath)
-                else:
-                    results[method_name] = {'error': f'Method {method_name} not found'}
+            method_list = [method_name.strip() for method_name in methods.split(',')]
+            results = engine.extract_all_methods(data, methods=method_list, **options)
 
         # Save results
         storage_service.save_results(None, results)
 
         # Save image to storage
-        storage_service.save_image(filepath)
+        storage_service.save_image(data, filename)
 
         return success_response(results, 'Analysis completed successfully')
 
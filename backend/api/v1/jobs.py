@@ -29,7 +29,8 @@ def before_request():
     if job_queue is None:
         job_queue = JobQueue(storage_dir=current_app.config['QUEUE_DIR'])
     if storage_service is None:
-        storage_service = StorageService(storage_dir=current_app.config['STORAGE_DIR'])
+        storage_service = StorageService(storage_dir=current_app.config['STORAGE_DIR'],
+                                         pixel_cache_size=current_app.config.get('PIXEL_CACHE_SIZE', 0))
 
 @jobs_bp.route('', methods=['POST'])
 @token_required
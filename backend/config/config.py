@@ -51,6 +51,8 @@ class Config:
     PERFORMANCE_MONITORING_ENABLED = True
     LOG_SLOW_REQUESTS = True
     SLOW_REQUEST_THRESHOLD = 1.0  # seconds
+    ENGINE_PROFILING = os.environ.get('ENGINE_PROFILING', 'false').lower() == 'true'  # Per-method engine timings, without memory tracing
+    PIXEL_CACHE_SIZE = int(os.environ.get('PIXEL_CACHE_SIZE', 0))  # Decoded image cache in bytes; 0 disables it
 
     # Ensure directories exist
     @classmethod
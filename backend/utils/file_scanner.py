@@ -8,6 +8,7 @@ import logging
 import magic
 import re
 import imghdr
+from io import BytesIO
 from PIL import Image
 from flask import current_app
 
@@ -98,6 +99,47 @@ class FileScanner:
             self.logger.error(f"Error scanning file {file_path}: {str(e)}")
             return False, f"Error scanning file: {str(e)}"
 
+    def scan_bytes(self, data, filename):
+        """
+        Scan an in-memory file for security issues
+
+        Args:
+            data (bytes): File contents
+            filename (str): Original filename, used for the extension check
+
+        Returns:
+            tuple: (is_safe, message)
+        """
+        try:
+            # Check file size
+            file_size = len(data)
+            if file_size > self.max_file_size:
+                return False, f"File size exceeds maximum allowed size ({file_size} > {self.max_file_size})"
+
+            # Check file extension
+            _, ext = os.path.splitext(filename)
+            if ext.lower() not in self.allowed_extensions:
+                return False, f"File extension {ext} not allowed"
+
+            # Check MIME type
+            mime_type = self._get_buffer_mime_type(data, ext)
+            if mime_type not in self.allowed_mime_types:
+                return False, f"File type {mime_type} not allowed"
+
+            # Verify image integrity
+            if not self._verify_image_data(data):
+                return False, "Invalid image file"
+
+            # Log scan result
+            file_hash = hashlib.sha256(data).hexdigest()
+            self.logger.info(f"Upload scan passed: {filename} (size: {file_size}, type: {mime_type}, hash: {file_hash})")
+
+            return True, "File passed security scan"
+
+        except Exception as e:
+            self.logger.error(f"Error scanning upload {filename}: {str(e)}")
+            return False, f"Error scanning file: {str(e)}"
+
     def _get_mime_type(self, file_path):
         """
         Get the MIME type of a file
@@ -131,6 +173,36 @@ class FileScanner:
 
             return mime_map.get(ext, 'application/octet-stream')
 
+    def _get_buffer_mime_type(self, data, ext):
+        """
+        Get the MIME type of in-memory file contents
+
+        Args:
+            data (bytes): File contents
+            ext (str): File extension, used as a last resort
+
+        Returns:
+            str: MIME type
+        """
+        try:
+            # Try using python-magic if available
+            return magic.from_buffer(data, mime=True)
+        except (ImportError, AttributeError):
+            # Fallback to imghdr for image type detection
+            img_type = imghdr.what(None, h=data)
+            if img_type:
+                return f"image/{img_type}"
+
+            mime_map = {
+                'jpg': 'image/jpeg',
+                'jpeg': 'image/jpeg',
+                'png': 'image/png',
+                'gif': 'image/gif',
+                'bmp': 'image/bmp'
+            }
+
+            return mime_map.get(ext.lower().lstrip('.'), 'application/octet-stream')
+
     def _verify_image(self, file_path):
         """
         Verify that a file is a valid image
@@ -156,6 +228,28 @@ class FileScanner:
             self.logger.warning(f"Image verification failed for {file_path}: {str(e)}")
             return False
 
+    def _verify_image_data(self, data):
+        """
+        Verify that in-memory file contents are a valid image
+
+        Args:
+            data (bytes): File contents
+
+        Returns:
+            bool: True if valid image, False otherwise
+        """
+        try:
+            with Image.open(BytesIO(data)) as img:
+                img.verify()
+
+            with Image.open(BytesIO(data)) as img:
+                img.size
+
+            return True
+        except Exception as e:
+            self.logger.warning(f"Image verification failed for upload: {str(e)}")
+            return False
+
     def _calculate_hash(self, file_path):
         """
         Calculate SHA-256 hash of a file
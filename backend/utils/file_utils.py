@@ -68,6 +68,40 @@ def save_uploaded_file(file, custom_filename=None):
 
     return None
 
+def read_uploaded_file(file):
+    """
+    Read an uploaded file into memory without writing it to disk
+
+    Args:
+        file: File object from request.files
+
+    Returns:
+        tuple: (data, filename) with the file contents and a generated unique filename,
+            or (None, None) if the file is invalid
+    """
+    logger = logging.getLogger('stegnox.file_utils')
+
+    if file and allowed_file(file.filename):
+        try:
+            data = file.stream.read()
+            original_ext = file.filename.rsplit('.', 1)[1].lower()
+            filename = f"{uuid.uuid4()}.{original_ext}"
+
+            # Scan the contents for security issues
+            is_safe, message = file_scanner.scan_bytes(data, filename)
+
+            if not is_safe:
+                logger.warning(f"File security scan failed: {message}")
+                return None, None
+
+            logger.info(f"Upload read and passed security scan: {filename}")
+            return data, filename
+
+        except Exception as e:
+            logger.error(f"Error reading uploaded file: {str(e)}")
+
+    return None, None
+
 def get_file_extension(filename):
     """
     Get the extension of a file
@@ -24,6 +24,7 @@ class PerformanceMonitor:
         self.app = app
         self.logger = logging.getLogger('stegnox.performance')
         self.metrics = {}
+        self.engine_metrics = {}
         self.lock = threading.RLock()
         
         # Initialize default settings
@@ -31,6 +32,7 @@ class PerformanceMonitor:
         self.log_slow_requests = True
         self.slow_request_threshold = 1.0  # seconds
         self.metrics_file = None
+        self.engine_metrics_file = None
         
         if app is not None:
             self.init_app(app)
@@ -53,6 +55,7 @@ class PerformanceMonitor:
         metrics_dir = app.config.get('METRICS_DIR', os.path.join(app.config['STORAGE_DIR'], 'metrics'))
         os.makedirs(metrics_dir, exist_ok=True)
         self.metrics_file = os.path.join(metrics_dir, 'performance_metrics.json')
+        self.engine_metrics_file = os.path.join(metrics_dir, 'engine_metrics.json')
         
         # Load existing metrics
         self._load_metrics()
@@ -141,17 +144,63 @@ class PerformanceMonitor:
                 self.metrics[path]['status_codes'][status_key] = 0
             self.metrics[path]['status_codes'][status_key] += 1
     
-    def _load_metrics(self):
-        """Load metrics from file"""
-        if not self.metrics_file or not os.path.exists(self.metrics_file):
+    def record_engine_metric(self, method, profile):
+        """
+        Record the profile of one engine method run
+        
+        The monitor can be passed to StegnoxEngine as its metrics_sink.
+        
+        Args:
+            method (str): Analysis method name
+            profile (dict): Method profile with wall_time, cpu_time, pixels and peak_memory
+        """
+        if not self.enabled:
             return
         
-        try:
-            with open(self.metrics_file, 'r') as f:
-                self.metrics = json.load(f)
-            self.logger.info(f"Loaded performance metrics from {self.metrics_file}")
-        except Exception as e:
-            self.logger.error(f"Error loading metrics: {str(e)}")
+        with self.lock:
+            # Initialize metrics for this method if not exists
+            if method not in self.engine_metrics:
+                self.engine_metrics[method] = {
+                    'count': 0,
+                    'total_time': 0,
+                    'avg_time': 0,
+                    'min_time': float('inf'),
+                    'max_time': 0,
+                    'total_cpu_time': 0,
+                    'total_pixels': 0,
+                    'pixels_per_second': None,
+                    'max_peak_memory': None,
+                    'last_run': None
+                }
+            
+            # Update method metrics
+            metrics = self.engine_metrics[method]
+            duration = profile['wall_time']
+            metrics['count'] += 1
+            metrics['total_time'] += duration
+            metrics['avg_time'] = metrics['total_time'] / metrics['count']
+            metrics['min_time'] = min(metrics['min_time'], duration)
+            metrics['max_time'] = max(metrics['max_time'], duration)
+            metrics['total_cpu_time'] += profile['cpu_time']
+            metrics['total_pixels'] += profile['pixels'] or 0
+            if metrics['total_time'] > 0:
+                metrics['pixels_per_second'] = metrics['total_pixels'] / metrics['total_time']
+            if profile['peak_memory'] is not None:
+                metrics['max_peak_memory'] = max(metrics['max_peak_memory'] or 0, profile['peak_memory'])
+            metrics['last_run'] = datetime.now().isoformat()
+    
+    def _load_metrics(self):
+        """Load metrics from file"""
+        for path, attribute in ((self.metrics_file, 'metrics'), (self.engine_metrics_file, 'engine_metrics')):
+            if not path or not os.path.exists(path):
+                continue
+            
+            try:
+                with open(path, 'r') as f:
+                    setattr(self, attribute, json.load(f))
+                self.logger.info(f"Loaded performance metrics from {path}")
+            except Exception as e:
+                self.logger.error(f"Error loading metrics: {str(e)}")
     
     def _save_metrics(self):
         """Save metrics to file"""
@@ -162,6 +211,9 @@ class PerformanceMonitor:
             with self.lock:
                 with open(self.metrics_file, 'w') as f:
                     json.dump(self.metrics, f, indent=2)
+                if self.engine_metrics_file:
+                    with open(self.engine_metrics_file, 'w') as f:
+                        json.dump(self.engine_metrics, f, indent=2)
             self.logger.info(f"Saved performance metrics to {self.metrics_file}")
         except Exception as e:
             self.logger.error(f"Error saving metrics: {str(e)}")
@@ -199,10 +251,21 @@ class PerformanceMonitor:
         with self.lock:
             return self.metrics.get(path)
     
+    def get_engine_metrics(self):
+        """
+        Get the per-method engine metrics
+        
+        Returns:
+            dict: Metrics keyed by analysis method name
+        """
+        with self.lock:
+            return {method: metrics.copy() for method, metrics in self.engine_metrics.items()}
+    
     def reset_metrics(self):
         """Reset all metrics"""
         with self.lock:
             self.metrics = {}
+            self.engine_metrics = {}
             self._save_metrics()
 
 # Create a global monitor instance
@@ -0,0 +1,151 @@
+"""
+Cascade analysis benchmark
+
+Times extract_all_methods with and without cascade mode on a synthetic,
+mostly clean corpus, and reports how many clean images skipped the gated
+stages, how many stego images still reached them, and how many short
+messages hidden in natural-looking images each mode missed.
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+import cv2
+import numpy as np
+from PIL import Image
+
+# Add parent directory to path to allow imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from engine.stegnox_engine import StegnoxEngine
+
+
+def clean_image(rng, size, kind):
+    """Generate a clean synthetic image: flat graphics, posterized gradient or smooth texture"""
+    if kind == 0:
+        pixels = np.full((size, size, 3), rng.integers(0, 256, 3), dtype=np.uint8)
+        for _ in range(8):
+            x, y = rng.integers(0, size, 2)
+            color = tuple(int(value) for value in rng.integers(0, 256, 3))
+            cv2.rectangle(pixels, (int(x), int(y)), (int(x) + size // 4, int(y) + size // 5), color, -1)
+        return pixels
+    if kind == 1:
+        y, x = np.mgrid[0:size, 0:size]
+        gradient = np.stack([x * 255 // size, y * 255 // size, (x + y) * 255 // (2 * size)], axis=-1)
+        return (gradient // 16 * 16).astype(np.uint8)
+    return texture(rng, size)
+
+
+def texture(rng, size):
+    """Generate a smooth noise texture"""
+    noise = rng.integers(0, 256, size=(size, size, 3), dtype=np.uint8)
+    return cv2.GaussianBlur(noise, (0, 0), 8)
+
+
+def stego_image(rng, size):
+    """Generate a noisy full-range gradient whose LSBs carry a random (encrypted-looking) payload"""
+    y, x = np.mgrid[0:size, 0:size]
+    gradient = np.stack([x * 255 / size, y * 255 / size, (x + y) * 255 / (2 * size)], axis=-1)
+    pixels = np.clip(gradient + rng.normal(0, 10, gradient.shape), 0, 255).astype(np.uint8)
+    return (pixels & 0xFE) | rng.integers(0, 2, size=pixels.shape, dtype=np.uint8)
+
+
+def photo(rng, size):
+    """Generate a photo-like image: gradient, low-frequency texture and sensor noise"""
+    y, x = np.mgrid[0:size, 0:size]
+    gradient = np.stack([x * 255 / size, y * 255 / size, (x + y) * 255 / (2 * size)], axis=-1)
+    detail = cv2.resize(rng.normal(0, 40, (size // 16, size // 16, 3)), (size, size),
+                        interpolation=cv2.INTER_CUBIC)
+    return np.clip(gradient + detail + rng.normal(0, 2, gradient.shape), 0, 255).astype(np.uint8)
+
+
+def short_message(rng, length):
+    """Generate a printable message of the given length"""
+    return "".join(chr(code) for code in rng.integers(ord("a"), ord("z") + 1, length))
+
+
+def missed(result, method, message):
+    """True if a decode method did not return the hidden message"""
+    return result[method].get("message") != message
+
+
+def run(engine, paths, cascade):
+    """Analyze every image and return the elapsed time and the results"""
+    start = time.perf_counter()
+    results = [engine.extract_all_methods(path, cascade=cascade) for path in paths]
+    return time.perf_counter() - start, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark cascade analysis")
+    parser.add_argument("--images", type=int, default=40, help="Corpus size")
+    parser.add_argument("--size", type=int, default=512, help="Image width and height")
+    parser.add_argument("--stego-fraction", type=float, default=0.1, help="Fraction of stego images")
+    parser.add_argument("--short-fraction", type=float, default=0.1,
+                        help="Fraction of natural-looking images hiding a short message")
+    parser.add_argument("--message-length", type=int, default=32, help="Length of the short messages")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    stego_count = int(round(args.images * args.stego_fraction))
+    short_count = int(round(args.images * args.short_fraction))
+    clean_count = args.images - stego_count - short_count
+    engine = StegnoxEngine()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        paths = []
+        # Short messages: (path, decode method, message), alternating between the
+        # LSB and parity encoders and between photo-like and texture covers
+        short = []
+        for index in range(args.images):
+            if index < stego_count:
+                kind, pixels = "stego", stego_image(rng, args.size)
+            elif index < stego_count + short_count:
+                kind = "short"
+                pixels = photo(rng, args.size) if index % 2 == 0 else texture(rng, args.size)
+            else:
+                kind, pixels = "clean", clean_image(rng, args.size, index % 3)
+            path = os.path.join(temp_dir, f"{kind}_{index}.png")
+            Image.fromarray(pixels).save(path)
+
+            if kind == "short":
+                message = short_message(rng, args.message_length)
+                encode, method = ((engine.lsb_encoding, "lsb_extraction") if len(short) % 2 == 0 else
+                                  (engine.parity_bit_encoding, "parity_bit_extraction"))
+                encode(path, message, path)
+                short.append((path, method, message))
+            paths.append(path)
+
+        # Warm up imports and caches of the libraries
+        engine.extract_all_methods(paths[-1])
+
+        full_time, full_results = run(engine, paths, cascade=False)
+        cascade_time, results = run(engine, paths, cascade=True)
+
+    clean_skipped = sum(1 for path, result in zip(paths, results)
+                        if "clean_" in path and result["_cascade"]["stages_skipped"])
+    stego_flagged = sum(1 for path, result in zip(paths, results)
+                        if "stego_" in path and "decode" in result["_cascade"]["stages_run"])
+    by_path = dict(zip(paths, results))
+    full_by_path = dict(zip(paths, full_results))
+    cascade_missed = sum(missed(by_path[path], method, message) for path, method, message in short)
+    full_missed = sum(missed(full_by_path[path], method, message) for path, method, message in short)
+    probed = sum(1 for path, method, _ in short if method in by_path[path]["_cascade"]["probed"])
+
+    print(f"Corpus: {args.images} images of {args.size}x{args.size}, {stego_count} stego, "
+          f"{short_count} with a {args.message_length}-character message")
+    print(f"   full: {full_time:8.2f} s | {args.images / full_time:8.1f} images/s")
+    print(f"cascade: {cascade_time:8.2f} s | {args.images / cascade_time:8.1f} images/s | "
+          f"speedup {full_time / cascade_time:5.2f}x")
+    print(f"clean images skipping a stage: {clean_skipped}/{clean_count}")
+    print(f"stego images reaching the decode stage: {stego_flagged}/{stego_count}")
+    if short:
+        print(f"short messages missed: cascade {cascade_missed}/{len(short)} "
+              f"({cascade_missed / len(short):.0%}), full {full_missed}/{len(short)} | "
+              f"found by the decode probe: {probed}/{len(short)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,391 @@
+"""
+Engine benchmark suite
+
+Generates deterministic clean and stego images at several sizes and formats,
+times every analysis method, the encoders and the full extract_all_methods
+on each, and writes median and p95 wall times with RSS growth to JSON. With a
+baseline file the results are compared against it, and the script exits with
+status 1 when a measurement regresses past the threshold. The full analysis
+is also timed on a thread pool, which must beat the sequential run by the
+required speedup on machines with more than one core.
+"""
+
+import os
+import sys
+import json
+import math
+import time
+import argparse
+import platform
+import tempfile
+import threading
+import statistics
+
+import cv2
+import numpy as np
+from PIL import Image
+
+# Add parent directory to path to allow imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from engine.payload import frame_payload
+from engine.registry import registered_methods
+from engine.stegnox_engine import StegnoxEngine
+
+DEFAULT_SIZES = [0.25, 2, 12, 48]
+DEFAULT_FORMATS = ["PNG", "JPEG", "BMP"]
+FILE_EXTENSIONS = {"PNG": ".png", "JPEG": ".jpg", "BMP": ".bmp"}
+ENCODERS = ["lsb_encoding", "parity_bit_encoding", "metadata_encoding"]
+
+# Interval of the RSS sampling thread, in seconds
+RSS_INTERVAL = 0.005
+
+# Sequential analyses shorter than this, in seconds, are not held to the thread
+# pool speedup; pool start-up and the shared decode dominate them
+THREAD_CHECK_MIN_TIME = 0.25
+
+
+def dimensions(megapixels):
+    """Return a 4:3 width and height with about the given number of megapixels"""
+    width = int(round(math.sqrt(megapixels * 1e6 * 4 / 3)))
+    return width, int(round(width * 3 / 4))
+
+
+def photo_like(rng, width, height):
+    """Generate a smooth gradient with low-frequency texture and sensor-like noise"""
+    x = np.linspace(0, 255, width, dtype=np.float32)[None, :]
+    y = np.linspace(0, 255, height, dtype=np.float32)[:, None]
+    pixels = np.empty((height, width, 3), dtype=np.uint8)
+
+    # Built one channel at a time to keep the 48 MP images within a few hundred MB
+    for channel, base in enumerate((lambda: x + 0 * y, lambda: y + 0 * x, lambda: (x + y) / 2)):
+        small = rng.normal(0, 40, (max(height // 16, 1), max(width // 16, 1))).astype(np.float32)
+        plane = cv2.resize(small, (width, height), interpolation=cv2.INTER_CUBIC)
+        plane += base()
+        plane += rng.integers(-3, 4, (height, width), dtype=np.int8)
+        np.clip(plane, 0, 255, out=plane)
+        pixels[..., channel] = plane
+    return pixels
+
+
+def embed_payload(rng, pixels, fraction):
+    """Return a copy of the image whose RGB LSBs carry a framed random payload filling a fraction of them"""
+    stego = pixels.copy()
+    flat = stego.reshape(-1)
+    payload = rng.integers(0, 256, int(flat.size * fraction) // 8, dtype=np.uint8).tobytes()
+    bits = np.unpackbits(np.frombuffer(frame_payload(payload, binary=True), dtype=np.uint8))
+    bits = bits[:flat.size]
+    flat[:bits.size] = (flat[:bits.size] & 0xFE) | bits
+    return stego
+
+
+def current_rss():
+    """Resident set size of this process in bytes, or None where /proc is unavailable"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, AttributeError, ValueError):
+        return None
+
+
+class RssSampler:
+    """Samples the RSS on a thread while the enclosed code runs and keeps the highest value"""
+
+    def __init__(self, interval=RSS_INTERVAL):
+        self.interval = interval
+        self.start = None
+        self.peak = None
+        self.stop = threading.Event()
+        self.thread = None
+
+    @property
+    def growth(self):
+        """Highest RSS sampled above the RSS on entry, in bytes, or None without /proc"""
+        if self.start is None or self.peak is None:
+            return None
+        return max(0, self.peak - self.start)
+
+    def _sample(self):
+        rss = current_rss()
+        if rss is not None and (self.peak is None or rss > self.peak):
+            self.peak = rss
+        return rss
+
+    def _run(self):
+        while not self.stop.wait(self.interval):
+            self._sample()
+
+    def __enter__(self):
+        self.start = self._sample()
+        if self.start is not None:
+            self.thread = threading.Thread(target=self._run, daemon=True)
+            self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop.set()
+        if self.thread is not None:
+            self.thread.join()
+            self._sample()
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a list of values"""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+
+def measure(function, repeat):
+    """
+    Call a function repeatedly
+
+    The memory of each call is its RSS growth: the highest RSS sampled during
+    the call above the RSS just before it, so the memory earlier calls left
+    in the process is not counted again.
+
+    Returns:
+        tuple: (wall times in seconds, largest RSS growth of a call in bytes or
+            None where the RSS cannot be sampled, the last return value)
+    """
+    times = []
+    growths = []
+    result = None
+    for _ in range(repeat):
+        with RssSampler() as sampler:
+            start = time.perf_counter()
+            result = function()
+            times.append(time.perf_counter() - start)
+        if sampler.growth is not None:
+            growths.append(sampler.growth)
+    return times, max(growths) if growths else None, result
+
+
+def error_of(result):
+    """Return the error a method or extract_all_methods result reports, if any"""
+    if not isinstance(result, dict):
+        return None
+    if "error" in result:
+        return result["error"]
+    errors = [f"{name}: {value['error']}" for name, value in result.items()
+              if isinstance(value, dict) and "error" in value]
+    return "; ".join(errors) or None
+
+
+def benchmark_image(engine, path, kind, methods, repeat, temp_dir, threads=1):
+    """
+    Time the methods on one image
+
+    Args:
+        engine (StegnoxEngine): The engine
+        path (str): Image path; every call decodes it again
+        kind (str): "clean" or "stego"; the encoders only run on clean images
+        methods (list): Method names to time, or None for all of them
+        repeat (int): Runs per measurement
+        temp_dir (str): Directory for the encoders' output
+        threads (int): Threads of a second, concurrent extract_all_methods run; 1 skips it
+
+    Returns:
+        list: Result entries of the methods, then of extract_all_methods and of
+            its threaded run, named extract_all_methods/<threads>
+    """
+    analysis = [info.name for info in registered_methods() if methods is None or info.name in methods]
+    calls = [(name, lambda name=name: getattr(engine, name)(path)) for name in analysis]
+    if kind == "clean":
+        output_path = os.path.join(temp_dir, "encoded.png")
+        calls.extend(
+            (name, lambda name=name: getattr(engine, name)(path, "benchmark message", output_path))
+            for name in ENCODERS if methods is None or name in methods
+        )
+    if analysis:
+        calls.append(("extract_all_methods", lambda: engine.extract_all_methods(path, methods=analysis)))
+        if threads > 1:
+            calls.append((f"extract_all_methods/{threads}",
+                          lambda: engine.extract_all_methods(path, methods=analysis, max_workers=threads)))
+
+    entries = []
+    for name, call in calls:
+        times, rss_growth, result = measure(call, repeat)
+        entry = {
+            "method": name,
+            "runs": len(times),
+            "median": statistics.median(times),
+            "p95": percentile(times, 0.95),
+            "min": min(times),
+            "rss_growth": rss_growth
+        }
+        error = error_of(result)
+        if error is not None:
+            entry["error"] = error
+        entries.append(entry)
+    return entries
+
+
+def measurement_key(entry):
+    """Key matching a measurement between runs"""
+    return f"{entry['megapixels']}MP/{entry['format']}/{entry['kind']}/{entry['method']}"
+
+
+def compare(results, baseline, threshold, min_delta):
+    """
+    Compare results with a baseline
+
+    A median time regresses when it exceeds the baseline by more than the
+    threshold fraction and by more than min_delta seconds; the RSS growth
+    regresses when it exceeds the baseline by more than the threshold.
+
+    Returns:
+        list: (key, metric, baseline value, current value) for each regression
+    """
+    previous = {measurement_key(entry): entry for entry in baseline["results"]}
+    regressions = []
+    for entry in results:
+        old = previous.get(measurement_key(entry))
+        if old is None:
+            continue
+        if entry["median"] > old["median"] * (1 + threshold) and entry["median"] - old["median"] > min_delta:
+            regressions.append((measurement_key(entry), "median", old["median"], entry["median"]))
+        if entry["rss_growth"] and old.get("rss_growth") and \
+                entry["rss_growth"] > old["rss_growth"] * (1 + threshold):
+            regressions.append((measurement_key(entry), "rss_growth", old["rss_growth"], entry["rss_growth"]))
+    return regressions
+
+
+def thread_shortfalls(results, threads, min_speedup):
+    """
+    Find images whose threaded extract_all_methods misses the required speedup
+
+    Returns:
+        list: (image key, sequential median, threaded median) for each shortfall
+    """
+    sequential = {measurement_key(entry): entry for entry in results if entry["method"] == "extract_all_methods"}
+    shortfalls = []
+    for entry in results:
+        if entry["method"] != f"extract_all_methods/{threads}":
+            continue
+        serial = sequential.get(measurement_key(dict(entry, method="extract_all_methods")))
+        if serial is None or serial["median"] < THREAD_CHECK_MIN_TIME:
+            continue
+        if entry["median"] * min_speedup > serial["median"]:
+            key = measurement_key(entry).rsplit("/", 2)[0]
+            shortfalls.append((key, serial["median"], entry["median"]))
+    return shortfalls
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark every engine method on synthetic images")
+    parser.add_argument("--sizes", type=float, nargs="+", default=DEFAULT_SIZES, help="Image sizes in megapixels")
+    parser.add_argument("--formats", nargs="+", default=DEFAULT_FORMATS, choices=DEFAULT_FORMATS,
+                        help="Image formats")
+    parser.add_argument("--methods", nargs="+", help="Methods to time instead of all of them")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per measurement")
+    parser.add_argument("--payload-fraction", type=float, default=0.05,
+                        help="Fraction of the LSB capacity the stego images fill")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the synthetic images")
+    parser.add_argument("--output", default="bench_results.json", help="JSON file for the results")
+    parser.add_argument("--baseline", help="Baseline JSON file to compare against")
+    parser.add_argument("--update-baseline", action="store_true", help="Write the results to the baseline file")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="Allowed slowdown or memory growth over the baseline, as a fraction")
+    parser.add_argument("--min-delta", type=float, default=0.005,
+                        help="Slowdowns of fewer seconds than this are not regressions")
+    parser.add_argument("--threads", type=int, default=4,
+                        help="Threads of the concurrent extract_all_methods run; 1 skips it")
+    parser.add_argument("--min-thread-speedup", type=float, default=1.25,
+                        help="Speedup the concurrent run must reach over the sequential one")
+    args = parser.parse_args(argv)
+
+    engine = StegnoxEngine()
+
+    results = []
+    with tempfile.TemporaryDirectory() as temp_dir:
+        # Warm up the lazy imports so the first measurement does not pay for them
+        warmup = os.path.join(temp_dir, "warmup.png")
+        Image.fromarray(photo_like(np.random.default_rng(args.seed), 64, 48)).save(warmup)
+        engine.extract_all_methods(warmup)
+
+        for index, megapixels in enumerate(args.sizes):
+            width, height = dimensions(megapixels)
+            rng = np.random.default_rng([args.seed, index])
+            clean = photo_like(rng, width, height)
+            images = {"clean": clean, "stego": embed_payload(rng, clean, args.payload_fraction)}
+
+            paths = {}
+            for kind, pixels in images.items():
+                for image_format in args.formats:
+                    path = os.path.join(temp_dir, f"{kind}_{megapixels}{FILE_EXTENSIONS[image_format]}")
+                    options = {"quality": 90} if image_format == "JPEG" else {}
+                    Image.fromarray(pixels).save(path, image_format, **options)
+                    paths[image_format, kind] = path
+            del clean, images
+
+            for image_format in args.formats:
+                for kind in ("clean", "stego"):
+                    path = paths[image_format, kind]
+                    for entry in benchmark_image(engine, path, kind, args.methods, args.repeat, temp_dir,
+                                                 args.threads):
+                        entry = dict({
+                            "megapixels": megapixels,
+                            "width": width,
+                            "height": height,
+                            "format": image_format,
+                            "kind": kind,
+                            "file_size": os.path.getsize(path)
+                        }, **entry)
+                        results.append(entry)
+                        rss = f"{entry['rss_growth'] / 2 ** 20:8.1f} MB" if entry["rss_growth"] is not None \
+                            else "     n/a"
+                        print(f"{megapixels:>6} MP {image_format:<4} {kind:<5} {entry['method']:<24} "
+                              f"median {entry['median']:9.4f} s | p95 {entry['p95']:9.4f} s | rss +{rss}"
+                              + (" | error" if "error" in entry else ""))
+                    os.unlink(path)
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "numpy": np.__version__,
+            "opencv": cv2.__version__,
+            "repeat": args.repeat,
+            "seed": args.seed,
+            "payload_fraction": args.payload_fraction,
+            "methods": args.methods or [info.name for info in registered_methods()] + ENCODERS
+        },
+        "results": results
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    status = 0
+    if args.threads > 1 and (os.cpu_count() or 1) > 1:
+        shortfalls = thread_shortfalls(results, args.threads, args.min_thread_speedup)
+        for key, serial, threaded in shortfalls:
+            print(f"THREADS {key}: {serial:.4f} s sequential, {threaded:.4f} s on {args.threads} threads "
+                  f"({serial / threaded:.2f}x, below {args.min_thread_speedup:.2f}x)")
+        status = 1 if shortfalls else 0
+    elif args.threads > 1:
+        print("Single core: the thread pool speedup is not checked")
+
+    if args.baseline and os.path.exists(args.baseline) and not args.update_baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold, args.min_delta)
+        for key, metric, old, new in regressions:
+            if metric == "rss_growth":
+                change = f"{old / 2 ** 20:.1f} MB -> {new / 2 ** 20:.1f} MB"
+            else:
+                change = f"{old:.4f} s -> {new:.4f} s"
+            print(f"REGRESSION {key} {metric}: {change} ({new / old - 1:+.0%})")
+        print(f"{len(regressions)} regressions against {args.baseline} "
+              f"(threshold {args.threshold:.0%}, min delta {args.min_delta} s)")
+        status = 1 if regressions else status
+    elif args.baseline and args.update_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline written to {args.baseline}")
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,71 @@
+"""
+Engine import-time benchmark
+
+Times a cold `import engine.stegnox_engine` in fresh interpreters, next to
+importing the heavy modules the engine used to load at import time, and the
+first call of each registered method, which now pays for its own
+dependencies.
+"""
+
+import os
+import sys
+import argparse
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules the engine imported eagerly before the method registry
+LEGACY_IMPORTS = "import cv2; import scipy.fftpack; import matplotlib.pyplot"
+
+ENGINE_IMPORT = "import engine.stegnox_engine"
+
+FIRST_CALLS = """
+import sys, time, tempfile, os
+import numpy as np
+from PIL import Image
+from engine.stegnox_engine import StegnoxEngine
+from engine.registry import registered_methods
+
+path = os.path.join(tempfile.mkdtemp(), "image.png")
+Image.fromarray(np.random.default_rng(0).integers(0, 256, (256, 256, 3), dtype=np.uint8)).save(path)
+engine = StegnoxEngine()
+for info in registered_methods():
+    start = time.perf_counter()
+    engine.extract_all_methods(path, methods=[info.name])
+    print(f"{info.name} {time.perf_counter() - start}")
+"""
+
+
+def time_statement(statement, repeat):
+    """Return the wall times of running a statement in fresh interpreters"""
+    code = f"import time; start = time.perf_counter(); {statement}; print(time.perf_counter() - start)"
+    times = []
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, "-c", code], cwd=ROOT,
+                                capture_output=True, text=True, check=True).stdout
+        times.append(float(output.strip().splitlines()[-1]))
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark engine import time")
+    parser.add_argument("--repeat", type=int, default=5, help="Fresh interpreters per measurement")
+    args = parser.parse_args()
+
+    for label, statement in [("engine import", ENGINE_IMPORT),
+                             ("engine import + legacy heavy modules", f"{ENGINE_IMPORT}; {LEGACY_IMPORTS}")]:
+        times = time_statement(statement, args.repeat)
+        print(f"{label:>38}: median {statistics.median(times) * 1000:8.1f} ms | "
+              f"min {min(times) * 1000:8.1f} ms")
+
+    print("\nFirst call of each method in a fresh interpreter (includes its lazy imports):")
+    output = subprocess.run([sys.executable, "-c", FIRST_CALLS], cwd=ROOT,
+                            capture_output=True, text=True, check=True).stdout
+    for line in output.strip().splitlines():
+        name, seconds = line.split()
+        print(f"{name:>38}: {float(seconds) * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+JPEG DCT analysis benchmark
+
+Times dct_analysis on synthetic JPEGs through its two coefficient sources:
+the pixel path (decode, grayscale, batched float DCT of every 8x8 block) and
+the quantized coefficients read straight from the entropy-coded data.
+"""
+
+import io
+import os
+import sys
+import time
+import argparse
+import statistics
+
+import cv2
+import numpy as np
+from PIL import Image
+
+# Add parent directory to path to allow imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from engine.stegnox_engine import StegnoxEngine
+
+
+def photo_like(rng, size):
+    """Generate a smooth image with texture and sensor-like noise"""
+    y, x = np.mgrid[0:size, 0:size]
+    gradient = np.stack([x * 255 / size, y * 255 / size, (x + y) * 255 / (2 * size)], axis=-1)
+    texture = cv2.GaussianBlur(rng.normal(0, 40, (size, size, 3)), (0, 0), 3)
+    return np.clip(gradient + texture + rng.normal(0, 3, gradient.shape), 0, 255).astype(np.uint8)
+
+
+def time_source(engine, data, source, repeat):
+    """Return the wall times of dct_analysis on fresh encoded bytes"""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = engine.dct_analysis(data, source=source)
+        times.append(time.perf_counter() - start)
+        if "error" in result:
+            raise RuntimeError(result["error"])
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark JPEG DCT analysis sources")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[512, 1024, 2048], help="Image edge lengths")
+    parser.add_argument("--qualities", type=int, nargs="+", default=[75, 95], help="JPEG qualities")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per measurement")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    engine = StegnoxEngine()
+
+    # Warm up imports and the Huffman table cache
+    warmup = io.BytesIO()
+    Image.fromarray(photo_like(rng, 64)).save(warmup, "JPEG")
+    for source in ("pixels", "coefficients"):
+        engine.dct_analysis(warmup.getvalue(), source=source)
+
+    print(f"{'image':>16} | {'pixels':>10} | {'coefficients':>12} | {'ratio':>6} | nonzero luma coefficients/px")
+    for size in args.sizes:
+        pixels = photo_like(rng, size)
+        for quality in args.qualities:
+            buffer = io.BytesIO()
+            Image.fromarray(pixels).save(buffer, "JPEG", quality=quality)
+            data = buffer.getvalue()
+
+            pixel_time = statistics.median(time_source(engine, data, "pixels", args.repeat))
+            coefficient_time = statistics.median(time_source(engine, data, "coefficients", args.repeat))
+            stats = engine.dct_analysis(data, source="coefficients")["statistics"]
+            density = stats["nonzero_count"] / (size * size)
+
+            print(f"{size:>5}x{size:<5} q{quality:<3} | {pixel_time * 1000:7.1f} ms | "
+                  f"{coefficient_time * 1000:9.1f} ms | {coefficient_time / pixel_time:5.2f}x | {density:.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+LSB extraction benchmark
+
+Times the vectorized StegnoxEngine.lsb_extraction against the original
+per-pixel string-building loop and checks that both return the same result.
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+import numpy as np
+from PIL import Image
+
+# Add parent directory to path to allow imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from engine.stegnox_engine import StegnoxEngine
+
+
+def legacy_lsb_extraction(image_path):
+    """The original per-pixel LSB extraction loop, kept for comparison"""
+    img = Image.open(image_path)
+    img = img.convert("RGB")
+    width, height = img.size
+
+    binary_message = ""
+    pixels = img.load()
+    terminator = ''.join(format(ord('#'), '08b') * 4)
+
+    for y in range(height):
+        for x in range(width):
+            r, g, b = pixels[x, y]
+            binary_message += str(r & 1)
+            binary_message += str(g & 1)
+            binary_message += str(b & 1)
+
+            if terminator in binary_message:
+                binary_message = binary_message[:binary_message.index(terminator)]
+                break
+        else:
+            continue
+        break
+
+    if len(binary_message) % 8 != 0:
+        return {"message": "No valid data found"}
+
+    try:
+        message_bytes = bytes(int(binary_message[i:i+8], 2) for i in range(0, len(binary_message), 8))
+        return {"message": message_bytes.decode('utf-8', errors='replace')}
+    except:
+        return {"message": "Binary data found but not decodable as text"}
+
+
+def time_call(func, *args, repeat=1):
+    """Return the best wall time of several calls and the last result"""
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark LSB extraction")
+    parser.add_argument("--width", type=int, default=200, help="Image width")
+    parser.add_argument("--height", type=int, default=150, help="Image height")
+    parser.add_argument("--repeat", type=int, default=3, help="Repetitions for the vectorized version")
+    parser.add_argument("--skip-legacy", action="store_true", help="Do not run the original loop")
+    args = parser.parse_args()
+
+    engine = StegnoxEngine()
+    rng = np.random.default_rng(0)
+    pixels = rng.integers(0, 256, size=(args.height, args.width, 3), dtype=np.uint8)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        clean_path = os.path.join(temp_dir, "clean.png")
+        stego_path = os.path.join(temp_dir, "stego.png")
+        Image.fromarray(pixels).save(clean_path)
+        engine.lsb_encoding(clean_path, "benchmark message", stego_path)
+
+        print(f"Image size: {args.width}x{args.height}")
+        for label, path in [("clean", clean_path), ("stego", stego_path)]:
+            new_time, new_result = time_call(engine.lsb_extraction, path, repeat=args.repeat)
+            line = f"{label:>6}: vectorized {new_time * 1000:9.2f} ms"
+
+            if not args.skip_legacy:
+                old_time, old_result = time_call(legacy_lsb_extraction, path)
+                match = "match" if old_result == new_result else "MISMATCH"
+                line += f" | legacy {old_time * 1000:11.2f} ms | speedup {old_time / new_time:8.1f}x | {match}"
+
+            print(line)
+
+
+if __name__ == "__main__":
+    main()
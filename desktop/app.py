@@ -17,6 +17,8 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 # Import engine
 from engine.stegnox_engine import StegnoxEngine
+from engine.pixel_cache import PixelCache
+from engine.result_cache import ResultCache
 
 # Import UI components
 from desktop.ui.components.header import Header
@@ -60,8 +62,16 @@ class StegnoXApp:
         # Load configuration
         self.config = Config()
         
-        # Initialize engine
-        self.engine = StegnoxEngine()
+        # Initialize engine, sharing decoded images and results between analyses
+        pixel_cache_size = self.config.get("pixel_cache_size")
+        pixel_cache = None
+        if pixel_cache_size:
+            pixel_cache = PixelCache(os.path.join(self.config.config_dir, "pixels"), pixel_cache_size)
+        result_cache_size = self.config.get("result_cache_size")
+        result_cache = None
+        if result_cache_size:
+            result_cache = ResultCache(os.path.join(self.config.config_dir, "results"), result_cache_size)
+        self.engine = StegnoxEngine(pixel_cache=pixel_cache, result_cache=result_cache)
         
         # Initialize utilities
         self.image_utils = ImageUtils()
@@ -251,18 +251,12 @@ class AnalyzeTab(ttk.Frame):
     def _run_analysis(self, methods):
         """Run the analysis process in a separate thread"""
         try:
-            # Initialize results
-            self.analysis_results = {}
+            # Run the selected methods on one shared decode, reusing cached results
+            self.analysis_results = self.app.engine.extract_all_methods(self.image_path, methods=methods)
             
-            # Run each selected method
-            for method in methods:
-                try:
-                    # Call the appropriate method in the engine
-                    result = getattr(self.app.engine, method)(self.image_path)
-                    self.analysis_results[method] = result
-                except Exception as e:
-                    self.app.logger.error(f"Error in {method}: {str(e)}")
-                    self.analysis_results[method] = {"error": str(e)}
+            for method, result in self.analysis_results.items():
+                if "error" in result:
+                    self.app.logger.error(f"Error in {method}: {result['error']}")
             
             # Update UI on the main thread
             self.after(0, self._analysis_complete)
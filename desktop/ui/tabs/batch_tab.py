@@ -28,6 +28,8 @@ class BatchTab(ttk.Frame):
         self.current_job_index = 0
         self.total_jobs = 0
         self.stop_requested = False
+        # Set by _stop_batch; engine methods check it and stop part-way
+        self.cancel_event = threading.Event()
         
         # Configure the frame
         self.configure(style="BatchTab.TFrame", padding=10)
@@ -292,6 +294,7 @@ class BatchTab(ttk.Frame):
         # Start batch processing
         self.batch_in_progress = True
         self.stop_requested = False
+        self.cancel_event = threading.Event()
         self.batch_results = {}
         self.current_job_index = 0
         self.total_jobs = len(selected_files)
@@ -317,6 +320,12 @@ class BatchTab(ttk.Frame):
     def _run_batch(self, files, process_type, method, output_dir, thread_count):
         """Run batch processing in a separate thread"""
         try:
+            if process_type == "analyze":
+                # Analysis runs on the engine's worker processes
+                self._run_analysis_batch(files, method, output_dir, thread_count)
+                self.after(0, self._batch_complete)
+                return
+            
             # Create a thread pool
             from concurrent.futures import ThreadPoolExecutor
             
@@ -359,6 +368,54 @@ class BatchTab(ttk.Frame):
             self.app.logger.error(f"Batch processing error: {str(e)}")
             self.after(0, lambda: self._batch_error(str(e)))
     
+    def _run_analysis_batch(self, files, method, output_dir, worker_count):
+        """Analyze files with the engine's process-pool batch API"""
+        methods = None if method == "all" else [self._engine_method_name(method)]
+        results = self.app.engine.analyze_batch(
+            files, methods=methods, max_workers=worker_count, ordered=False,
+            cancel_event=self.cancel_event
+        )
+        
+        try:
+            for i, (file_path, analysis) in enumerate(results):
+                if self.stop_requested:
+                    break
+                
+                try:
+                    if methods is not None:
+                        analysis = analysis[methods[0]]
+                    result = self._save_analysis(file_path, analysis, output_dir)
+                    self.batch_results[file_path] = result
+                    
+                    # Update progress
+                    self.current_job_index = i + 1
+                    progress = (self.current_job_index / self.total_jobs) * 100
+                    
+                    # Update UI on the main thread
+                    self.after(0, lambda p=progress, f=file_path, r=result: self._update_progress(p, f, r))
+                except Exception as e:
+                    self.app.logger.error(f"Error processing {file_path}: {str(e)}")
+                    self.batch_results[file_path] = {"status": "error", "error": str(e)}
+                    
+                    # Update UI on the main thread
+                    self.after(0, lambda f=file_path, e=str(e): self._update_error(f, e))
+        finally:
+            # Cancel the images that have not started yet
+            results.close()
+    
+    def _engine_method_name(self, method):
+        """Convert a method choice to the engine method name"""
+        return f"{method}_extraction" if method not in ["dct", "bit_plane", "histogram"] else f"{method}_analysis"
+    
+    def _save_analysis(self, file_path, result, output_dir):
+        """Save an analysis result to the output directory"""
+        file_name = os.path.basename(file_path)
+        output_file = os.path.join(output_dir, f"{os.path.splitext(file_name)[0]}_analysis.json")
+        with open(output_file, "w") as f:
+            json.dump(result, f, indent=2)
+        
+        return {"status": "success", "output": output_file, "result": result}
+    
     def _process_file(self, file_path, process_type, method, output_dir):
         """Process a single file"""
         try:
@@ -367,18 +424,14 @@ class BatchTab(ttk.Frame):
             if process_type == "analyze":
                 # Analyze the image
                 if method == "all":
-                    result = self.app.engine.extract_all_methods(file_path)
+                    result = self.app.engine.extract_all_methods(file_path, cancel=self.cancel_event)
                 else:
-                    # Convert method name to engine method
-                    engine_method = f"{method}_extraction" if method not in ["dct", "bit_plane", "histogram"] else f"{method}_analysis"
-                    result = getattr(self.app.engine, engine_method)(file_path)
+                    result = getattr(self.app.engine, self._engine_method_name(method))(
+                        file_path, cancel=self.cancel_event
+                    )
                 
                 # Save results to output directory
-                output_file = os.path.join(output_dir, f"{os.path.splitext(file_name)[0]}_analysis.json")
-                with open(output_file, "w") as f:
-                    json.dump(result, f, indent=2)
-                
-                return {"status": "success", "output": output_file, "result": result}
+                return self._save_analysis(file_path, result, output_dir)
             
             elif process_type == "encode":
                 # Encode a message in the image
@@ -401,17 +454,17 @@ class BatchTab(ttk.Frame):
                     results = {}
                     
                     # Try LSB first
-                    lsb_result = self.app.engine.lsb_extraction(file_path)
+                    lsb_result = self.app.engine.lsb_extraction(file_path, cancel=self.cancel_event)
                     if "message" in lsb_result and lsb_result["message"] != "No valid data found":
                         results["LSB"] = lsb_result["message"]
                     
                     # Try parity
-                    parity_result = self.app.engine.parity_bit_extraction(file_path)
+                    parity_result = self.app.engine.parity_bit_extraction(file_path, cancel=self.cancel_event)
                     if "message" in parity_result and parity_result["message"] != "No readable text found with parity method":
                         results["Parity"] = parity_result["message"]
                     
                     # Try metadata
-                    metadata_result = self.app.engine.metadata_extraction(file_path)
+                    metadata_result = self.app.engine.metadata_extraction(file_path, cancel=self.cancel_event)
                     if "metadata" in metadata_result and metadata_result["metadata"]:
                         for key, value in metadata_result["metadata"].items():
                             if key.lower() == "comment" and value:
@@ -428,11 +481,11 @@ class BatchTab(ttk.Frame):
                 else:
                     # Use specific method
                     if method == "lsb":
-                        result = self.app.engine.lsb_extraction(file_path)
+                        result = self.app.engine.lsb_extraction(file_path, cancel=self.cancel_event)
                     elif method == "parity":
-                        result = self.app.engine.parity_bit_extraction(file_path)
+                        result = self.app.engine.parity_bit_extraction(file_path, cancel=self.cancel_event)
                     elif method == "metadata":
-                        result = self.app.engine.metadata_extraction(file_path)
+                        result = self.app.engine.metadata_extraction(file_path, cancel=self.cancel_event)
                     
                     # Save results to output directory
                     output_file = os.path.join(output_dir, f"{os.path.splitext(file_name)[0]}_decoded.txt")
@@ -507,6 +560,8 @@ class BatchTab(ttk.Frame):
             return
         
         self.stop_requested = True
+        # Running engine methods stop at their next checkpoint with partial results
+        self.cancel_event.set()
         self.status_label.configure(text="Stopping batch processing...")
         self.app.set_status("Stopping batch processing...")
     
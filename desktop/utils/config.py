@@ -20,6 +20,8 @@ class Config:
         "show_advanced_options": False,
         "auto_save_results": True,
         "results_dir": "",
+        "pixel_cache_size": 1024 * 1024 * 1024,
+        "result_cache_size": 64 * 1024 * 1024,
         "batch_processing": {
             "max_threads": 4,
             "auto_save": True
@@ -0,0 +1,128 @@
+"""
+Native band layouts for the StegnoX engine
+
+Images are decoded once into an array of their own mode's layout. The RGB
+form the pixel methods share is a view of that array for RGB, RGBA, L and
+LA images, so only the other modes pay for a converted copy. Bands the RGB
+form leaves out (alpha) or narrows (samples wider than 8 bits) are exposed
+as plane views for per-band results.
+
+Only grayscale keeps samples wider than 8 bits: PIL reduces 16-bit RGB and
+RGBA images to 8 bits per sample when it opens them, so the low bits of
+their colour samples are not available to any method.
+"""
+
+import numpy as np
+from PIL import ImageMode
+
+# Modes whose RGB form is a view of the native array
+RGB_VIEW_MODES = ("RGB", "RGBA", "L", "LA")
+
+# Integer modes with samples wider than 8 bits
+WIDE_MODES = ("I", "I;16", "I;16L", "I;16B", "I;16N")
+
+
+def band_names(mode):
+    """
+    Name the bands of an image mode
+
+    Args:
+        mode (str): PIL image mode
+
+    Returns:
+        tuple: Band names, e.g. ("R", "G", "B", "A"), or ("I",) for 16-bit grayscale
+    """
+    return ImageMode.getmode(mode).bands
+
+
+def has_extra_bands(mode):
+    """
+    Tell from the mode alone whether an image has bands its RGB form does not carry
+
+    Args:
+        mode (str): PIL image mode
+
+    Returns:
+        bool: True for modes with alpha or with integer samples wider than 8 bits
+    """
+    return "A" in ImageMode.getmode(mode).bands or mode in WIDE_MODES
+
+
+def stored_dtype(img):
+    """
+    Tell the type of the samples an image file stores, when PIL widens them
+
+    Pillow releases before 10 open 16-bit grayscale PNGs as 32-bit "I"
+    images. This reads the decoder's raw mode, so it must be called before
+    the image is loaded.
+
+    Args:
+        img (PIL.Image.Image): The image, not yet loaded
+
+    Returns:
+        numpy.dtype: uint16 for 16-bit samples opened as "I", else None
+    """
+    rawmode = img.tile[0][3] if img.mode == "I" and len(img.tile) == 1 else None
+    if isinstance(rawmode, str) and rawmode.startswith("I;16"):
+        return np.dtype(np.uint16)
+    return None
+
+
+def native_array(img):
+    """
+    Decode a PIL image into an array of its own mode's layout
+
+    Samples PIL widened (see stored_dtype) are narrowed back, so the bands
+    report the depth the file stores.
+
+    Args:
+        img (PIL.Image.Image): The image, not yet loaded
+
+    Returns:
+        numpy.ndarray: The decoded pixels
+    """
+    dtype = stored_dtype(img)
+    native = np.asarray(img)
+    return native if dtype is None else native.astype(dtype)
+
+
+def rgb_view(native, mode):
+    """
+    Return the RGB form of a native array without copying it
+
+    Args:
+        native (numpy.ndarray): Decoded image in its native layout
+        mode (str): PIL image mode
+
+    Returns:
+        numpy.ndarray: (H, W, 3) uint8 view, read-only for grayscale modes,
+            or None if the mode needs a conversion
+    """
+    if mode not in RGB_VIEW_MODES:
+        return None
+    if mode in ("RGB", "RGBA"):
+        return native[..., :3]
+
+    # Grayscale values repeated into three channels, as convert("RGB") does
+    gray = native if native.ndim == 2 else native[..., 0]
+    return np.broadcast_to(gray[..., None], gray.shape + (3,))
+
+
+def extra_bands(native, mode):
+    """
+    List the bands of a native array that the RGB form leaves out or narrows
+
+    Args:
+        native (numpy.ndarray): Decoded image in its native layout
+        mode (str): PIL image mode
+
+    Returns:
+        list: (band name, plane view) pairs for alpha bands and integer
+            bands wider than 8 bits
+    """
+    names = band_names(mode)
+    planes = [native] if native.ndim == 2 else [native[..., index] for index in range(native.shape[2])]
+    return [
+        (name, plane) for name, plane in zip(names, planes)
+        if name == "A" or (plane.dtype.kind in "ui" and plane.dtype.itemsize > 1)
+    ]
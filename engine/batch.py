@@ -0,0 +1,128 @@
+"""
+Process-pool batch analysis for the StegnoX engine
+
+Workers are started once per batch, import the engine and its dependencies
+in their initializer, and then analyze chunks of image paths. Results are
+yielded as they arrive, either in input order or in completion order.
+"""
+
+import os
+import itertools
+import threading
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, wait
+
+from .executors import process_context, process_pool_executor
+
+# Engine instance owned by each worker process
+_worker_engine = None
+
+# Seconds between checks of the cancel event while waiting for a chunk
+CANCEL_POLL_INTERVAL = 0.1
+
+
+def _initialize_worker(engine_options):
+    """Create the worker's engine so every task starts warm"""
+    global _worker_engine
+    from .stegnox_engine import StegnoxEngine
+    _worker_engine = StegnoxEngine(**engine_options)
+
+
+def _analyze_chunk(paths, methods):
+    """Analyze a chunk of images in a worker process"""
+    return [(path, _worker_engine.extract_all_methods(path, methods=methods)) for path in paths]
+
+
+def _chunked(paths, chunksize):
+    """Split an iterable of paths into lists of at most chunksize items"""
+    iterator = iter(paths)
+    while True:
+        chunk = list(itertools.islice(iterator, chunksize))
+        if not chunk:
+            return
+        yield chunk
+
+
+def analyze_batch(paths, methods=None, max_workers=None, chunksize=1, ordered=True,
+                  cancel_event=None, engine_options=None):
+    """
+    Analyze many images on a pool of worker processes
+
+    At most two chunks per worker are in flight, so a long path list is not
+    submitted all at once. Closing the generator, or setting cancel_event,
+    cancels every chunk that has not started yet and returns without waiting
+    for the running ones; the event is checked every CANCEL_POLL_INTERVAL
+    seconds while a chunk runs.
+
+    Args:
+        paths (iterable): Image paths to analyze
+        methods (list, optional): Method names to run; all methods when omitted
+        max_workers (int, optional): Number of worker processes; defaults to the CPU count
+        chunksize (int): Number of images sent to a worker per task
+        ordered (bool): Yield results in input order instead of completion order
+        cancel_event (threading.Event, optional): Stops the batch when set
+        engine_options (dict, optional): Keyword arguments for each worker's StegnoxEngine
+
+    Yields:
+        tuple: (path, results) for each image
+    """
+    max_workers = max_workers or os.cpu_count() or 1
+    chunksize = max(1, chunksize)
+    window = max_workers * 2
+    chunks = _chunked(paths, chunksize)
+
+    ProcessPoolExecutor = process_pool_executor()
+    executor = ProcessPoolExecutor(
+        max_workers=max_workers,
+        mp_context=process_context(),
+        initializer=_initialize_worker,
+        initargs=(engine_options or {},)
+    )
+    in_flight = deque()
+
+    def cancelled():
+        return cancel_event is not None and cancel_event.is_set()
+
+    def fill():
+        while len(in_flight) < window and not cancelled():
+            chunk = next(chunks, None)
+            if chunk is None:
+                return
+            in_flight.append((executor.submit(_analyze_chunk, chunk, methods), chunk))
+
+    def collect(future, chunk):
+        try:
+            return future.result()
+        except Exception as e:
+            return [(path, {"error": f"Batch analysis failed: {str(e)}"}) for path in chunk]
+
+    try:
+        fill()
+        while in_flight and not cancelled():
+            # In order, only the oldest chunk may be yielded next
+            waiting = [in_flight[0][0]] if ordered else [future for future, _ in in_flight]
+            done, _ = wait(waiting, timeout=CANCEL_POLL_INTERVAL, return_when=FIRST_COMPLETED)
+            if not done:
+                continue
+            finished = [item for item in in_flight if item[0] in done]
+            for item in finished:
+                in_flight.remove(item)
+
+            for future, chunk in finished:
+                for item in collect(future, chunk):
+                    yield item
+                    if cancelled():
+                        return
+            fill()
+    finally:
+        # Pending chunks are cancelled; when the batch stops early, chunks
+        # already running finish in the background instead of being waited for.
+        # shutdown(wait=False) would close the pool's wakeup pipe under its
+        # management thread on Python 3.8 and leave idle workers never told
+        # to exit, so the waiting shutdown runs on a thread of its own.
+        for future, _ in in_flight:
+            future.cancel()
+        if in_flight:
+            threading.Thread(target=executor.shutdown, daemon=True).start()
+        else:
+            executor.shutdown()
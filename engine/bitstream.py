@@ -0,0 +1,122 @@
+"""
+Bit stream helpers for the StegnoX engine
+
+These helpers work on NumPy arrays of pixel values or 0/1 bits so that
+extraction never has to build Python strings of '0' and '1' characters.
+"""
+
+import numpy as np
+
+from .cancellation import checkpoint
+
+# Terminator that ends a message in the legacy payload format
+TERMINATOR = b"####"
+
+# Number of values examined per step when searching for a pattern
+SEARCH_CHUNK_BITS = 1 << 22
+
+
+def find_bit_pattern(bits, pattern):
+    """
+    Find the first occurrence of a byte pattern in a bit array, at any bit alignment
+
+    Args:
+        bits (numpy.ndarray): 1-D array of 0/1 values
+        pattern (bytes): Pattern to look for
+
+    Returns:
+        int: Bit offset of the first occurrence, or -1 if not found
+    """
+    best = -1
+    for shift in range(8):
+        usable = (bits.size - shift) // 8 * 8
+        if usable < len(pattern) * 8:
+            break
+        packed = np.packbits(bits[shift:shift + usable]).tobytes()
+        index = packed.find(pattern)
+        if index >= 0:
+            offset = shift + index * 8
+            if best < 0 or offset < best:
+                best = offset
+    return best
+
+
+def find_lsb_pattern(values, pattern, chunk_bits=SEARCH_CHUNK_BITS):
+    """
+    Find the first occurrence of a byte pattern in the least significant bits of values
+
+    The search walks the values in overlapping chunks and stops at the first
+    chunk containing a match, so a pattern near the start is found without
+    touching the rest of the array.
+
+    Args:
+        values (numpy.ndarray): 1-D array of integer values
+        pattern (bytes): Pattern to look for
+        chunk_bits (int): Number of values examined per step
+
+    Returns:
+        int: Bit offset of the first occurrence, or -1 if not found
+    """
+    overlap = len(pattern) * 8 - 1
+    for start in range(0, values.size, chunk_bits):
+        checkpoint()
+        bits = values[start:start + chunk_bits + overlap] & 1
+        offset = find_bit_pattern(bits, pattern)
+        if offset >= 0:
+            return start + offset
+    return -1
+
+
+def parity_bits(pixels):
+    """
+    Compute the parity of the channel sum of every pixel
+
+    Args:
+        pixels (numpy.ndarray): (..., 3) array of RGB values
+
+    Returns:
+        numpy.ndarray: Flattened 0/1 array with one entry per pixel, in raster order
+    """
+    return (np.bitwise_xor.reduce(pixels, axis=-1) & 1).reshape(-1)
+
+
+def read_parity_bits(pixels, bit_count):
+    """
+    Compute the first bit_count parity bits of an image, touching only the rows they need
+
+    Args:
+        pixels (numpy.ndarray): (H, W, 3) array of RGB values
+        bit_count (int): Number of bits to read
+
+    Returns:
+        numpy.ndarray: 0/1 array of at most bit_count entries
+    """
+    width = pixels.shape[1]
+    rows = -(-bit_count // width) if width else 0
+    return parity_bits(pixels[:rows])[:bit_count]
+
+
+def pack_lsbs(values):
+    """
+    Pack the least significant bits of values into bytes, most significant bit first
+
+    Args:
+        values (numpy.ndarray): 1-D array of integer values; its length should be a multiple of 8
+
+    Returns:
+        bytes: The packed bits
+    """
+    return np.packbits(values & 1).tobytes()
+
+
+def unpack_bits(data):
+    """
+    Unpack bytes into a 0/1 array, most significant bit first
+
+    Args:
+        data (bytes): Data to unpack
+
+    Returns:
+        numpy.ndarray: uint8 array with eight entries per input byte
+    """
+    return np.unpackbits(np.frombuffer(data, dtype=np.uint8))
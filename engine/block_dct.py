@@ -0,0 +1,155 @@
+"""
+Batched block DCT for the StegnoX engine
+
+The image is viewed as a tensor of 8x8 blocks and transformed with a few
+batched DCT calls instead of one call per block. SciPy is imported on the
+first transform. Under a cancellation token the batches stop early, and the
+statistics cover the blocks transformed so far.
+"""
+
+import numpy as np
+
+from .cancellation import stop_requested
+
+# JPEG block size
+BLOCK_SIZE = 8
+
+# Fraction of odd-valued coefficients above which a block counts as suspicious
+ODD_COEFFICIENT_THRESHOLD = 0.7
+
+# Coefficients transformed per batched DCT call; bounds the floating-point working set
+BATCH_COEFFICIENTS = 1 << 22
+
+
+def block_tensor(gray, block_size=BLOCK_SIZE):
+    """
+    View the complete blocks of a 2-D image as a 4-D tensor
+
+    Rows and columns that do not fill a whole block are dropped.
+
+    Args:
+        gray (numpy.ndarray): (H, W) image
+        block_size (int): Block edge length
+
+    Returns:
+        numpy.ndarray: (H // block_size, W // block_size, block_size, block_size) view
+    """
+    block_rows = gray.shape[0] // block_size
+    block_cols = gray.shape[1] // block_size
+    trimmed = gray[:block_rows * block_size, :block_cols * block_size]
+    return trimmed.reshape(block_rows, block_size, block_cols, block_size).swapaxes(1, 2)
+
+
+def block_dct(blocks, dtype=np.float64):
+    """
+    Apply an orthonormal 2-D DCT-II to every block of a block tensor
+
+    Args:
+        blocks (numpy.ndarray): (..., N, N) block tensor
+        dtype: Floating-point type used for the transform
+
+    Returns:
+        numpy.ndarray: DCT coefficients with the same shape as blocks
+    """
+    from scipy.fftpack import dct
+
+    blocks = blocks.astype(dtype)
+    return dct(dct(blocks, axis=-2, norm='ortho'), axis=-1, norm='ortho')
+
+
+def block_dct_statistics(gray, block_size=BLOCK_SIZE, dtype=np.float64):
+    """
+    Count zero, non-zero and odd-valued DCT coefficients over all blocks
+
+    Args:
+        gray (numpy.ndarray): (H, W) image
+        block_size (int): Block edge length
+        dtype: Floating-point type used for the transform
+
+    Returns:
+        dict: zero_count, nonzero_count, suspicious_blocks and total_blocks
+    """
+    blocks = block_tensor(gray, block_size)
+    block_rows, block_cols = blocks.shape[:2]
+    coefficients_per_block = block_size * block_size
+    odd_limit = coefficients_per_block * ODD_COEFFICIENT_THRESHOLD
+
+    stats = {
+        "zero_count": 0,
+        "nonzero_count": 0,
+        "suspicious_blocks": 0,
+        "total_blocks": block_rows * block_cols
+    }
+
+    rows_per_batch = max(1, BATCH_COEFFICIENTS // max(1, block_cols * coefficients_per_block))
+    for start in range(0, block_rows, rows_per_batch):
+        if stop_requested():
+            # Statistics of the block rows counted so far
+            stats["total_blocks"] = start * block_cols
+            break
+        _count_coefficients(block_dct(blocks[start:start + rows_per_batch], dtype), odd_limit, stats)
+
+    return stats
+
+
+def block_stack_dct_statistics(blocks, dtype=np.float64):
+    """
+    Count zero, non-zero and odd-valued DCT coefficients over a stack of blocks
+
+    Args:
+        blocks (numpy.ndarray): (N, block_size, block_size) blocks, e.g. a random sample
+        dtype: Floating-point type used for the transform
+
+    Returns:
+        dict: zero_count, nonzero_count, suspicious_blocks and total_blocks
+    """
+    coefficients_per_block = blocks.shape[-1] * blocks.shape[-2]
+    odd_limit = coefficients_per_block * ODD_COEFFICIENT_THRESHOLD
+
+    stats = {
+        "zero_count": 0,
+        "nonzero_count": 0,
+        "suspicious_blocks": 0,
+        "total_blocks": blocks.shape[0]
+    }
+
+    blocks_per_batch = max(1, BATCH_COEFFICIENTS // coefficients_per_block)
+    for start in range(0, blocks.shape[0], blocks_per_batch):
+        if stop_requested():
+            stats["total_blocks"] = start
+            break
+        _count_coefficients(block_dct(blocks[start:start + blocks_per_batch], dtype), odd_limit, stats)
+
+    return stats
+
+
+def quantized_coefficient_statistics(coefficients):
+    """
+    Count zero, non-zero and odd-valued coefficients of quantized JPEG blocks
+
+    Args:
+        coefficients (numpy.ndarray): (..., 8, 8) integer coefficients, e.g. a
+            JpegComponent's coefficient array
+
+    Returns:
+        dict: zero_count, nonzero_count, suspicious_blocks and total_blocks
+    """
+    coefficients_per_block = coefficients.shape[-1] * coefficients.shape[-2]
+    stats = {
+        "zero_count": 0,
+        "nonzero_count": 0,
+        "suspicious_blocks": 0,
+        "total_blocks": coefficients.size // coefficients_per_block
+    }
+    _count_coefficients(coefficients, coefficients_per_block * ODD_COEFFICIENT_THRESHOLD, stats)
+    return stats
+
+
+def _count_coefficients(coefficients, odd_limit, stats):
+    """Add the zero, non-zero and suspicious block counts of a batch to stats"""
+    zero_count = int(np.count_nonzero(coefficients == 0))
+    stats["zero_count"] += zero_count
+    stats["nonzero_count"] += coefficients.size - zero_count
+
+    odd_per_block = np.count_nonzero(np.abs(coefficients) % 2 > 0.5, axis=(-2, -1))
+    stats["suspicious_blocks"] += int(np.count_nonzero(odd_per_block > odd_limit))
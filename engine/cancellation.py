@@ -0,0 +1,229 @@
+"""
+Cooperative cancellation for the StegnoX engine
+
+A CancellationToken combines a flag that another thread can set with an
+optional deadline. While a method runs under a token, its loops check the
+token between blocks, chunks, restart intervals and bands: loops that can
+stop with a usable estimate (the batched block DCT, the tiled band pass)
+stop early, and the result is marked "partial"; others raise
+OperationCancelled, which is turned into a partial error entry.
+
+The running token is kept in a context variable, so the checks need no extra
+arguments through the helper modules.
+"""
+
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from numbers import Real
+
+# Reasons a token stops work
+REASON_CANCELLED = "cancelled"
+REASON_DEADLINE = "deadline"
+
+_current_token = contextvars.ContextVar("stegnox_cancellation_token", default=None)
+
+
+class OperationCancelled(BaseException):
+    """
+    Raised at a checkpoint when the running token has been cancelled or has expired
+
+    It derives from BaseException, like KeyboardInterrupt, so the broad
+    except clauses that turn method failures into error entries let it through.
+    """
+
+    def __init__(self, reason):
+        super().__init__(f"Stopped: {reason}")
+        self.reason = reason
+
+
+class CancellationToken:
+    """A cancellation flag, shared between threads, with an optional deadline"""
+
+    def __init__(self, timeout=None, deadline=None, event=None):
+        """
+        Initialize the token
+
+        Args:
+            timeout (float, optional): Seconds from now until the token expires
+            deadline (float, optional): Absolute expiry time on the time.monotonic() clock;
+                the earlier of deadline and timeout applies
+            event (threading.Event, optional): Flag to share, e.g. a batch's stop event
+        """
+        if timeout is not None:
+            expiry = time.monotonic() + timeout
+            deadline = expiry if deadline is None else min(deadline, expiry)
+        self.deadline = deadline
+        self.event = event if event is not None else threading.Event()
+        self.interrupted = False
+
+    def cancel(self):
+        """Cancel the token and every token sharing its event"""
+        self.event.set()
+
+    @property
+    def reason(self):
+        """REASON_CANCELLED, REASON_DEADLINE, or None while the token is live"""
+        if self.event.is_set():
+            return REASON_CANCELLED
+        if self.deadline is not None and time.monotonic() >= self.deadline:
+            return REASON_DEADLINE
+        return None
+
+    def expired(self):
+        """
+        Check whether work under the token should stop
+
+        Returns:
+            bool: True if the token was cancelled or its deadline has passed
+        """
+        return self.reason is not None
+
+    def remaining(self):
+        """
+        Seconds left until the deadline
+
+        Returns:
+            float: Remaining time (0 once expired), or None without a deadline
+        """
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - time.monotonic())
+
+    def child(self, timeout=None):
+        """
+        Derive a token that shares this token's flag and deadline, optionally with an earlier deadline
+
+        Args:
+            timeout (float, optional): Seconds from now until the child expires
+
+        Returns:
+            CancellationToken: The child token
+        """
+        return CancellationToken(timeout=timeout, deadline=self.deadline, event=self.event)
+
+    def stop_requested(self):
+        """
+        Check the token at a point where the caller can stop with a partial result
+
+        Returns:
+            bool: True if work should stop; the token then records the interruption
+        """
+        if self.expired():
+            self.interrupted = True
+            return True
+        return False
+
+    def check(self):
+        """
+        Check the token at a point where work cannot stop with a usable result
+
+        Raises:
+            OperationCancelled: If the token was cancelled or its deadline has passed
+        """
+        reason = self.reason
+        if reason is not None:
+            self.interrupted = True
+            raise OperationCancelled(reason)
+
+
+def as_token(cancel):
+    """
+    Build a token from the forms the engine accepts
+
+    Args:
+        cancel: None, a CancellationToken, a threading.Event, or a timeout in seconds
+
+    Returns:
+        CancellationToken: The token, or None for None
+
+    Raises:
+        TypeError: If the value is of another type
+    """
+    if cancel is None or isinstance(cancel, CancellationToken):
+        return cancel
+    if isinstance(cancel, threading.Event):
+        return CancellationToken(event=cancel)
+    if isinstance(cancel, Real) and not isinstance(cancel, bool):
+        return CancellationToken(timeout=cancel)
+    raise TypeError(f"Unsupported cancellation value: {type(cancel).__name__}")
+
+
+@contextmanager
+def cancellation_scope(token):
+    """
+    Run the enclosed code under a token
+
+    Args:
+        token (CancellationToken): The token the checkpoints consult; None clears it
+
+    Yields:
+        CancellationToken: The token
+    """
+    reset = _current_token.set(token)
+    try:
+        yield token
+    finally:
+        _current_token.reset(reset)
+
+
+def current_token():
+    """Return the token of the running scope, or None"""
+    return _current_token.get()
+
+
+def stop_requested():
+    """
+    Checkpoint for loops that can stop early with a partial result
+
+    Returns:
+        bool: True if the running token asks work to stop
+    """
+    token = _current_token.get()
+    return token is not None and token.stop_requested()
+
+
+def checkpoint():
+    """
+    Checkpoint for loops that cannot stop with a usable result
+
+    Raises:
+        OperationCancelled: If the running token was cancelled or has expired
+    """
+    token = _current_token.get()
+    if token is not None:
+        token.check()
+
+
+def run_cancellable(function, cancel, *args, **kwargs):
+    """
+    Call an analysis method under a token and mark what it returns
+
+    Args:
+        function (callable): The method
+        cancel: None, a CancellationToken, a threading.Event or a timeout in seconds
+        *args: Positional arguments of the method
+        **kwargs: Keyword arguments of the method
+
+    Returns:
+        dict: The method's result; with "partial": True and the "cancelled" reason
+            if the token stopped it, or an error entry if it expired before starting
+    """
+    token = as_token(cancel)
+    if token is None:
+        return function(*args, **kwargs)
+
+    reason = token.reason
+    if reason is not None:
+        return {"error": f"Not started: {reason}", "cancelled": reason}
+
+    with cancellation_scope(token):
+        try:
+            result = function(*args, **kwargs)
+        except OperationCancelled as e:
+            return {"error": str(e), "partial": True, "cancelled": e.reason}
+
+    if token.interrupted and isinstance(result, dict) and "error" not in result:
+        result = dict(result, partial=True, cancelled=token.reason or REASON_DEADLINE)
+    return result
@@ -0,0 +1,130 @@
+"""
+Header-only capacity planning for the StegnoX encoders
+
+The payload an encoder can hide depends only on the cover's dimensions, so
+it is computed from the image header without decoding any pixels. Encoders
+use it to reject oversized messages up front, and whole directories of
+candidate covers can be ranked in about a millisecond per file.
+"""
+
+import os
+
+from PIL import Image
+
+from .bitstream import TERMINATOR
+from .image_context import ImageContext
+from .payload import HEADER_SIZE
+
+# Bytes each payload format adds to the message
+FORMAT_OVERHEAD = {
+    "framed": HEADER_SIZE,
+    "legacy": len(TERMINATOR)
+}
+
+# Message bits each encoder hides per pixel; covers are converted to RGB
+BITS_PER_PIXEL = {
+    "lsb_encoding": 3,
+    "parity_bit_encoding": 1
+}
+
+
+def read_header(image):
+    """
+    Read an image's size and mode without decoding its pixels
+
+    Args:
+        image: Path, encoded bytes, file object, PIL image, pixel array or ImageContext
+
+    Returns:
+        tuple: ((width, height), mode)
+    """
+    if isinstance(image, (str, os.PathLike)):
+        # PIL parses only the header until the pixels are accessed
+        with Image.open(image) as img:
+            return img.size, img.mode
+
+    header = ImageContext.load(image).header
+    return header["size"], header["mode"]
+
+
+def capacity_for_size(width, height, method="lsb_encoding", payload_format="framed"):
+    """
+    Compute an encoder's capacity for a cover of the given size
+
+    Args:
+        width (int): Cover width in pixels
+        height (int): Cover height in pixels
+        method (str): Encoder name, a key of BITS_PER_PIXEL
+        payload_format (str): Payload format, a key of FORMAT_OVERHEAD
+
+    Returns:
+        dict: capacity_bits (including the header or terminator) and
+            capacity_bytes (the longest message, in encoded bytes)
+
+    Raises:
+        ValueError: If the method has no pixel capacity or the format is unknown
+    """
+    if method not in BITS_PER_PIXEL:
+        raise ValueError(f"No capacity model for method: {method}")
+    if payload_format not in FORMAT_OVERHEAD:
+        raise ValueError(f"Unknown payload format: {payload_format}")
+
+    bits = width * height * BITS_PER_PIXEL[method]
+    return {
+        "capacity_bits": bits,
+        "capacity_bytes": max(0, bits // 8 - FORMAT_OVERHEAD[payload_format])
+    }
+
+
+def cover_capacity(image, method="lsb_encoding", payload_format="framed"):
+    """
+    Compute an encoder's capacity for a cover image from its header
+
+    Args:
+        image: Path, encoded bytes, file object, PIL image, pixel array or ImageContext
+        method (str): Encoder name, a key of BITS_PER_PIXEL
+        payload_format (str): Payload format, a key of FORMAT_OVERHEAD
+
+    Returns:
+        dict: method, width, height, mode, capacity_bits and capacity_bytes
+    """
+    (width, height), mode = read_header(image)
+    result = {"method": method, "width": width, "height": height, "mode": mode}
+    result.update(capacity_for_size(width, height, method, payload_format))
+    return result
+
+
+def rank_covers(directory, method="lsb_encoding", min_bytes=0, payload_format="framed"):
+    """
+    Rank the images of a directory by capacity
+
+    Only headers are read. Files that are not readable images are skipped.
+
+    Args:
+        directory (str): Directory of candidate covers (not searched recursively)
+        method (str): Encoder name, a key of BITS_PER_PIXEL
+        min_bytes (int): Leave out covers that cannot hold this many message bytes
+        payload_format (str): Payload format, a key of FORMAT_OVERHEAD
+
+    Returns:
+        list: cover_capacity results with a "path" key, largest capacity first
+    """
+    # Validate the arguments even if the directory holds no images
+    capacity_for_size(0, 0, method, payload_format)
+
+    ranked = []
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if not entry.is_file():
+                continue
+            try:
+                result = cover_capacity(entry.path, method, payload_format)
+            except (OSError, SyntaxError, ValueError):
+                # Not an image PIL can identify
+                continue
+            if result["capacity_bytes"] >= min_bytes:
+                result["path"] = entry.path
+                ranked.append(result)
+
+    ranked.sort(key=lambda result: (-result["capacity_bytes"], result["path"]))
+    return ranked
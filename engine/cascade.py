@@ -0,0 +1,116 @@
+"""
+Cascade analysis for the StegnoX engine
+
+The cheap histogram statistics screen an image first: the pair-equalization
+confidence of histogram_analysis, the entropy of the least significant bit
+planes from bit_plane_analysis and the embedding rate estimated by
+sample_pair_analysis. The expensive stages, the decode
+attempts and the DCT analysis, only run when the screen scores reach the
+stage's thresholds, so clean images skip most of the work.
+
+A short message barely moves the screens, so when they skip the decode
+stage the leading bits of the image are probed for the start of a payload:
+a framed header, or the legacy terminator near the start. A decode method
+whose probe hits runs anyway.
+"""
+
+import numpy as np
+
+from .bitstream import TERMINATOR, find_bit_pattern, parity_bits
+from .payload import HEADER_BITS, parse_header
+
+# Methods gated by each cascade stage; all other methods always run
+CASCADE_STAGES = {
+    "decode": ("lsb_extraction", "parity_bit_extraction"),
+    "dct": ("dct_analysis",)
+}
+
+# Methods whose results provide the screen scores
+SCREEN_METHODS = ("histogram_analysis", "bit_plane_analysis", "sample_pair_analysis")
+
+# Screen scores a stage needs before it runs; every listed score must be
+# reached, and a threshold of 0 disables that condition
+DEFAULT_CASCADE_THRESHOLDS = {
+    "decode": {"pair_confidence": 30.0, "lsb_entropy": 0.9},
+    "dct": {"pair_confidence": 40.0, "lsb_entropy": 0.95, "embedding_rate": 0.05}
+}
+
+
+# Leading LSBs searched for a legacy terminator when the decode stage is skipped
+DECODE_PROBE_BITS = 8 * 8192
+
+
+def screen_scores(histogram_result, bit_plane_result, sample_pair_result):
+    """
+    Extract the screen scores from the screening results
+
+    Args:
+        histogram_result (dict): Result of histogram_analysis
+        bit_plane_result (dict): Result of bit_plane_analysis
+        sample_pair_result (dict): Result of sample_pair_analysis
+
+    Returns:
+        dict: pair_confidence (0-100), lsb_entropy (0-1, highest over the
+            channels) and embedding_rate (0-1), or None if a screen failed
+    """
+    if any("error" in result for result in (histogram_result, bit_plane_result, sample_pair_result)):
+        return None
+
+    lsb_plane = bit_plane_result["bit_planes"]["bit_0"]
+    return {
+        "pair_confidence": histogram_result["confidence"],
+        "lsb_entropy": max(lsb_plane[channel]["entropy"] for channel in ("red", "green", "blue")),
+        "embedding_rate": sample_pair_result["embedding_rate"]
+    }
+
+
+def stage_for(method_name):
+    """Return the cascade stage that gates a method, or None if it always runs"""
+    for stage, methods in CASCADE_STAGES.items():
+        if method_name in methods:
+            return stage
+    return None
+
+
+def stage_passes(scores, thresholds):
+    """
+    Decide whether a stage runs
+
+    Args:
+        scores (dict): Screen scores, or None if the screen failed
+        thresholds (dict): Minimum score per screen statistic
+
+    Returns:
+        bool: True if every threshold is reached; a failed screen lets every stage run
+    """
+    if scores is None:
+        return True
+    return all(scores[name] >= threshold for name, threshold in thresholds.items())
+
+
+def _payload_starts(bits, bits_available, window):
+    """True if a bit stream begins with a payload header or has the terminator within a window"""
+    header = parse_header(np.packbits(bits[:HEADER_BITS]).tobytes(), (bits_available - HEADER_BITS) // 8)
+    return header is not None or find_bit_pattern(bits[:window], TERMINATOR) >= 0
+
+
+def probe_payloads(pixels, pixel_count, parity_window):
+    """
+    Probe the leading pixels of an image for the start of a payload
+
+    Args:
+        pixels (numpy.ndarray): (rows, W, 3) uint8 leading rows, holding at least
+            DECODE_PROBE_BITS values or the whole image
+        pixel_count (int): Pixels in the whole image
+        parity_window (int): Leading parity bits parity_bit_extraction reads
+
+    Returns:
+        list: Decode methods whose bits begin with a framed payload header or hold
+            the legacy terminator within the probed bits
+    """
+    found = []
+    if _payload_starts(pixels.reshape(-1) & 1, pixel_count * 3, DECODE_PROBE_BITS):
+        found.append("lsb_extraction")
+    if _payload_starts(parity_bits(pixels), pixel_count, parity_window):
+        found.append("parity_bit_extraction")
+    return found
@@ -0,0 +1,98 @@
+"""
+Per-channel pixel statistics for the StegnoX engine
+
+Bit-plane and histogram statistics are both derived from one 256-bin
+histogram per channel, so each channel is scanned only once.
+"""
+
+import numpy as np
+
+# BIT_TABLE[v, b] is bit b (0 = least significant) of the 8-bit value v
+BIT_TABLE = np.unpackbits(np.arange(256, dtype=np.uint8)[:, None], axis=1, bitorder='little')
+
+
+def channel_histogram(channel):
+    """
+    Count the occurrences of each 8-bit value in a channel
+
+    Args:
+        channel (numpy.ndarray): uint8 array of any shape
+
+    Returns:
+        numpy.ndarray: int64 array of 256 counts
+    """
+    return np.bincount(channel.ravel(), minlength=256)
+
+
+def channel_histograms(pixels):
+    """
+    Build the value histogram of every channel of an image
+
+    Args:
+        pixels (numpy.ndarray): (H, W, C) uint8 array
+
+    Returns:
+        numpy.ndarray: (C, 256) int64 array of counts
+    """
+    return np.stack([channel_histogram(pixels[:, :, index]) for index in range(pixels.shape[2])])
+
+
+def bit_plane_ones(histogram):
+    """
+    Count the set bits of each bit plane from a value histogram
+
+    Args:
+        histogram (numpy.ndarray): 256 value counts
+
+    Returns:
+        numpy.ndarray: 8 counts, entry b being the number of values with bit b set
+    """
+    return histogram @ BIT_TABLE
+
+
+def binary_entropy(ones, total):
+    """
+    Shannon entropy of a bit plane with the given number of ones
+
+    Args:
+        ones (int): Number of set bits
+        total (int): Number of bits
+
+    Returns:
+        float: Entropy in bits, between 0 and 1
+    """
+    p_ones = ones / total
+    p_zeros = (total - ones) / total
+
+    entropy = 0
+    if p_ones > 0:
+        entropy -= p_ones * np.log2(p_ones)
+    if p_zeros > 0:
+        entropy -= p_zeros * np.log2(p_zeros)
+    return float(entropy)
+
+
+def pair_statistics(histogram, tolerance=0.05):
+    """
+    Compare the counts of each value pair (2n, 2n + 1) of a histogram
+
+    LSB embedding tends to equalize the two counts of every pair, so a pair
+    whose counts differ by less than the tolerance is suspicious.
+
+    Args:
+        histogram (numpy.ndarray): 256 value counts
+        tolerance (float): Relative difference below which a pair is suspicious
+
+    Returns:
+        dict: total_pairs, suspicious_pairs and suspicion_ratio
+    """
+    pairs = histogram.reshape(-1, 2)
+    even, odd = pairs[:, 0], pairs[:, 1]
+    suspicious_pairs = int(np.count_nonzero(np.abs(even - odd) < (even + odd) * tolerance))
+    pairs_count = pairs.shape[0]
+
+    return {
+        "total_pairs": pairs_count,
+        "suspicious_pairs": suspicious_pairs,
+        "suspicion_ratio": suspicious_pairs / pairs_count if pairs_count > 0 else 0
+    }
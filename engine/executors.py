@@ -0,0 +1,124 @@
+"""
+Executor imports for the StegnoX engine
+
+The job queue package of this repository is named ``queue`` and shadows the
+standard library module of the same name whenever the repository root comes
+first on sys.path. concurrent.futures and multiprocessing import the standard
+``queue`` module internally, so these helpers import them with the standard
+library module temporarily in place.
+"""
+
+import os
+import sys
+import multiprocessing
+import multiprocessing.context
+import sysconfig
+import importlib
+import importlib.util
+
+
+def _load_stdlib_queue():
+    """Load the standard library queue module from its file"""
+    path = os.path.join(sysconfig.get_paths()["stdlib"], "queue.py")
+    spec = importlib.util.spec_from_file_location("queue", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def import_with_stdlib_queue(module_name):
+    """
+    Import a module while ``queue`` resolves to the standard library
+
+    Args:
+        module_name (str): Dotted name of the module to import
+
+    Returns:
+        module: The imported module
+    """
+    current = sys.modules.get("queue")
+    if current is not None and hasattr(current, "SimpleQueue"):
+        return importlib.import_module(module_name)
+
+    sys.modules["queue"] = _load_stdlib_queue()
+    try:
+        return importlib.import_module(module_name)
+    finally:
+        if current is None:
+            del sys.modules["queue"]
+        else:
+            sys.modules["queue"] = current
+
+
+def thread_pool_executor():
+    """
+    Return the ThreadPoolExecutor class
+
+    Returns:
+        type: concurrent.futures.ThreadPoolExecutor
+    """
+    return import_with_stdlib_queue("concurrent.futures.thread").ThreadPoolExecutor
+
+
+def process_pool_executor():
+    """
+    Return the ProcessPoolExecutor class
+
+    Returns:
+        type: concurrent.futures.ProcessPoolExecutor
+    """
+    return import_with_stdlib_queue("concurrent.futures.process").ProcessPoolExecutor
+
+
+def _spawned_engine_process():
+    """
+    Start rebuilding an engine worker in a spawned child
+
+    Unpickling calls this before the rest of the process object, whose
+    executor target and queues import concurrent.futures.process and
+    multiprocessing.queues. ``queue`` is pointed at the standard library
+    first, for the rest of the worker's life; engine workers never use the
+    job queue package.
+
+    Returns:
+        _EngineSpawnProcess: An empty process object for the pickled state
+    """
+    current = sys.modules.get("queue")
+    if current is None or not hasattr(current, "SimpleQueue"):
+        sys.modules["queue"] = _load_stdlib_queue()
+    return _EngineSpawnProcess.__new__(_EngineSpawnProcess)
+
+
+class _EngineSpawnProcess(multiprocessing.context.SpawnProcess):
+    """Spawned worker process that fixes ``queue`` in the child before loading its target"""
+
+    def __reduce__(self):
+        return _spawned_engine_process, (), self.__dict__
+
+
+class _EngineSpawnContext(multiprocessing.context.SpawnContext):
+    """Spawn context whose workers import the standard library ``queue``"""
+
+    Process = _EngineSpawnProcess
+
+
+def process_context(start_method=None):
+    """
+    Return the multiprocessing context used for engine worker pools
+
+    On Linux workers are forked by default, so they start with the parent's
+    already imported modules; elsewhere they are spawned. Spawned children
+    get the parent's sys.path, where the repository's ``queue`` package
+    comes first, so the spawn context fixes the module in each child.
+
+    Args:
+        start_method (str, optional): "fork" or "spawn" instead of the platform choice
+
+    Returns:
+        multiprocessing.context.BaseContext: The context
+    """
+    if start_method is None:
+        start_method = "fork" if sys.platform.startswith("linux") else "spawn"
+    if start_method == "spawn":
+        return _EngineSpawnContext()
+    return multiprocessing.get_context(start_method)
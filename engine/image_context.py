@@ -0,0 +1,400 @@
+"""
+Shared per-image context for the StegnoX engine
+
+An ImageContext reads an image from disk once and lazily exposes the decoded
+forms the analysis methods need, so running every method on the same image
+does not decode it again for each one. Lazy values are computed under a
+lock per value, so one context can be shared by methods running on several
+threads. With a PixelCache the decoded RGB array is also shared between
+analyses, as a memory-mapped file keyed by the image's content hash.
+
+Pixels are decoded in the image's native layout; the RGB form is a view of
+that array whenever the mode allows, and alpha and 16-bit bands stay
+available for per-band results.
+
+Besides file paths, contexts wrap images that are already in memory:
+encoded bytes, file objects, PIL images and NumPy arrays.
+"""
+
+import os
+import threading
+from contextlib import contextmanager
+from io import BytesIO
+
+import numpy as np
+from PIL import Image
+
+from .bands import RGB_VIEW_MODES, extra_bands, has_extra_bands, native_array, rgb_view
+from .channel_stats import channel_histograms
+from .jpeg_coefficients import read_jpeg_coefficients
+from .pixel_cache import content_key, file_content_key
+from .png_stream import find_chunk
+
+
+class ImageContext:
+    """Lazily decoded views of a single image shared between engine methods"""
+
+    # Attributes computed on first use, each guarded by its own lock
+    LAZY_ATTRIBUTES = ("_raw_bytes", "_content_hash", "_image", "_header", "_native", "_rgb", "_gray",
+                       "_histograms", "_jpeg_coefficients")
+
+    def __init__(self, image_path=None, raw_bytes=None, pixel_cache=None, image=None, pixels=None):
+        """
+        Initialize the context
+
+        Args:
+            image_path (str, optional): Path to the image file
+            raw_bytes (bytes-like, optional): Encoded image data, if already in memory
+            pixel_cache (PixelCache, optional): Cache of decoded arrays to read from and fill
+            image (PIL.Image.Image, optional): An image already opened or created in memory
+            pixels (numpy.ndarray, optional): Decoded pixels, (H, W), (H, W, 3) or (H, W, 4) uint8
+        """
+        if image_path is None and raw_bytes is None and image is None and pixels is None:
+            raise ValueError("ImageContext needs an image path, raw bytes, an image or pixels")
+
+        self.image_path = image_path
+        self.pixel_cache = pixel_cache
+        self._raw_bytes = raw_bytes
+        self._pixels = pixels
+        self._content_hash = None
+        self._image = image
+        self._header = None
+        self._native = None
+        self._rgb = None
+        self._gray = None
+        self._histograms = None
+        self._jpeg_coefficients = None
+        self._locks = {name: threading.Lock() for name in self.LAZY_ATTRIBUTES}
+
+    @classmethod
+    def load(cls, image, pixel_cache=None):
+        """
+        Return a context for the given image
+
+        Args:
+            image: An existing context, a path, encoded bytes (bytes, bytearray or
+                memoryview), a binary file object such as BytesIO, a PIL image or
+                a NumPy array of pixels
+            pixel_cache (PixelCache, optional): Cache of decoded arrays for a new context
+
+        Returns:
+            ImageContext: The existing context, or a new one for the input
+
+        Raises:
+            TypeError: If the input type is not supported
+        """
+        if isinstance(image, cls):
+            return image
+        if isinstance(image, (str, os.PathLike)):
+            return cls(image_path=os.fspath(image), pixel_cache=pixel_cache)
+        if isinstance(image, (bytes, bytearray, memoryview)):
+            return cls(raw_bytes=image, pixel_cache=pixel_cache)
+        if isinstance(image, Image.Image):
+            return cls(image=image, pixel_cache=pixel_cache)
+        if isinstance(image, np.ndarray):
+            return cls(pixels=image, pixel_cache=pixel_cache)
+        if hasattr(image, "read"):
+            return cls(raw_bytes=image.read(), pixel_cache=pixel_cache)
+        raise TypeError(f"Unsupported image input: {type(image).__name__}")
+
+    @property
+    def is_encoded(self):
+        """True if the context has encoded file data (a path or raw bytes)"""
+        return self.image_path is not None or self._raw_bytes is not None
+
+    def _cached(self, name, factory):
+        """
+        Return a lazy attribute, computing it once even under concurrent access
+
+        Args:
+            name (str): Attribute name, one of LAZY_ATTRIBUTES
+            factory (callable): Computes the value on first use
+
+        Returns:
+            The attribute value
+        """
+        value = getattr(self, name)
+        if value is None:
+            with self._locks[name]:
+                value = getattr(self, name)
+                if value is None:
+                    value = factory()
+                    setattr(self, name, value)
+        return value
+
+    def _read_file(self):
+        """Read the encoded image from disk"""
+        if self.image_path is None:
+            raise ValueError("The image was given in decoded form and has no encoded bytes")
+        with open(self.image_path, 'rb') as f:
+            return f.read()
+
+    @property
+    def raw_bytes(self):
+        """The encoded image file contents, read from disk at most once"""
+        return self._cached("_raw_bytes", self._read_file)
+
+    def _hash_content(self):
+        """Hash the encoded bytes, or the native pixels with their mode, type and shape"""
+        if self._raw_bytes is None and self.image_path is not None:
+            # A file not read yet is hashed in chunks rather than kept in memory
+            with open(self.image_path, 'rb') as f:
+                return file_content_key(f)
+        if self.is_encoded:
+            return content_key(self.raw_bytes)
+        # The RGB form drops alpha and narrows wide samples, so images that
+        # differ only there would share its key
+        native = np.ascontiguousarray(self.native)
+        layout = f"{self.header['mode']}|{native.dtype.str}|{native.shape}"
+        return content_key(layout.encode() + native.tobytes())
+
+    @property
+    def content_hash(self):
+        """Hex SHA-256 of the encoded image (or of the native pixels and their layout), the key of its cache entries"""
+        return self._cached("_content_hash", self._hash_content)
+
+    def open(self):
+        """
+        Open a fresh PIL image over the in-memory file contents
+
+        Returns:
+            PIL.Image.Image: A lazily loaded image (only the header is parsed)
+        """
+        return Image.open(BytesIO(self.raw_bytes))
+
+    def open_file(self):
+        """
+        Open the encoded data as a binary file object
+
+        A file on disk is opened directly, so callers that stop early read only
+        part of it.
+
+        Returns:
+            file object: Binary stream over the encoded image
+        """
+        if self._raw_bytes is not None:
+            return BytesIO(self._raw_bytes)
+        if self.image_path is None:
+            raise ValueError("The image was given in decoded form and has no encoded bytes")
+        return open(self.image_path, 'rb')
+
+    def _open_source(self):
+        """Open the encoded data, or wrap the in-memory pixels in a PIL image"""
+        if self.is_encoded:
+            return self.open()
+        return Image.fromarray(self._pixels)
+
+    @property
+    def image(self):
+        """A PIL image used for header access; its pixels are decoded through opened(), never loaded here"""
+        return self._cached("_image", self._open_source)
+
+    @contextmanager
+    def opened(self):
+        """
+        Open the image for decoding
+
+        Encoded data is opened afresh and closed afterwards; an in-memory
+        image is yielded as it is and left open.
+
+        Yields:
+            PIL.Image.Image: The image
+        """
+        if not self.is_encoded:
+            yield self.image
+            return
+        with self.open() as img:
+            yield img
+
+    def _read_header(self):
+        """Collect basic header information; a file not read yet is opened for it, not loaded"""
+        def describe(img):
+            return {
+                "format": img.format,
+                "mode": img.mode,
+                "size": img.size
+            }
+
+        if self._image is None and self._raw_bytes is None and self.image_path is not None:
+            with Image.open(self.image_path) as img:
+                return describe(img)
+        return describe(self.image)
+
+    @property
+    def header(self):
+        """Basic header information: format, mode and size"""
+        return self._cached("_header", self._read_header)
+
+    def exif(self):
+        """
+        Read the EXIF tags without decoding the pixels
+
+        PIL loads a whole PNG to look for an eXIf chunk stored after the image
+        data, so for PNGs the chunk is found by walking the file instead.
+
+        Returns:
+            dict: Tag values keyed by tag number, the Exif sub-IFD merged in;
+                None if the image has no EXIF data
+        """
+        if not self.is_encoded:
+            # The caller's own PIL image, decoded through it anyway
+            if self._image is not None and hasattr(self._image, "_getexif"):
+                return self._image._getexif()
+            return None
+        with self.open() as img:
+            if img.format == "PNG" and "exif" not in img.info:
+                if "Raw profile type exif" in img.info:
+                    # ImageMagick's hex-encoded text chunk, as PIL decodes it
+                    img.info["exif"] = bytes.fromhex("".join(img.info["Raw profile type exif"].split("\n")[3:]))
+                else:
+                    with self.open_file() as f:
+                        data = find_chunk(f, b"eXIf")
+                    if data is None:
+                        return None
+                    img.info["exif"] = data
+            if not hasattr(img, "_getexif"):
+                return None
+            return img._getexif()
+
+    def cached_rgb(self):
+        """
+        Return the RGB array without decoding the image
+
+        Returns:
+            numpy.ndarray: The already decoded array, the caller's RGB array, or a
+                read-only memory-mapped array from the pixel cache; None if none
+                is available
+        """
+        if self._rgb is not None:
+            return self._rgb
+        if self._pixels is not None and self._pixels.ndim == 3 and self._pixels.shape[2] == 3 \
+                and self._pixels.dtype == np.uint8:
+            return self._pixels
+        if self.pixel_cache is None or not self.is_encoded:
+            return None
+
+        entry = self.pixel_cache.get(self.content_hash)
+        if entry is None:
+            return None
+        pixels, header = entry
+        self._cached("_header", lambda: header)
+        return pixels
+
+    def cached_native(self):
+        """
+        Return the native array without decoding the image
+
+        Returns:
+            numpy.ndarray: The already decoded array or the caller's pixels;
+                None if neither is available
+        """
+        if self._native is not None:
+            return self._native
+        return self._pixels
+
+    def cached_extra_bands(self):
+        """
+        Return the extra bands without decoding the image
+
+        Returns:
+            list: (band name, plane view) pairs of the already decoded or the
+                caller's array, or read-only memory-mapped planes from the pixel
+                cache; None if none are available
+        """
+        native = self.cached_native()
+        if native is not None:
+            return extra_bands(native, self.header["mode"])
+        if self.pixel_cache is None or not self.is_encoded:
+            return None
+        return self.pixel_cache.get_bands(self.content_hash)
+
+    def _decode_native(self):
+        """Decode the image into an array of its own mode's layout"""
+        if self._pixels is not None:
+            return self._pixels
+        with self.opened() as img:
+            return native_array(img)
+
+    @property
+    def native(self):
+        """The decoded image in its native layout, e.g. (H, W, 4) uint8 for RGBA or (H, W) uint16 for I;16"""
+        return self._cached("_native", self._decode_native)
+
+    def extra_bands(self):
+        """
+        The bands the RGB form leaves out (alpha) or narrows (samples wider than 8 bits)
+
+        Returns:
+            list: (band name, plane view) pairs; empty, without decoding, if the
+                mode has no such bands
+        """
+        mode = self.header["mode"]
+        if not has_extra_bands(mode):
+            return []
+        bands = self.cached_extra_bands()
+        if bands is not None:
+            return bands
+        return extra_bands(self.native, mode)
+
+    def _decode_rgb(self):
+        """Decode the image into an RGB array, through the pixel cache if there is one"""
+        pixels = self.cached_rgb()
+        if pixels is not None:
+            return pixels
+
+        # A view of the native array where the mode allows, a converted copy otherwise
+        mode = self.header["mode"]
+        pixels = rgb_view(self.native, mode) if mode in RGB_VIEW_MODES else None
+        if pixels is None:
+            with self.opened() as img:
+                pixels = np.asarray(img.convert("RGB"))
+        if self.pixel_cache is not None and self.is_encoded:
+            # The extra bands are stored too, so a later hit never decodes for them
+            bands = extra_bands(self.native, mode) if has_extra_bands(mode) else None
+            try:
+                self.pixel_cache.put(self.content_hash, pixels, self.header, bands)
+            except OSError:
+                pass
+        return pixels
+
+    @property
+    def rgb(self):
+        """The image as an (H, W, 3) uint8 RGB array, possibly a read-only view"""
+        return self._cached("_rgb", self._decode_rgb)
+
+    def _to_gray(self):
+        """Convert the RGB array to grayscale; OpenCV is imported on first use"""
+        import cv2
+
+        return cv2.cvtColor(np.ascontiguousarray(self.rgb), cv2.COLOR_RGB2GRAY)
+
+    @property
+    def gray(self):
+        """The image as an (H, W) uint8 grayscale array"""
+        return self._cached("_gray", self._to_gray)
+
+    @property
+    def histograms(self):
+        """(3, 256) value histograms of the R, G and B channels"""
+        return self._cached("_histograms", lambda: channel_histograms(self.rgb))
+
+    @property
+    def is_jpeg(self):
+        """True if the image is an encoded JPEG file"""
+        return self.is_encoded and self.header["format"] == "JPEG"
+
+    @property
+    def jpeg_coefficients(self):
+        """
+        Quantized DCT coefficients of an encoded JPEG, read without decoding pixels
+
+        Returns:
+            list: JpegComponent per colour component
+
+        Raises:
+            ValueError: If the image is not an encoded JPEG
+            NotImplementedError: If the JPEG is not baseline sequential
+        """
+        if not self.is_jpeg:
+            raise ValueError("The image is not an encoded JPEG")
+        return self._cached("_jpeg_coefficients", lambda: read_jpeg_coefficients(self.raw_bytes))
@@ -0,0 +1,476 @@
+"""
+JPEG quantized coefficient reader for the StegnoX engine
+
+Parses a baseline (sequential, Huffman-coded) JPEG and entropy-decodes its
+scans into the quantized DCT coefficients of every component, without
+dequantization or inverse DCT. JPEG steganography embeds in exactly these
+coefficients, so analyzing them directly avoids both the pixel decode and
+the re-transform of the decoded pixels, whose coefficients no longer carry
+the embedding.
+
+Huffman decoding is table driven: every code is resolved with one lookup of
+the next 16 bits, read from a precomputed list of 40-bit windows, one per
+byte of the scan. Coefficients are collected as flat (position, value) pairs
+and scattered into NumPy arrays once per scan.
+"""
+
+import re
+import struct
+from array import array
+from functools import lru_cache
+import numpy as np
+
+from .block_dct import BLOCK_SIZE
+from .cancellation import checkpoint
+
+# Natural (row-major) index of each zigzag position
+ZIGZAG = np.array([
+    0, 1, 8, 16, 9, 2, 3, 10, 17, 24, 32, 25, 18, 11, 4, 5,
+    12, 19, 26, 33, 40, 48, 41, 34, 27, 20, 13, 6, 7, 14, 21, 28,
+    35, 42, 49, 56, 57, 50, 43, 36, 29, 22, 15, 23, 30, 37, 44, 51,
+    58, 59, 52, 45, 38, 31, 39, 46, 53, 60, 61, 54, 47, 55, 62, 63
+])
+
+# Frame markers of the sequential Huffman-coded processes this reader decodes
+SUPPORTED_FRAMES = (0xC0, 0xC1)
+
+# Other start-of-frame markers (progressive, lossless, arithmetic coding)
+UNSUPPORTED_FRAMES = (0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF)
+
+# A marker ending the entropy-coded data: 0xFF followed by neither a stuffed
+# zero byte nor a restart marker
+SCAN_END = re.compile(b"\xff[^\x00\xd0-\xd7]")
+RESTART = re.compile(b"\xff[\xd0-\xd7]")
+
+# Bytes per window; a code (16 bits), its extra bits (up to 11) and the bit
+# offset within the first byte (up to 7) always fit
+WINDOW_BYTES = 5
+
+
+class JpegComponent:
+    """Quantized DCT coefficients of one JPEG colour component"""
+
+    def __init__(self, component_id, horizontal, vertical, quantization, coefficients,
+                 width, height, luminance=False):
+        """
+        Initialize the component
+
+        Args:
+            component_id (int): Component identifier from the frame header
+            horizontal (int): Horizontal sampling factor
+            vertical (int): Vertical sampling factor
+            quantization (numpy.ndarray): (8, 8) quantization table in natural order
+            coefficients (numpy.ndarray): (block rows, block columns, 8, 8) int16
+                quantized coefficients in natural order, partial edge blocks included
+            width (int): Width of the component's sample plane
+            height (int): Height of the component's sample plane
+            luminance (bool): True for the Y component of a YCbCr image and for
+                the single component of a grayscale one
+        """
+        self.component_id = component_id
+        self.horizontal = horizontal
+        self.vertical = vertical
+        self.quantization = quantization
+        self.coefficients = coefficients
+        self.width = width
+        self.height = height
+        self.luminance = luminance
+
+    def complete_blocks(self):
+        """
+        The coefficients of the blocks that lie wholly inside the sample plane
+
+        Returns:
+            numpy.ndarray: (height // 8, width // 8, 8, 8) view of the coefficients,
+                the block grid the pixel path analyzes
+        """
+        return self.coefficients[:self.height // BLOCK_SIZE, :self.width // BLOCK_SIZE]
+
+
+def is_jpeg(data):
+    """Check for the JPEG start-of-image marker"""
+    return bytes(data[:2]) == b"\xff\xd8"
+
+
+def read_jpeg_coefficients(data):
+    """
+    Decode the quantized DCT coefficients of a baseline JPEG
+
+    Args:
+        data (bytes-like): The encoded JPEG file
+
+    Returns:
+        list: JpegComponent per component, in frame header order
+
+    Raises:
+        NotImplementedError: For progressive, lossless, arithmetic-coded or 12-bit JPEGs
+        ValueError: If the data is not a valid JPEG
+    """
+    data = bytes(data)
+    if not is_jpeg(data):
+        raise ValueError("Not a JPEG file")
+
+    quantization = {}
+    huffman = {}
+    frame = None
+    restart_interval = 0
+    position = 2
+    jfif = False
+    adobe_transform = None
+
+    while position < len(data):
+        # Skip fill bytes before a marker
+        if data[position] != 0xFF:
+            raise ValueError(f"Expected a marker at offset {position}")
+        while position < len(data) and data[position] == 0xFF:
+            position += 1
+        if position >= len(data):
+            break
+        marker = data[position]
+        position += 1
+
+        if marker == 0xD9:
+            break
+        if 0xD0 <= marker <= 0xD7 or marker == 0x01:
+            continue
+
+        (length,) = struct.unpack(">H", data[position:position + 2])
+        segment = data[position + 2:position + length]
+        position += length
+
+        if marker == 0xE0 and segment[:5] == b"JFIF\x00":
+            jfif = True
+        elif marker == 0xEE and segment[:5] == b"Adobe" and len(segment) >= 12:
+            adobe_transform = segment[11]
+        elif marker == 0xDB:
+            _read_quantization_tables(segment, quantization)
+        elif marker == 0xC4:
+            _read_huffman_tables(segment, huffman)
+        elif marker == 0xDD:
+            (restart_interval,) = struct.unpack(">H", segment[:2])
+        elif marker in SUPPORTED_FRAMES:
+            frame = _read_frame(segment)
+        elif marker in UNSUPPORTED_FRAMES:
+            raise NotImplementedError(f"Unsupported JPEG process (SOF marker 0x{marker:02X})")
+        elif marker == 0xDA:
+            if frame is None:
+                raise ValueError("JPEG scan before the frame header")
+            end = SCAN_END.search(data, position)
+            end = end.start() if end else len(data)
+            _decode_scan(frame, segment, huffman, restart_interval, data[position:end])
+            position = end
+
+    if frame is None:
+        raise ValueError("JPEG has no frame header")
+
+    luminance = _luminance_index(frame["components"], jfif, adobe_transform)
+    components = []
+    for index, component in enumerate(frame["components"]):
+        rows, cols = component["blocks"]
+        coefficients = component["coefficients"][:rows, :cols]
+        components.append(JpegComponent(
+            component["id"], component["h"], component["v"],
+            quantization.get(component["table"], np.zeros(64, dtype=np.uint16))[ZIGZAG.argsort()].reshape(8, 8),
+            coefficients.reshape(rows, cols, BLOCK_SIZE, BLOCK_SIZE),
+            component["width"], component["height"], luminance=index == luminance
+        ))
+    return components
+
+
+def _luminance_index(components, jfif, adobe_transform):
+    """
+    Find the luminance component the way libjpeg infers the colour space
+
+    One component is grayscale. Three are YCbCr unless an Adobe marker
+    without a JFIF marker says they are untransformed RGB, or, without
+    either marker, their identifiers are "R", "G" and "B". Four (CMYK or
+    YCCK) have no luminance of the image.
+
+    Returns:
+        int: Index of the Y component in frame order, or None if there is none
+    """
+    if len(components) == 1:
+        return 0
+    if len(components) != 3:
+        return None
+
+    ids = [component["id"] for component in components]
+    if not jfif:
+        if adobe_transform is not None:
+            if adobe_transform == 0:
+                return None
+        elif ids == [ord("R"), ord("G"), ord("B")]:
+            return None
+    # Y is the first component in frame order, as libjpeg assumes
+    return 0
+
+
+def _read_quantization_tables(segment, tables):
+    """Parse a DQT segment; tables are stored in zigzag order"""
+    offset = 0
+    while offset < len(segment):
+        precision, table_id = segment[offset] >> 4, segment[offset] & 15
+        offset += 1
+        if precision:
+            tables[table_id] = np.frombuffer(segment[offset:offset + 128], dtype=">u2").astype(np.uint16)
+            offset += 128
+        else:
+            tables[table_id] = np.frombuffer(segment[offset:offset + 64], dtype=np.uint8).astype(np.uint16)
+            offset += 64
+
+
+def _read_huffman_tables(segment, tables):
+    """Parse a DHT segment into 16-bit lookup tables keyed by (class, id)"""
+    offset = 0
+    while offset < len(segment):
+        table_class, table_id = segment[offset] >> 4, segment[offset] & 15
+        counts = segment[offset + 1:offset + 17]
+        offset += 17
+        symbols = segment[offset:offset + sum(counts)]
+        offset += sum(counts)
+        tables[(table_class, table_id)] = _huffman_lookup(counts, symbols)
+
+
+@lru_cache(maxsize=64)
+def _huffman_lookup(counts, symbols):
+    """
+    Build the lookup tables of a canonical Huffman table
+
+    Most encoders use the standard tables, so the tables are cached by their
+    definition and shared between files.
+
+    Both tables are indexed by the next 16 bits of the stream. A fast entry
+    packs a whole decoded symbol, (value << 16) | (run << 8) | bits consumed,
+    and covers the codes whose extra bits also fit in the 16 bits; it is 0
+    for the other codes, which use the slow entry (code length << 8) | symbol.
+    DC symbols are plain sizes, so their run is 0.
+
+    Args:
+        counts (bytes): Number of codes of each length from 1 to 16
+        symbols (bytes): Symbols in code order
+
+    Returns:
+        tuple: (fast, slow) lists of 65536 entries; 0 marks bit patterns that start no code
+    """
+    lengths = np.zeros(65536, dtype=np.int64)
+    decoded = np.zeros(65536, dtype=np.int64)
+    code = 0
+    index = 0
+    for length in range(1, 17):
+        span = 1 << (16 - length)
+        number = counts[length - 1]
+        start = code * span
+        lengths[start:start + number * span] = length
+        decoded[start:start + number * span] = np.repeat(
+            np.frombuffer(symbols[index:index + number], dtype=np.uint8), span
+        )
+        code = (code + number) << 1
+        index += number
+
+    run = decoded >> 4
+    size = decoded & 15
+    consumed = lengths + size
+    extra = (np.arange(65536) >> np.maximum(16 - consumed, 0)) & ((1 << size) - 1)
+    value = np.where(extra < (1 << np.maximum(size - 1, 0)), extra - ((1 << size) - 1), extra)
+
+    fast = np.where((lengths > 0) & (consumed <= 16), (value << 16) | (run << 8) | consumed, 0)
+    slow = np.where(lengths > 0, (lengths << 8) | decoded, 0)
+    return fast.tolist(), slow.tolist()
+
+
+def _slow_entry(slow, window, offset):
+    """
+    Decode a symbol whose code and extra bits do not fit in 16 bits
+
+    Args:
+        slow (list): Slow lookup table
+        window (int): 40-bit window starting at the current byte
+        offset (int): Bit offset of the symbol in the window
+
+    Returns:
+        int: The symbol packed like a fast entry
+
+    Raises:
+        ValueError: If the bits start no code
+    """
+    entry = slow[(window >> (24 - offset)) & 0xFFFF]
+    length = entry >> 8
+    if not length:
+        raise ValueError("Corrupt JPEG: invalid Huffman code")
+    run = (entry >> 4) & 0x0F
+    size = entry & 0x0F
+    value = (window >> (40 - offset - length - size)) & ((1 << size) - 1)
+    if size and value < 1 << (size - 1):
+        value -= (1 << size) - 1
+    return (value << 16) | (run << 8) | (length + size)
+
+
+def _ceil_div(numerator, denominator):
+    """Integer division rounding up"""
+    return -(-numerator // denominator)
+
+
+def _read_frame(segment):
+    """Parse a baseline or extended sequential frame header"""
+    precision, height, width, count = struct.unpack(">BHHB", segment[:6])
+    if precision != 8:
+        raise NotImplementedError(f"Unsupported JPEG sample precision: {precision} bits")
+    if height == 0:
+        raise NotImplementedError("JPEG height defined by a DNL marker is not supported")
+
+    components = []
+    for index in range(count):
+        component_id, sampling, table = segment[6 + 3 * index:9 + 3 * index]
+        components.append({"id": component_id, "h": sampling >> 4, "v": sampling & 15, "table": table})
+
+    h_max = max(component["h"] for component in components)
+    v_max = max(component["v"] for component in components)
+    mcu_cols = _ceil_div(width, BLOCK_SIZE * h_max)
+    mcu_rows = _ceil_div(height, BLOCK_SIZE * v_max)
+    for component in components:
+        # Blocks covering the component, and the MCU-padded grid an interleaved scan fills
+        component["height"] = _ceil_div(height * component["v"], v_max)
+        component["width"] = _ceil_div(width * component["h"], h_max)
+        component["blocks"] = (_ceil_div(component["height"], BLOCK_SIZE),
+                               _ceil_div(component["width"], BLOCK_SIZE))
+        component["coefficients"] = np.zeros(
+            (mcu_rows * component["v"], mcu_cols * component["h"], 64), dtype=np.int16
+        )
+    return {"width": width, "height": height, "components": components,
+            "mcu_rows": mcu_rows, "mcu_cols": mcu_cols}
+
+
+def _decode_scan(frame, header, huffman, restart_interval, scan_data):
+    """
+    Entropy-decode one scan into the frame's coefficient arrays
+
+    Args:
+        frame (dict): Parsed frame header with the coefficient arrays
+        header (bytes): SOS segment
+        huffman (dict): Lookup tables keyed by (class, id)
+        restart_interval (int): MCUs per restart interval, 0 for none
+        scan_data (bytes): Entropy-coded data up to the next non-restart marker
+    """
+    count = header[0]
+    by_id = {component["id"]: component for component in frame["components"]}
+    scan_components = []
+    for index in range(count):
+        component_id, tables = header[1 + 2 * index:3 + 2 * index]
+        component = by_id[component_id]
+        try:
+            dc_table, ac_table = huffman[(0, tables >> 4)], huffman[(1, tables & 15)]
+        except KeyError:
+            raise ValueError("JPEG scan refers to an undefined Huffman table")
+        scan_components.append((component, dc_table, ac_table))
+
+    spectral_start, spectral_end = header[1 + 2 * count], header[2 + 2 * count]
+    if spectral_start != 0 or spectral_end != 63:
+        raise NotImplementedError("Spectral selection (progressive JPEG) is not supported")
+
+    # Block positions of one MCU, per component: (component index, row, column)
+    if count == 1:
+        # A single-component scan is not interleaved: one block per MCU
+        component = scan_components[0][0]
+        rows, cols = component["blocks"]
+        mcu_layout = [(0, 0, 0)]
+        mcu_rows, mcu_cols = rows, cols
+        block_steps = [(1, 1)]
+    else:
+        mcu_layout = [(index, y, x)
+                      for index, (component, _, _) in enumerate(scan_components)
+                      for y in range(component["v"]) for x in range(component["h"])]
+        mcu_rows, mcu_cols = frame["mcu_rows"], frame["mcu_cols"]
+        block_steps = [(component["v"], component["h"]) for component, _, _ in scan_components]
+
+    total_mcus = mcu_rows * mcu_cols
+    interval = restart_interval or total_mcus
+    segments = RESTART.split(scan_data) if restart_interval else [scan_data]
+
+    entries = [array("q") for _ in scan_components]
+    widths = [component["coefficients"].shape[1] for component, _, _ in scan_components]
+
+    mcu = 0
+    for segment in segments:
+        if mcu >= total_mcus:
+            break
+        mcus = min(interval, total_mcus - mcu)
+        try:
+            _decode_interval(
+                segment.replace(b"\xff\x00", b"\xff"), mcu, mcus, mcu_cols, mcu_layout, block_steps,
+                scan_components, widths, entries
+            )
+        except IndexError:
+            raise ValueError("Corrupt JPEG: entropy-coded data ended early")
+        mcu += mcus
+
+    # Scatter the zigzag-ordered values into the natural-order coefficient arrays
+    for index, (component, _, _) in enumerate(scan_components):
+        packed = np.frombuffer(entries[index], dtype=np.int64)
+        if packed.size:
+            flat = packed >> 16
+            natural = flat // 64 * 64 + ZIGZAG[flat % 64]
+            component["coefficients"].reshape(-1)[natural] = (packed & 0xFFFF).astype(np.uint16).view(np.int16)
+
+
+def _decode_interval(data, first_mcu, mcus, mcu_cols, mcu_layout, block_steps, scan_components,
+                     widths, entries):
+    """
+    Decode the MCUs of one restart interval
+
+    Non-zero coefficients are appended to entries per scan component, packed
+    as (flat block index * 64 + zigzag index) << 16 | (value & 0xFFFF).
+    """
+    padded = np.frombuffer(data + b"\x00" * (WINDOW_BYTES + 8), dtype=np.uint8).astype(np.uint64)
+    count = len(data) + 8
+    windows = padded[:count] << 32
+    for shift in range(1, WINDOW_BYTES):
+        windows |= padded[shift:count + shift] << np.uint64(8 * (WINDOW_BYTES - 1 - shift))
+    windows = windows.tolist()
+    limit = len(data) * 8
+
+    predictions = [0] * len(scan_components)
+    bit = 0
+
+    for mcu in range(first_mcu, first_mcu + mcus):
+        mcu_row, mcu_col = divmod(mcu, mcu_cols)
+        if mcu_col == 0:
+            checkpoint()
+        for index, y, x in mcu_layout:
+            step_y, step_x = block_steps[index]
+            base = ((mcu_row * step_y + y) * widths[index] + mcu_col * step_x + x) * 64
+            append = entries[index].append
+            _, (dc_fast, dc_slow), (ac_fast, ac_slow) = scan_components[index]
+
+            # DC difference
+            window = windows[bit >> 3]
+            entry = dc_fast[(window >> (24 - (bit & 7))) & 0xFFFF]
+            if not entry:
+                entry = _slow_entry(dc_slow, window, bit & 7)
+            bit += entry & 0xFF
+            value = (entry >> 16) + predictions[index]
+            predictions[index] = value
+            if value:
+                append(base << 16 | (value & 0xFFFF))
+
+            # AC coefficients: (run of zeros, value) symbols up to the end of block
+            k = 1
+            while k < 64:
+                window = windows[bit >> 3]
+                entry = ac_fast[(window >> (24 - (bit & 7))) & 0xFFFF]
+                if not entry:
+                    entry = _slow_entry(ac_slow, window, bit & 7)
+                bit += entry & 0xFF
+                value = entry >> 16
+                if value:
+                    k += (entry >> 8) & 0xFF
+                    append((base + k) << 16 | (value & 0xFFFF))
+                    k += 1
+                elif entry & 0xF00:
+                    # Sixteen zeros
+                    k += 16
+                else:
+                    # End of block
+                    break
+
+        if bit > limit:
+            raise ValueError("Corrupt JPEG: entropy-coded data ended early")
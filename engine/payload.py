@@ -0,0 +1,106 @@
+"""
+Length-prefixed payload format for the StegnoX encoders
+
+A framed payload starts with a fixed header: magic, format version, flags,
+payload length and CRC-32 of the payload. Extraction reads the header bits,
+then exactly length bytes, with no terminator search, and payloads may hold
+any bytes. The legacy format, a UTF-8 message followed by the "####"
+terminator, is still recognized whenever the header is absent.
+"""
+
+import base64
+import struct
+import zlib
+
+# Header layout: magic, version, flags, payload length, CRC-32 of the payload
+PAYLOAD_MAGIC = b"SGNX"
+PAYLOAD_VERSION = 1
+HEADER_FORMAT = ">4sBBII"
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+HEADER_BITS = HEADER_SIZE * 8
+
+# Header flag: the payload is binary data rather than UTF-8 text
+FLAG_BINARY = 1
+
+# Payload formats accepted by the encoders
+PAYLOAD_FORMATS = ("framed", "legacy")
+
+
+def message_bytes(message):
+    """
+    Encode a message for embedding
+
+    Args:
+        message (str or bytes-like): Text, encoded as UTF-8, or binary data
+
+    Returns:
+        tuple: (data bytes, True if the message is binary)
+    """
+    if isinstance(message, str):
+        return message.encode(), False
+    return bytes(message), True
+
+
+def frame_payload(data, binary=False):
+    """
+    Prefix a payload with its header
+
+    Args:
+        data (bytes): Payload
+        binary (bool): Mark the payload as binary data
+
+    Returns:
+        bytes: Header followed by the payload
+    """
+    flags = FLAG_BINARY if binary else 0
+    header = struct.pack(HEADER_FORMAT, PAYLOAD_MAGIC, PAYLOAD_VERSION, flags, len(data), zlib.crc32(data))
+    return header + data
+
+
+def parse_header(header, max_length=None):
+    """
+    Parse a payload header
+
+    Args:
+        header (bytes): At least HEADER_SIZE leading bytes of the embedded stream
+        max_length (int, optional): Largest payload length that fits in the cover
+
+    Returns:
+        dict: version, binary, length and crc, or None if the bytes are not a
+            header this version understands (e.g. a legacy payload)
+    """
+    if len(header) < HEADER_SIZE:
+        return None
+    magic, version, flags, length, crc = struct.unpack(HEADER_FORMAT, bytes(header[:HEADER_SIZE]))
+    if magic != PAYLOAD_MAGIC or version != PAYLOAD_VERSION:
+        return None
+    if max_length is not None and length > max_length:
+        return None
+    return {"version": version, "binary": bool(flags & FLAG_BINARY), "length": length, "crc": crc}
+
+
+def payload_report(header, payload):
+    """
+    Build the extraction result of a framed payload
+
+    Args:
+        header (dict): Parsed header
+        payload (bytes): The length bytes following the header
+
+    Returns:
+        dict: message (the text, or a description of binary data), format,
+            length, and the base64 data of binary payloads; a checksum
+            mismatch is reported with corrupted set
+    """
+    result = {"format": "framed", "length": header["length"]}
+    if zlib.crc32(payload) != header["crc"]:
+        result.update({"message": "Payload found but its checksum does not match", "corrupted": True})
+    elif header["binary"]:
+        result.update({
+            "message": f"Binary payload of {len(payload)} bytes",
+            "binary": True,
+            "data": base64.b64encode(payload).decode("ascii")
+        })
+    else:
+        result["message"] = payload.decode("utf-8", errors="replace")
+    return result
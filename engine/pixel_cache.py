@@ -0,0 +1,257 @@
+"""
+Decoded pixel cache for the StegnoX engine
+
+Each image is decoded once into a canonical RGB array that is stored as a
+``.npy`` file, with a small JSON header, under the SHA-256 of its encoded
+bytes. The alpha and 16-bit bands the RGB form does not carry are stored
+beside it as a second array. Later analyses memory-map the array instead of decoding the image
+again, so only the pages a method touches are read from disk. Entries live
+in a shared directory, so the backend, workers and the desktop application
+can all reuse them; the directory is kept under a size limit by evicting
+the least recently used entries.
+"""
+
+import os
+import json
+import uuid
+import hashlib
+from io import BytesIO
+
+import numpy as np
+from PIL import Image
+
+from .bands import extra_bands, has_extra_bands, native_array
+
+# Default size limit of a pixel cache directory
+DEFAULT_CACHE_BYTES = 2 * 1024 * 1024 * 1024
+
+
+def content_key(data):
+    """
+    Compute the cache key of an encoded image
+
+    Args:
+        data (bytes): Encoded image file contents
+
+    Returns:
+        str: Hex SHA-256 digest
+    """
+    return hashlib.sha256(data).hexdigest()
+
+
+def file_content_key(stream, chunk_size=1 << 20):
+    """
+    Compute the cache key of an encoded image without reading it into memory
+
+    Args:
+        stream: Binary file object positioned at the start of the image
+        chunk_size (int): Bytes read at a time
+
+    Returns:
+        str: Hex SHA-256 digest, the same as content_key of the contents
+    """
+    digest = hashlib.sha256()
+    for chunk in iter(lambda: stream.read(chunk_size), b""):
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+class PixelCache:
+    """Size-bounded directory of decoded RGB arrays keyed by content hash"""
+
+    def __init__(self, cache_dir, max_bytes=DEFAULT_CACHE_BYTES):
+        """
+        Initialize the cache
+
+        Args:
+            cache_dir (str): Directory holding the cached arrays
+            max_bytes (int): Size limit of the directory; older entries are evicted above it
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _paths(self, key):
+        """Return the array, header and extra band paths of an entry"""
+        base = os.path.join(self.cache_dir, key)
+        return base + ".npy", base + ".json", base + ".bands.npy"
+
+    def get(self, key):
+        """
+        Open a cached array
+
+        Args:
+            key (str): Content hash of the encoded image
+
+        Returns:
+            tuple: (read-only memory-mapped (H, W, 3) uint8 array, header dict),
+                or None if the image is not cached
+        """
+        array_path, header_path, _ = self._paths(key)
+        try:
+            with open(header_path, 'r') as f:
+                header = json.load(f)
+            header.pop("bands", None)
+            pixels = np.load(array_path, mmap_mode='r')
+        except (OSError, ValueError):
+            return None
+
+        # Mark the entry as recently used
+        try:
+            os.utime(header_path)
+        except OSError:
+            pass
+
+        header["size"] = tuple(header["size"])
+        return pixels, header
+
+    def get_bands(self, key):
+        """
+        Open the cached extra bands of an image
+
+        Args:
+            key (str): Content hash of the encoded image
+
+        Returns:
+            list: (band name, read-only memory-mapped plane) pairs, as
+                ImageContext.extra_bands returns them, or None if the entry has
+                no stored bands
+        """
+        _, header_path, bands_path = self._paths(key)
+        try:
+            with open(header_path, 'r') as f:
+                names = json.load(f).get("bands")
+            if names is None:
+                return None
+            planes = np.load(bands_path, mmap_mode='r')
+        except (OSError, ValueError):
+            return None
+        return [(name, planes[..., index]) for index, name in enumerate(names)]
+
+    def put(self, key, pixels, header, bands=None):
+        """
+        Store a decoded array
+
+        Files are written under temporary names and renamed into place, the
+        header last, so concurrent readers never see a partial entry.
+
+        Args:
+            key (str): Content hash of the encoded image
+            pixels (numpy.ndarray): (H, W, 3) uint8 RGB array
+            header (dict): Image header information (format, mode, size)
+            bands (list, optional): (band name, plane) pairs of the alpha and
+                16-bit bands, as ImageContext.extra_bands returns them
+        """
+        array_path, header_path, bands_path = self._paths(key)
+        suffix = f".{uuid.uuid4().hex}.tmp"
+
+        with open(array_path + suffix, 'wb') as f:
+            np.save(f, np.ascontiguousarray(pixels))
+        os.replace(array_path + suffix, array_path)
+
+        entry = {
+            "format": header.get("format"),
+            "mode": header.get("mode"),
+            "size": list(header["size"])
+        }
+        if bands:
+            with open(bands_path + suffix, 'wb') as f:
+                np.save(f, np.stack([plane for _, plane in bands], axis=-1))
+            os.replace(bands_path + suffix, bands_path)
+            entry["bands"] = [name for name, _ in bands]
+
+        with open(header_path + suffix, 'w') as f:
+            json.dump(entry, f)
+        os.replace(header_path + suffix, header_path)
+
+        self.evict()
+
+    def add(self, data):
+        """
+        Decode an encoded image and store it unless it is already cached
+
+        Args:
+            data (bytes): Encoded image file contents
+
+        Returns:
+            str: The content hash the image is cached under
+        """
+        key = content_key(data)
+        array_path, header_path, _ = self._paths(key)
+        if os.path.exists(array_path) and os.path.exists(header_path):
+            os.utime(header_path)
+            return key
+
+        with Image.open(BytesIO(data)) as img:
+            header = {"format": img.format, "mode": img.mode, "size": img.size}
+            bands = extra_bands(native_array(img), img.mode) if has_extra_bands(img.mode) else None
+            pixels = np.asarray(img.convert("RGB"))
+        self.put(key, pixels, header, bands)
+        return key
+
+    def entries(self):
+        """
+        List the cached entries
+
+        Returns:
+            list: (key, size in bytes, last use time) tuples, least recently used first
+        """
+        entries = []
+        for filename in os.listdir(self.cache_dir):
+            if not filename.endswith(".json"):
+                continue
+            key = filename[:-len(".json")]
+            array_path, header_path, bands_path = self._paths(key)
+            try:
+                size = os.path.getsize(array_path) + os.path.getsize(header_path)
+                last_used = os.path.getmtime(header_path)
+            except OSError:
+                continue
+            if os.path.exists(bands_path):
+                size += os.path.getsize(bands_path)
+            entries.append((key, size, last_used))
+
+        entries.sort(key=lambda entry: entry[2])
+        return entries
+
+    def size(self):
+        """
+        Total size of the cached entries
+
+        Returns:
+            int: Size in bytes
+        """
+        return sum(size for _, size, _ in self.entries())
+
+    def evict(self):
+        """
+        Remove least recently used entries until the cache fits its size limit
+
+        Returns:
+            int: Number of entries removed
+        """
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+
+        for key, size, _ in entries:
+            if total <= self.max_bytes:
+                break
+            for path in self._paths(key):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            total -= size
+            removed += 1
+
+        return removed
+
+    def clear(self):
+        """Remove every cached entry"""
+        for key, _, _ in self.entries():
+            for path in self._paths(key):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
@@ -0,0 +1,252 @@
+"""
+Row-streaming PNG decoding for the StegnoX engine
+
+PNG stores its rows top to bottom in one zlib stream, so the first rows of
+a non-interlaced file can be decoded without reading the rest of it. The
+stream is inflated only up to the rows requested, and those rows are
+re-wrapped as a small PNG of the same type for PIL to unfilter and convert,
+so the pixels match a full decode exactly. The same re-wrapping decodes a
+whole image band by band for tiled analysis.
+"""
+
+import struct
+import zlib
+from io import BytesIO
+
+import numpy as np
+from PIL import Image
+
+from .bands import native_array
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+# Samples per pixel of each PNG colour type
+CHANNELS = {0: 1, 2: 3, 3: 1, 4: 2, 6: 4}
+
+
+def _chunk(chunk_type, data):
+    """Serialize one PNG chunk"""
+    return struct.pack(">I", len(data)) + chunk_type + data + struct.pack(">I", zlib.crc32(chunk_type + data))
+
+
+def find_chunk(stream, chunk_type):
+    """
+    Find a chunk of a PNG without inflating its image data
+
+    The chunks are walked by their lengths, seeking past the data of the
+    chunks that are not wanted.
+
+    Args:
+        stream: Seekable binary file object positioned at the start of the PNG
+        chunk_type (bytes): Four-letter chunk type, e.g. b"eXIf"
+
+    Returns:
+        bytes: Data of the first chunk of that type, or None if there is none
+    """
+    if stream.read(len(PNG_SIGNATURE)) != PNG_SIGNATURE:
+        raise ValueError("Not a PNG file")
+    while True:
+        head = stream.read(8)
+        if len(head) < 8:
+            return None
+        length, found = struct.unpack(">I4s", head)
+        if found == chunk_type:
+            return stream.read(length)
+        if found == b"IEND":
+            return None
+        stream.seek(length + 4, 1)  # data and CRC
+
+
+class PngRowStream:
+    """Decodes the leading rows of a non-interlaced PNG, reading only as much of the file as they need"""
+
+    def __init__(self, stream):
+        """
+        Read the header chunks up to the first image data chunk
+
+        Args:
+            stream: Binary file object positioned at the start of the PNG
+
+        Raises:
+            ValueError: If the data is not a PNG
+            NotImplementedError: If the PNG is interlaced
+        """
+        self.stream = stream
+        if stream.read(len(PNG_SIGNATURE)) != PNG_SIGNATURE:
+            raise ValueError("Not a PNG file")
+
+        chunk_type, data = self._read_chunk()
+        if chunk_type != b"IHDR":
+            raise ValueError("PNG file does not start with an IHDR chunk")
+        self.width, self.height, self.bit_depth, self.color_type, _, _, interlace = struct.unpack(">IIBBBBB", data)
+        if interlace:
+            raise NotImplementedError("Interlaced PNG rows are not stored in order")
+        if self.color_type not in CHANNELS:
+            raise ValueError(f"Unknown PNG colour type: {self.color_type}")
+
+        # Alpha, or 16-bit grayscale samples that PIL keeps at full depth
+        self.has_extra_bands = self.color_type in (4, 6) or (self.color_type == 0 and self.bit_depth == 16)
+
+        # Each row is a filter type byte followed by the packed samples
+        self.row_bytes = 1 + (self.width * CHANNELS[self.color_type] * self.bit_depth + 7) // 8
+
+        # Chunks such as PLTE and tRNS that the decoded pixels depend on
+        self.ancillary = []
+        while True:
+            chunk_type, data = self._read_chunk()
+            if chunk_type == b"IDAT":
+                self._next_data = data
+                break
+            if chunk_type == b"IEND":
+                raise ValueError("PNG file has no image data")
+            self.ancillary.append(_chunk(chunk_type, data))
+
+        self._inflater = zlib.decompressobj()
+        self._raw = bytearray()
+        self._data_done = False
+        # Band decoding state: rows returned so far and the last one, unfiltered
+        self._rows_done = 0
+        self._previous_row = None
+
+    def _read_chunk(self):
+        """Read the next chunk's type and data"""
+        head = self.stream.read(8)
+        if len(head) < 8:
+            raise ValueError("PNG file is truncated")
+        length, chunk_type = struct.unpack(">I4s", head)
+        data = self.stream.read(length)
+        self.stream.read(4)  # CRC
+        if len(data) < length:
+            raise ValueError("PNG file is truncated")
+        return chunk_type, data
+
+    def _next_compressed(self):
+        """Return the next piece of the zlib stream, or None after the last image data chunk"""
+        if self._inflater.unconsumed_tail:
+            return self._inflater.unconsumed_tail
+        if self._next_data is not None:
+            data, self._next_data = self._next_data, None
+            return data
+        if self._data_done:
+            return None
+        chunk_type, data = self._read_chunk()
+        if chunk_type != b"IDAT":
+            self._data_done = True
+            return None
+        return data
+
+    def _inflate(self, size):
+        """Inflate image data until at least size raw bytes are buffered or the data ends"""
+        while len(self._raw) < size:
+            data = self._next_compressed()
+            if data is None:
+                break
+            self._raw += self._inflater.decompress(data, size - len(self._raw))
+
+    def _decode(self, raw, rows):
+        """Decode filtered raw rows of the image, re-wrapped as a small PNG"""
+        header = struct.pack(">IIBBBBB", self.width, rows, self.bit_depth, self.color_type, 0, 0, 0)
+        png = b"".join([
+            PNG_SIGNATURE,
+            _chunk(b"IHDR", header),
+            *self.ancillary,
+            _chunk(b"IDAT", zlib.compress(bytes(raw), 0)),
+            _chunk(b"IEND", b"")
+        ])
+        return Image.open(BytesIO(png))
+
+    def read_rows(self, rows):
+        """
+        Decode the first rows of the image
+
+        Args:
+            rows (int): Number of leading rows wanted
+
+        Returns:
+            numpy.ndarray: (min(rows, height), W, 3) uint8 RGB array, as
+                Image.convert("RGB") of the whole image would give
+        """
+        rows = min(rows, self.height)
+        self._inflate(rows * self.row_bytes)
+        rows = min(rows, len(self._raw) // self.row_bytes)
+        if rows == 0:
+            return np.empty((0, self.width, 3), dtype=np.uint8)
+
+        with self._decode(self._raw[:rows * self.row_bytes], rows) as img:
+            return np.asarray(img.convert("RGB"))
+
+    @property
+    def streams_bands(self):
+        """True if iter_bands supports the image: 8-bit samples, or 16-bit grayscale"""
+        return self.bit_depth == 8 or (self.bit_depth == 16 and self.color_type == 0)
+
+    def _unfiltered_row(self, native_row):
+        """Serialize a decoded row back into PNG samples, preceded by the "no filter" type byte"""
+        if self.bit_depth == 16:
+            data = native_row.astype(">u2").tobytes()
+        else:
+            data = native_row.tobytes()
+        if len(data) != self.row_bytes - 1:
+            raise NotImplementedError("The decoded layout does not match the PNG samples")
+        return b"\x00" + data
+
+    def next_band(self, rows):
+        """
+        Decode the next rows of the image, continuing where the last band ended
+
+        The rows of a band may be filtered against the row above them, so each
+        band is decoded together with that row, written back without a
+        filter. Bands cannot be mixed with read_rows on one stream.
+
+        Args:
+            rows (int): Rows wanted; fewer are returned at the end of the image
+
+        Returns:
+            tuple: (native, rgb) arrays of the band: the rows in PIL's layout of
+                the image mode, and as (rows, W, 3) uint8 RGB
+
+        Raises:
+            NotImplementedError: If the sample layout is not supported (see streams_bands)
+            ValueError: If the image data ends early or has no rows left
+        """
+        if not self.streams_bands:
+            raise NotImplementedError(f"Bands of {self.bit_depth}-bit PNG samples are not streamed")
+        count = min(rows, self.height - self._rows_done)
+        if count <= 0:
+            raise ValueError("No PNG rows are left")
+
+        self._inflate(count * self.row_bytes)
+        if len(self._raw) < count * self.row_bytes:
+            raise ValueError("PNG image data is truncated")
+        raw = self._raw[:count * self.row_bytes]
+        del self._raw[:count * self.row_bytes]
+
+        previous = self._previous_row
+        if previous is not None:
+            raw = previous + raw
+        with self._decode(raw, count + (previous is not None)) as img:
+            native = native_array(img)
+            rgb = np.asarray(img.convert("RGB"))
+        if previous is not None:
+            native, rgb = native[1:], rgb[1:]
+
+        self._previous_row = self._unfiltered_row(native[-1])
+        self._rows_done += count
+        return native, rgb
+
+    def iter_bands(self, rows):
+        """
+        Decode the rest of the image band by band, holding only one band's data
+
+        Args:
+            rows (int): Rows per band
+
+        Yields:
+            tuple: (native, rgb) arrays of each band, as next_band returns them
+
+        Raises:
+            NotImplementedError: If the sample layout is not supported (see streams_bands)
+            ValueError: If the image data ends early
+        """
+        while self._rows_done < self.height:
+            yield self.next_band(rows)
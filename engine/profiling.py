@@ -0,0 +1,224 @@
+"""
+Per-method instrumentation for the StegnoX engine
+
+In profiling mode extract_all_methods measures each method it runs: wall
+time, CPU time of the running thread and pixels processed per second. With
+memory tracing also requested it records the peak of Python-traced memory
+(NumPy arrays included; allocations inside OpenCV and Pillow are not
+traced). The measurements are attached to the results and passed to a
+metrics sink, any callable taking the method name and its profile;
+MetricsAggregator is one that keeps running totals.
+
+tracemalloc traces every thread of the process, so while it runs all other
+work in the process is slowed and counted too. It is therefore only started
+for calls that ask for memory tracing, and stopped when the last of them ends.
+"""
+
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+
+# tracemalloc is started by the first profiled call and stopped by the last
+_tracing_lock = threading.Lock()
+_tracing_users = 0
+_tracing_owned = False
+
+# The traced peak is process-wide, so memory-traced calls are measured one at a time
+_measure_lock = threading.Lock()
+
+
+@contextmanager
+def memory_tracing():
+    """
+    Keep tracemalloc running for the enclosed code
+
+    Tracing that was already started elsewhere is left running afterwards.
+    """
+    global _tracing_users, _tracing_owned
+    with _tracing_lock:
+        if _tracing_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _tracing_owned = True
+        _tracing_users += 1
+    try:
+        yield
+    finally:
+        with _tracing_lock:
+            _tracing_users -= 1
+            if _tracing_users == 0 and _tracing_owned:
+                tracemalloc.stop()
+                _tracing_owned = False
+
+
+def profile_call(function, pixels, *args, trace_memory=False, **kwargs):
+    """
+    Call a function and measure it
+
+    The memory peak is measured with tracemalloc.reset_peak, which needs
+    Python 3.9; on older versions, and without trace_memory, it is reported
+    as None. reset_peak resets the one peak of the process, so traced calls
+    hold a module lock and run one at a time. Allocations of other,
+    untraced threads still count towards the peak.
+
+    Args:
+        function (callable): The function
+        pixels (int): Pixels the call processes, for the throughput; 0 if unknown
+        *args: Positional arguments of the function
+        trace_memory (bool): Run tracemalloc during the call to measure its memory peak
+        **kwargs: Keyword arguments of the function
+
+    Returns:
+        tuple: (the function's return value, profile dict with wall_time and
+            cpu_time in seconds, pixels, pixels_per_second and peak_memory in bytes)
+    """
+    reset_peak = getattr(tracemalloc, "reset_peak", None) if trace_memory else None
+    with _measure_lock if reset_peak is not None else nullcontext(), \
+            memory_tracing() if reset_peak is not None else nullcontext():
+        if reset_peak is not None:
+            reset_peak()
+            memory_before = tracemalloc.get_traced_memory()[0]
+        cpu_start = time.thread_time()
+        wall_start = time.perf_counter()
+
+        result = function(*args, **kwargs)
+
+        wall_time = time.perf_counter() - wall_start
+        cpu_time = time.thread_time() - cpu_start
+        if reset_peak is not None:
+            peak = tracemalloc.get_traced_memory()[1]
+
+    return result, {
+        "wall_time": wall_time,
+        "cpu_time": cpu_time,
+        "pixels": pixels,
+        "pixels_per_second": pixels / wall_time if pixels and wall_time > 0 else None,
+        "peak_memory": max(0, peak - memory_before) if reset_peak is not None else None
+    }
+
+
+class ProfileRecorder:
+    """Collects the profiles of one extract_all_methods call and forwards them to a sink"""
+
+    def __init__(self, pixels, sink=None, trace_memory=False):
+        """
+        Initialize the recorder
+
+        Args:
+            pixels (int): Pixels in the image, 0 if unknown
+            sink (callable, optional): Called as sink(name, profile) for every measured method
+            trace_memory (bool): Measure the memory peak of each method with tracemalloc
+        """
+        self.pixels = pixels
+        self.sink = sink
+        # Without reset_peak (Python 3.8) there is no peak to measure, so nothing is traced
+        self.trace_memory = trace_memory and hasattr(tracemalloc, "reset_peak")
+        self.methods = {}
+        self.lock = threading.Lock()
+
+    def measure(self, name, function, *args, **kwargs):
+        """
+        Call a function, recording its profile under a name
+
+        Args:
+            name (str): Name the profile is recorded under
+            function (callable): The function
+            *args: Positional arguments of the function
+            **kwargs: Keyword arguments of the function
+
+        Returns:
+            The function's return value
+        """
+        result, profile = profile_call(function, self.pixels, *args, trace_memory=self.trace_memory, **kwargs)
+        with self.lock:
+            self.methods[name] = profile
+        if self.sink is not None:
+            try:
+                self.sink(name, profile)
+            except Exception:
+                # A failing sink must not fail the analysis
+                pass
+        return result
+
+    def wrap(self, name, method):
+        """
+        Wrap a bound method so each call is measured
+
+        Args:
+            name (str): Method name
+            method (callable): Bound method, called as method(image, cancel=...)
+
+        Returns:
+            callable: The measured method
+        """
+        def run(image, cancel=None):
+            return self.measure(name, method, image, cancel=cancel)
+
+        return run
+
+
+class MetricsAggregator:
+    """Metrics sink that keeps per-method totals of method profiles"""
+
+    def __init__(self):
+        """Initialize empty totals"""
+        self.methods = {}
+        self.lock = threading.Lock()
+
+    def __call__(self, name, profile):
+        """Record one profile; the aggregator is itself a sink"""
+        self.record(name, profile)
+
+    def record(self, name, profile):
+        """
+        Add one method run to the totals
+
+        Args:
+            name (str): Method name
+            profile (dict): Profile from profile_call
+        """
+        with self.lock:
+            totals = self.methods.setdefault(name, {
+                "count": 0,
+                "wall_time": 0.0,
+                "cpu_time": 0.0,
+                "pixels": 0,
+                "max_wall_time": 0.0,
+                "max_peak_memory": None
+            })
+            totals["count"] += 1
+            totals["wall_time"] += profile["wall_time"]
+            totals["cpu_time"] += profile["cpu_time"]
+            totals["pixels"] += profile["pixels"] or 0
+            totals["max_wall_time"] = max(totals["max_wall_time"], profile["wall_time"])
+            if profile["peak_memory"] is not None:
+                totals["max_peak_memory"] = max(totals["max_peak_memory"] or 0, profile["peak_memory"])
+
+    def summary(self):
+        """
+        Summarize the recorded runs
+
+        Returns:
+            dict: Per method: count, total and mean wall_time, total cpu_time,
+                max_wall_time, pixels_per_second over all runs and max_peak_memory,
+                with methods ordered by total wall time, largest first
+        """
+        with self.lock:
+            methods = sorted(self.methods.items(), key=lambda item: -item[1]["wall_time"])
+            return {
+                name: {
+                    "count": totals["count"],
+                    "wall_time": totals["wall_time"],
+                    "mean_wall_time": totals["wall_time"] / totals["count"],
+                    "max_wall_time": totals["max_wall_time"],
+                    "cpu_time": totals["cpu_time"],
+                    "pixels_per_second": totals["pixels"] / totals["wall_time"] if totals["wall_time"] > 0 else None,
+                    "max_peak_memory": totals["max_peak_memory"]
+                }
+                for name, totals in methods
+            }
+
+    def reset(self):
+        """Clear the totals"""
+        with self.lock:
+            self.methods = {}
@@ -0,0 +1,140 @@
+"""
+Analysis method registry for the StegnoX engine
+
+Every detector registers itself with its name, the modules it depends on, a
+relative cost class and a result version. The engine builds its method list
+from the registry, so new detectors plug in without touching the engine, and
+a detector's dependencies are imported the first time it runs rather than
+when the engine is imported. Registered methods accept a cancel keyword: a
+CancellationToken, a threading.Event or a timeout in seconds.
+"""
+
+import functools
+import importlib
+import threading
+
+from .cancellation import run_cancellable
+
+# Relative cost classes, cheapest first
+COST_CHEAP = 1
+COST_MODERATE = 2
+COST_EXPENSIVE = 3
+
+
+class MethodInfo:
+    """Declaration of one analysis method"""
+
+    def __init__(self, name, function, dependencies=(), cost=COST_MODERATE, version=1):
+        """
+        Initialize the declaration
+
+        Args:
+            name (str): Method name, used as the result key
+            function (callable): Called as function(engine, image, cancel=None) with an image
+                path or context
+            dependencies (tuple): Modules imported before the first run
+            cost (int): Relative cost class, one of COST_CHEAP, COST_MODERATE, COST_EXPENSIVE
+            version (int): Result version; bump it when the method's output changes
+        """
+        self.name = name
+        self.function = function
+        self.dependencies = tuple(dependencies)
+        self.cost = cost
+        self.version = version
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def load_dependencies(self):
+        """
+        Import the method's dependencies once
+
+        Raises:
+            ImportError: If a dependency is not installed
+        """
+        if self._loaded:
+            return
+        with self._lock:
+            if not self._loaded:
+                for module_name in self.dependencies:
+                    importlib.import_module(module_name)
+                self._loaded = True
+
+
+# Registered methods in registration order
+_REGISTRY = {}
+
+
+def register_method(name=None, dependencies=(), cost=COST_MODERATE, version=1):
+    """
+    Decorator that registers an analysis method
+
+    Engine methods are registered from the class body; functions defined
+    elsewhere take the engine as their first argument. The registered function
+    gains a cancel keyword and runs under that cancellation token.
+
+    Args:
+        name (str, optional): Method name; defaults to the function name
+        dependencies (tuple): Modules imported before the first run
+        cost (int): Relative cost class
+        version (int): Result version
+
+    Returns:
+        callable: Decorator returning the cancellable function
+    """
+    def decorator(function):
+        method_name = name or function.__name__
+
+        @functools.wraps(function)
+        def cancellable(*args, cancel=None, **kwargs):
+            return run_cancellable(function, cancel, *args, **kwargs)
+
+        _REGISTRY[method_name] = MethodInfo(method_name, cancellable, dependencies, cost, version)
+        return cancellable
+
+    return decorator
+
+
+def unregister_method(name):
+    """
+    Remove a registered method
+
+    Args:
+        name (str): Method name
+
+    Returns:
+        MethodInfo: The removed declaration, or None if no method has that name
+    """
+    return _REGISTRY.pop(name, None)
+
+
+def get_method_info(name):
+    """
+    Look up a registered method
+
+    Args:
+        name (str): Method name
+
+    Returns:
+        MethodInfo: The declaration, or None if no method has that name
+    """
+    return _REGISTRY.get(name)
+
+
+def registered_methods():
+    """
+    List the registered methods
+
+    Returns:
+        list: MethodInfo declarations in registration order
+    """
+    return list(_REGISTRY.values())
+
+
+def method_versions():
+    """
+    Get the current result version of every registered method
+
+    Returns:
+        dict: Version keyed by method name
+    """
+    return {info.name: info.version for info in _REGISTRY.values()}
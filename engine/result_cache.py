@@ -0,0 +1,252 @@
+"""
+Analysis result cache for the StegnoX engine
+
+Results are stored as small JSON files keyed by the SHA-256 of the encoded
+image, the method name and the method version, so repeat uploads, re-run
+jobs and batch reruns of the same content skip the analysis. Bumping a
+method's version makes only that method's entries unreachable. The directory
+can be shared by the backend, workers and the desktop application and is
+kept under a size limit by evicting the least recently used entries.
+
+Extracted messages are stored as a preview of at most MAX_CACHED_MESSAGE
+characters. On a clean image lsb_extraction returns the LSBs of the whole
+image as its message, megabytes of noise that would otherwise fill the cache.
+"""
+
+import os
+import json
+import uuid
+import threading
+
+# Default size limit of a result cache directory
+DEFAULT_RESULT_CACHE_BYTES = 256 * 1024 * 1024
+
+# Longest message a cached result keeps; longer ones are cut and flagged "truncated"
+MAX_CACHED_MESSAGE = 4096
+
+
+def cap_messages(result, limit=MAX_CACHED_MESSAGE):
+    """
+    Cut the messages of a result to a preview
+
+    Args:
+        result (dict): Method result; nested results, such as per-band entries, are capped too
+        limit (int): Longest message kept, in characters
+
+    Returns:
+        dict: The result, copied where a message was cut, with "truncated": True
+            next to each cut message
+    """
+    capped = {}
+    for name, value in result.items():
+        if isinstance(value, dict):
+            value = cap_messages(value, limit)
+        elif name == "message" and isinstance(value, str) and len(value) > limit:
+            value = value[:limit]
+            capped["truncated"] = True
+        capped[name] = value
+    return capped
+
+
+class ResultCache:
+    """Size-bounded directory of analysis results with hit and miss counters"""
+
+    def __init__(self, cache_dir, max_bytes=DEFAULT_RESULT_CACHE_BYTES):
+        """
+        Initialize the cache
+
+        Args:
+            cache_dir (str): Directory holding the cached results
+            max_bytes (int): Size limit of the directory; older entries are evicted above it
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        self._size = None
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def __getstate__(self):
+        """Pickle the configuration only; counters are per process"""
+        return {"cache_dir": self.cache_dir, "max_bytes": self.max_bytes}
+
+    def __setstate__(self, state):
+        """Restore a cache with fresh counters"""
+        self.__init__(state["cache_dir"], state["max_bytes"])
+
+    def _path(self, key, method, version):
+        """Return the file path of an entry"""
+        return os.path.join(self.cache_dir, f"{key}.{method}.v{version}.json")
+
+    def get(self, key, method, version):
+        """
+        Look up a cached result
+
+        Args:
+            key (str): Content hash of the encoded image
+            method (str): Method name
+            version (int): Method version
+
+        Returns:
+            dict: The cached result, or None on a miss
+        """
+        path = self._path(key, method, version)
+        try:
+            with open(path, 'r') as f:
+                result = json.load(f)
+        except (OSError, ValueError):
+            with self.lock:
+                self.misses += 1
+            return None
+
+        # Mark the entry as recently used
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+        with self.lock:
+            self.hits += 1
+        return result
+
+    def put(self, key, method, version, result):
+        """
+        Store a result, its messages capped to a preview
+
+        Args:
+            key (str): Content hash of the encoded image
+            method (str): Method name
+            version (int): Method version
+            result (dict): JSON-serializable result
+        """
+        path = self._path(key, method, version)
+        data = json.dumps(cap_messages(result))
+        temp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+
+        with open(temp_path, 'w') as f:
+            f.write(data)
+        os.replace(temp_path, path)
+
+        with self.lock:
+            if self._size is None:
+                self._size = self.size()
+            else:
+                self._size += len(data)
+            over_limit = self._size > self.max_bytes
+
+        if over_limit:
+            self.evict()
+
+    def entries(self):
+        """
+        List the cached entries
+
+        Returns:
+            list: (path, size in bytes, last use time) tuples, least recently used first
+        """
+        entries = []
+        for filename in os.listdir(self.cache_dir):
+            if not filename.endswith(".json"):
+                continue
+            path = os.path.join(self.cache_dir, filename)
+            try:
+                stats = os.stat(path)
+            except OSError:
+                continue
+            entries.append((path, stats.st_size, stats.st_mtime))
+
+        entries.sort(key=lambda entry: entry[2])
+        return entries
+
+    def size(self):
+        """
+        Total size of the cached entries
+
+        Returns:
+            int: Size in bytes
+        """
+        return sum(size for _, size, _ in self.entries())
+
+    def evict(self):
+        """
+        Remove least recently used entries until the cache fits its size limit
+
+        Returns:
+            int: Number of entries removed
+        """
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+
+        for path, size, _ in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= size
+            removed += 1
+
+        with self.lock:
+            self._size = total
+        return removed
+
+    def remove_stale(self, versions):
+        """
+        Remove the entries of older method versions
+
+        Args:
+            versions (dict): Current version of each method name
+
+        Returns:
+            int: Number of entries removed
+        """
+        removed = 0
+        for path, _, _ in self.entries():
+            parts = os.path.basename(path)[:-len(".json")].split(".")
+            if len(parts) != 3:
+                continue
+            _, method, version = parts
+            if method in versions and version != f"v{versions[method]}":
+                try:
+                    os.remove(path)
+                    removed += 1
+                except OSError:
+                    pass
+
+        with self.lock:
+            self._size = None
+        return removed
+
+    def clear(self):
+        """Remove every cached entry and reset the counters"""
+        for path, _, _ in self.entries():
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+        with self.lock:
+            self._size = 0
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        """
+        Get cache statistics
+
+        Returns:
+            dict: hits, misses, hit_rate, entries and size in bytes
+        """
+        entries = self.entries()
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups > 0 else 0,
+                "entries": len(entries),
+                "size": sum(size for _, size, _ in entries)
+            }
@@ -0,0 +1,95 @@
+"""
+Sample pair analysis for the StegnoX engine
+
+Sample pair analysis (Dumitrescu, Wu and Wang) estimates the fraction of
+pixels that carry an LSB-replacement payload from the horizontally and
+vertically adjacent pixel pairs of each channel. LSB replacement moves pairs
+between the sets X (v even and u < v, or v odd and u > v) and Y (v even and
+u > v, or v odd and u < v), which are balanced in natural images, at a rate
+the trace set K (pairs with equal values once the LSB is dropped) pins down.
+All three counts are taken with a few whole-array comparisons per channel
+plane, so the analysis is about as cheap as the histogram statistics.
+"""
+
+import numpy as np
+
+# Order of the counts in a sample pair count vector
+PAIR_COUNT_FIELDS = ("x", "y", "k", "pairs")
+
+
+def _count_pairs(first, second):
+    """
+    Count the X, Y and K pairs between two aligned uint8 arrays
+
+    Args:
+        first (numpy.ndarray): First values u of the pairs
+        second (numpy.ndarray): Second values v of the pairs, same shape
+
+    Returns:
+        list: Counts of X, Y, K and all pairs
+    """
+    below = first < second
+    above = first > second
+    odd = (second & 1).view(bool)
+
+    # X = (u < v and v even) or (u > v and v odd), Y the other way round
+    below_odd = np.count_nonzero(below & odd)
+    above_odd = np.count_nonzero(above & odd)
+    x = np.count_nonzero(below) - below_odd + above_odd
+    y = np.count_nonzero(above) - above_odd + below_odd
+
+    # u and v differ at most in the LSB
+    k = np.count_nonzero((first ^ second) < 2)
+    return [x, y, k, first.size]
+
+
+def sample_pair_counts(pixels, previous_row=None):
+    """
+    Count the sample pair sets of every channel of an image or band
+
+    Args:
+        pixels (numpy.ndarray): (H, W, C) uint8 array
+        previous_row (numpy.ndarray, optional): (W, C) last row of the band above,
+            whose vertical pairs with the first row are included
+
+    Returns:
+        numpy.ndarray: (C, 4) int64 counts, see PAIR_COUNT_FIELDS
+    """
+    counts = np.zeros((pixels.shape[2], len(PAIR_COUNT_FIELDS)), dtype=np.int64)
+    for index in range(pixels.shape[2]):
+        # Contiguous plane, so every comparison runs over packed bytes
+        plane = np.ascontiguousarray(pixels[:, :, index])
+        counts[index] += _count_pairs(plane[:, :-1], plane[:, 1:])
+        counts[index] += _count_pairs(plane[:-1], plane[1:])
+        if previous_row is not None:
+            counts[index] += _count_pairs(previous_row[:, index], plane[0])
+    return counts
+
+
+def embedding_rate(counts):
+    """
+    Estimate the embedding rate of one channel from its sample pair counts
+
+    The rate p is the smaller root of
+    (|K| / 2) p^2 + (2|X| - |P|) p + |Y| - |X| = 0.
+
+    Args:
+        counts (numpy.ndarray): The channel's four counts, see PAIR_COUNT_FIELDS
+
+    Returns:
+        float: Estimated fraction of pixels carrying payload bits, between 0 and 1
+    """
+    x, y, k, pairs = (float(value) for value in counts)
+    if k == 0 or pairs == 0:
+        return 0.0
+
+    a = k / 2
+    b = 2 * x - pairs
+    c = y - x
+    discriminant = b * b - 4 * a * c
+    if discriminant < 0:
+        # No real root: the closest fit is the vertex of the parabola
+        rate = -b / (2 * a)
+    else:
+        rate = (-b - np.sqrt(discriminant)) / (2 * a)
+    return float(min(1.0, max(0.0, rate)))
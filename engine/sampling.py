@@ -0,0 +1,210 @@
+"""
+Sampled estimation for the StegnoX engine
+
+The DCT, bit-plane and histogram detectors can estimate their scores from a
+seeded random sample of blocks or pixels instead of the whole image. Only
+the sampled pixels are read, so on a memory-mapped or in-memory image the
+cost depends on the sample size rather than the image size. Every estimate
+comes with a confidence interval that accounts for sampling without
+replacement from a finite population.
+"""
+
+import numpy as np
+
+from .block_dct import BLOCK_SIZE
+from .channel_stats import binary_entropy
+
+# Normal quantile of the reported two-sided confidence level
+CONFIDENCE_LEVEL = 0.95
+Z_SCORE = 1.959964
+
+
+def sample_size(population, sample_fraction=None, max_samples=None):
+    """
+    Decide how many units to sample
+
+    Args:
+        population (int): Number of pixels or blocks
+        sample_fraction (float, optional): Fraction of the population to sample
+        max_samples (int, optional): Upper bound on the sample size
+
+    Returns:
+        int: Sample size, or None if no sampling was requested or the sample
+            would cover the whole population
+    """
+    if sample_fraction is None and max_samples is None:
+        return None
+
+    size = population
+    if sample_fraction is not None:
+        size = int(np.ceil(population * sample_fraction))
+    if max_samples is not None:
+        size = min(size, max_samples)
+    size = max(1, size)
+    return size if size < population else None
+
+
+def sample_indices(population, size, seed):
+    """
+    Draw sorted indices without replacement
+
+    Args:
+        population (int): Number of units
+        size (int): Number of indices to draw
+        seed (int): Random seed
+
+    Returns:
+        numpy.ndarray: Sorted int64 indices
+    """
+    rng = np.random.default_rng(seed)
+    return np.sort(rng.choice(population, size=size, replace=False))
+
+
+def sample_pixels(rgb, size, seed):
+    """
+    Read a random sample of pixels
+
+    Args:
+        rgb (numpy.ndarray): (H, W, 3) uint8 image
+        size (int): Number of pixels to sample
+        seed (int): Random seed
+
+    Returns:
+        numpy.ndarray: (size, 1, 3) uint8 array, usable as an image by the histogram code
+    """
+    height, width = rgb.shape[:2]
+    indices = sample_indices(height * width, size, seed)
+    return rgb[indices // width, indices % width][:, None, :]
+
+
+def sample_gray_blocks(rgb, size, seed, block_size=BLOCK_SIZE):
+    """
+    Read a random sample of complete blocks and convert them to grayscale
+
+    Args:
+        rgb (numpy.ndarray): (H, W, 3) uint8 image
+        size (int): Number of blocks to sample
+        seed (int): Random seed
+        block_size (int): Block edge length
+
+    Returns:
+        numpy.ndarray: (size, block_size, block_size) uint8 grayscale blocks
+    """
+    import cv2
+
+    block_cols = rgb.shape[1] // block_size
+    block_rows = rgb.shape[0] // block_size
+    indices = sample_indices(block_rows * block_cols, size, seed)
+    rows = (indices // block_cols)[:, None, None] * block_size + np.arange(block_size)[None, :, None]
+    cols = (indices % block_cols)[:, None, None] * block_size + np.arange(block_size)[None, None, :]
+
+    blocks = np.ascontiguousarray(rgb[rows, cols])
+    gray = cv2.cvtColor(blocks.reshape(size * block_size, block_size, 3), cv2.COLOR_RGB2GRAY)
+    return gray.reshape(size, block_size, block_size)
+
+
+def finite_population_correction(size, population):
+    """Variance factor for sampling without replacement"""
+    if population <= 1:
+        return 0.0
+    return max(0.0, (population - size) / (population - 1))
+
+
+def proportion_interval(successes, size, population):
+    """
+    Confidence interval of a population proportion estimated from a sample
+
+    Args:
+        successes (int): Sampled units with the property
+        size (int): Sample size
+        population (int): Population size
+
+    Returns:
+        tuple: (low, high) bounds between 0 and 1
+    """
+    if size == 0:
+        return 0.0, 1.0
+    p = successes / size
+    error = Z_SCORE * np.sqrt(p * (1 - p) / size * finite_population_correction(size, population))
+    return float(max(0.0, p - error)), float(min(1.0, p + error))
+
+
+def pair_suspicion_bounds(histogram, size, population, tolerance=0.05):
+    """
+    Bound the number of suspicious value pairs of a sampled histogram
+
+    A pair (2n, 2n + 1) is suspicious when the share q of its even value lies
+    within tolerance / 2 of one half. Pairs whose confidence interval for q
+    lies entirely inside that band are certainly suspicious, pairs whose
+    interval overlaps it possibly are. Pairs absent from the sample are
+    treated as empty, as they are in the full-image test.
+
+    Args:
+        histogram (numpy.ndarray): 256 value counts of the sample
+        size (int): Number of sampled pixels
+        population (int): Number of pixels in the image
+        tolerance (float): Relative difference below which a pair is suspicious
+
+    Returns:
+        tuple: (certain, possible) numbers of suspicious pairs
+    """
+    pairs = histogram.reshape(-1, 2).astype(np.float64)
+    totals = pairs.sum(axis=1)
+    occupied = totals > 0
+    share = np.divide(pairs[:, 0], totals, out=np.full(totals.shape, 0.5), where=occupied)
+    deviation = np.abs(share - 0.5)
+
+    correction = finite_population_correction(size, population)
+    safe_totals = np.maximum(totals, 1)
+    error = Z_SCORE * np.sqrt(share * (1 - share) / safe_totals * correction)
+    # A pair seen only a few times may still be balanced in the full image
+    error = np.where(occupied, np.maximum(error, 0.5 / safe_totals), 0)
+
+    band = tolerance / 2
+    certain = occupied & (deviation + error < band)
+    possible = occupied & (deviation - error < band)
+    return int(np.count_nonzero(certain)), int(np.count_nonzero(possible))
+
+
+def entropy_bounds(ones, size, population):
+    """
+    Confidence interval of a bit plane's entropy estimated from a sample
+
+    Args:
+        ones (int): Set bits in the sample
+        size (int): Sample size
+        population (int): Population size
+
+    Returns:
+        tuple: (low, high) entropy bounds in bits
+    """
+    low, high = proportion_interval(ones, size, population)
+    entropies = (binary_entropy(low * size, size), binary_entropy(high * size, size))
+    upper = 1.0 if low <= 0.5 <= high else max(entropies)
+    return min(entropies), upper
+
+
+def sampling_report(unit, size, population, seed, low, high):
+    """
+    Describe a sampled estimate
+
+    Args:
+        unit (str): What was sampled, "pixels" or "blocks"
+        size (int): Sample size
+        population (int): Population size
+        seed (int): Random seed
+        low (float): Lower confidence bound of the score
+        high (float): Upper confidence bound of the score
+
+    Returns:
+        dict: Sampling details and the confidence interval of the score
+    """
+    return {
+        "unit": unit,
+        "sample_size": size,
+        "population": population,
+        "sample_fraction": size / population,
+        "seed": seed,
+        "confidence_interval": [low, high],
+        "confidence_level": CONFIDENCE_LEVEL
+    }
@@ -1,427 +1,1418 @@
 from PIL import Image
 import numpy as np
-import base64
-import io
-import cv2
-from scipy.fftpack import dct, idct
-import matplotlib.pyplot as plt
-from io import BytesIO
+import time
+import zlib
+from contextlib import closing, nullcontext
+
+from .batch import analyze_batch
+from .bitstream import (
+    TERMINATOR, find_lsb_pattern, pack_lsbs, parity_bits, read_parity_bits, unpack_bits
+)
+from .block_dct import (
+    BLOCK_SIZE, block_dct_statistics, block_stack_dct_statistics, quantized_coefficient_statistics
+)
+from .cancellation import CancellationToken, as_token, checkpoint
+from .capacity import cover_capacity, rank_covers
+from .cascade import (
+    CASCADE_STAGES, DECODE_PROBE_BITS, DEFAULT_CASCADE_THRESHOLDS, SCREEN_METHODS, probe_payloads,
+    screen_scores, stage_for, stage_passes
+)
+from .channel_stats import binary_entropy, bit_plane_ones, channel_histograms, pair_statistics
+from .executors import thread_pool_executor
+from .image_context import ImageContext
+from .payload import HEADER_BITS, frame_payload, message_bytes, parse_header, payload_report
+from .png_stream import PngRowStream
+from .profiling import ProfileRecorder, memory_tracing
+from .registry import (
+    COST_CHEAP, COST_EXPENSIVE, COST_MODERATE, get_method_info, register_method, registered_methods
+)
+from .sample_pairs import PAIR_COUNT_FIELDS, embedding_rate, sample_pair_counts
+from .sampling import (
+    entropy_bounds, pair_suspicion_bounds, proportion_interval, sample_gray_blocks, sample_indices,
+    sample_pixels, sample_size, sampling_report
+)
+from .tiling import TiledAnalysis, band_height_for, iter_bands, needs_tiling
+
+# Number of parity bits parity_bit_extraction reads when no limit is given
+DEFAULT_PARITY_BITS = 1000
+
+# Memory ceiling for tiled analysis when the engine has no memory_limit
+DEFAULT_TILE_MEMORY = 256 * 1024 * 1024
+
+# Number of parity bits read in the first band when searching for a terminator;
+# later bands double in size so the cost follows the payload length
+PARITY_BAND_BITS = 4096
+
+# LSBs in the leading PNG rows that lsb_extraction checks for a payload before
+# decoding the rest: a payload header, or a legacy message of up to 1 KB
+LSB_STREAM_PROBE_BITS = 8 * 1024
 
 class StegnoxEngine:
-    def __init__(self):
-        self.methods = [
-            self.lsb_extraction,
-            self.parity_bit_extraction,
-            self.metadata_extraction,
-            self.dct_analysis,
-            self.bit_plane_analysis,
-            self.histogram_analysis
-        ]
-
-    def extract_all_methods(self, image_path):
-        """Run all extraction methods on the image"""
-        results = {}
+    def __init__(self, max_workers=1, memory_limit=None, pixel_cache=None, result_cache=None,
+                 methods=None, cascade=False, cascade_thresholds=None, profile=False, metrics_sink=None,
+                 trace_memory=False, dct_source="pixels"):
+        """
+        Initialize the engine
+
+        Args:
+            max_workers (int): Default number of threads extract_all_methods uses to
+                run methods concurrently; 1 runs them one after another
+            memory_limit (int, optional): Memory ceiling in bytes for extract_all_methods.
+                Images whose whole-image analysis would exceed it are analyzed in row
+                bands sized to fit; None never tiles automatically
+            pixel_cache (PixelCache, optional): Cache of decoded arrays; images found in it
+                are memory-mapped instead of decoded, and new images are added to it
+            result_cache (ResultCache, optional): Cache of method results keyed by image
+                content, method name and method version, used by extract_all_methods
+            methods (list, optional): Names of the registered methods extract_all_methods
+                runs by default; all registered methods when omitted
+            cascade (bool): Run extract_all_methods in cascade mode by default
+            cascade_thresholds (dict, optional): Screen thresholds per cascade stage,
+                overriding DEFAULT_CASCADE_THRESHOLDS, e.g. {"dct": {"pair_confidence": 60}}
+            profile (bool): Measure each method extract_all_methods runs by default
+            metrics_sink (callable, optional): Called as metrics_sink(method_name, profile)
+                for every method measured in profiling mode, e.g. a MetricsAggregator
+            trace_memory (bool): Also measure each method's memory peak with tracemalloc
+                in profiling mode by default. Tracing covers the whole process while
+                it runs, so leave it off in shared processes such as a web server
+            dct_source (str): Default coefficient source of dct_analysis, "pixels",
+                "auto" or "coefficients"; see dct_analysis
+
+        Raises:
+            ValueError: If a method name is not registered
+        """
+        self.max_workers = max_workers
+        self.memory_limit = memory_limit
+        self.pixel_cache = pixel_cache
+        self.result_cache = result_cache
+        self.cascade = cascade
+        self.profile = profile
+        self.metrics_sink = metrics_sink
+        self.trace_memory = trace_memory
+        self.dct_source = dct_source
+        self.cascade_thresholds = {
+            stage: dict(thresholds, **(cascade_thresholds or {}).get(stage, {}))
+            for stage, thresholds in DEFAULT_CASCADE_THRESHOLDS.items()
+        }
+
+        if methods is None:
+            self.method_infos = registered_methods()
+        else:
+            self.method_infos = []
+            for name in methods:
+                info = get_method_info(name)
+                if info is None:
+                    raise ValueError(f"Unknown analysis method: {name}")
+                self.method_infos.append(info)
+
+    def extract_all_methods(self, image_path, max_workers=None, methods=None, tiled=None,
+                            cascade=None, budget=None, cancel=None, profile=None,
+                            trace_memory=None):
+        """
+        Run all extraction methods on the image, decoding it only once
+
+        With more than one worker the methods run on a thread pool; their heavy
+        work is NumPy, OpenCV and SciPy code that releases the GIL. A failing
+        method only affects its own entry, and results keep the method order.
+        With a result cache, methods whose results are cached for this image
+        content and method version are not run; cached results are returned as
+        they were stored in JSON.
+
+        In cascade mode the histogram screens run first, and the decode and DCT
+        stages only run when the screen scores reach their thresholds; a decode
+        method whose payload header or terminator shows in the leading bits
+        runs regardless. Methods of a skipped stage get a {"skipped": True, ...}
+        entry, and a "_cascade" entry records the scores, which stages ran or
+        were skipped and which methods the probe ran.
+
+        With a time budget or a cancellation token the methods run in cost
+        order, cheapest first, and share the remaining time. A method stopped
+        part-way returns what it has with "partial": True and the "cancelled"
+        reason; one whose turn comes after the deadline gets an error entry
+        with "cancelled". Partial results are not cached.
+
+        In profiling mode each method that runs is measured: wall time, CPU
+        time of its thread and pixels per second, and with memory tracing the
+        peak of memory traced by tracemalloc while it ran. tracemalloc runs only
+        for the duration of such a call, and its methods run one at a time. The profiles are sent to the engine's metrics
+        sink and collected in a "_profile" entry; methods served from the
+        result cache or skipped by the cascade have none. In tiled mode the
+        methods computed in the shared band pass are measured together as
+        "_tiled_pass".
+
+        Args:
+            image_path: Path, encoded bytes, file object, PIL image, pixel array or
+                shared ImageContext
+            max_workers (int, optional): Number of threads; defaults to the engine setting
+            methods (list, optional): Names of the methods to run instead of all of them
+            tiled (bool, optional): Force (True) or disable (False) the banded, memory-bounded
+                mode; by default it is used when the image exceeds the engine's memory_limit
+            cascade (bool, optional): Enable or disable cascade mode; defaults to the engine setting
+            budget (float, optional): Total time budget in seconds for all methods
+            cancel (optional): CancellationToken or threading.Event that stops the
+                methods when set, or a timeout in seconds
+            profile (bool, optional): Enable or disable profiling mode; defaults to the engine setting
+            trace_memory (bool, optional): Enable or disable memory tracing in profiling mode;
+                defaults to the engine setting
+
+        Returns:
+            dict: Results keyed by method name
+        """
+        context = self._context(image_path)
+        max_workers = self.max_workers if max_workers is None else max_workers
+        cascade = self.cascade if cascade is None else cascade
+        token = as_token(cancel)
+        if budget is not None:
+            token = (token or CancellationToken()).child(budget)
+
+        if methods is None:
+            selected = [(info.name, self._bind(info)) for info in self.method_infos]
+        else:
+            selected = [(name, self._find_method(name)) for name in methods]
+
+        if not (self.profile if profile is None else profile):
+            if cascade:
+                return self._extract_cascade(context, selected, max_workers, tiled, token)
+            return self._extract(context, selected, max_workers, tiled, token)
+
+        try:
+            width, height = context.header["size"]
+            pixels = width * height
+        except Exception:
+            pixels = 0
+        recorder = ProfileRecorder(pixels, self.metrics_sink,
+                                   self.trace_memory if trace_memory is None else trace_memory)
+        if recorder.trace_memory:
+            # The traced peak is process-wide, so traced methods run one at a time
+            max_workers = 1
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        with memory_tracing() if recorder.trace_memory else nullcontext():
+            if cascade:
+                results = self._extract_cascade(context, selected, max_workers, tiled, token, recorder)
+            else:
+                results = self._extract(context, selected, max_workers, tiled, token, recorder)
+
+        results["_profile"] = {
+            "pixels": pixels,
+            "wall_time": time.perf_counter() - wall_start,
+            "cpu_time": time.process_time() - cpu_start,
+            "methods": recorder.methods
+        }
+        return results
+
+    def _extract(self, context, selected, max_workers, tiled, token=None, recorder=None):
+        """
+        Run methods on one image through the result cache
+
+        Args:
+            context (ImageContext): The image
+            selected (list): (name, method) pairs to run
+            max_workers (int): Number of threads
+            tiled (bool): Tiled mode setting, None to decide from the memory limit
+            token (CancellationToken, optional): Stops the methods when cancelled or expired
+            recorder (ProfileRecorder, optional): Measures the methods that run
+
+        Returns:
+            dict: Results keyed by method name, in the order of selected
+        """
+        cached = self._cached_results(context, selected)
+        pending = [(name, method) for name, method in selected if name not in cached]
+        if not pending:
+            return {name: cached[name] for name, _ in selected}
+
+        if token is not None:
+            # Cheap methods first, so a budget runs out on the expensive ones
+            pending.sort(key=lambda item: self._method_cost(item[0]))
+
+        if recorder is not None:
+            pending = [(name, recorder.wrap(name, method)) for name, method in pending]
+
+        if tiled is None:
+            try:
+                width, height = context.header["size"]
+                tiled = needs_tiling(width, height, self.memory_limit)
+            except Exception:
+                tiled = False
+
+        if tiled:
+            computed = self._extract_tiled(context, pending, token, recorder)
+        elif max_workers is None or max_workers <= 1:
+            computed = {name: self._run_method(method, context, token) for name, method in pending}
+        else:
+            ThreadPoolExecutor = thread_pool_executor()
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                futures = [executor.submit(self._run_method, method, context, token) for _, method in pending]
+                computed = {name: future.result() for (name, _), future in zip(pending, futures)}
+
+        self._store_results(context, computed)
+        return {name: cached[name] if name in cached else computed[name] for name, _ in selected}
+
+    def _extract_cascade(self, context, selected, max_workers, tiled, token=None, recorder=None):
+        """
+        Run methods as a cascade: screens first, gated stages only when warranted
+
+        Args:
+            context (ImageContext): The image
+            selected (list): (name, method) pairs to run
+            max_workers (int): Number of threads
+            tiled (bool): Tiled mode setting, None to decide from the memory limit
+            token (CancellationToken, optional): Stops the methods when cancelled or expired
+            recorder (ProfileRecorder, optional): Measures the methods that run
+
+        Returns:
+            dict: Results keyed by method name, plus the "_cascade" summary
+        """
+        names = [name for name, _ in selected]
+
+        # Ungated methods and the screens run first
+        screen = [(name, method) for name, method in selected if stage_for(name) is None]
+        for name in SCREEN_METHODS:
+            if name not in names:
+                screen.append((name, self._find_method(name)))
+        results = self._extract(context, screen, max_workers, tiled, token, recorder)
+
+        scores = screen_scores(*(results[name] for name in SCREEN_METHODS))
+        passed = {
+            stage: stage_passes(scores, self.cascade_thresholds[stage]) for stage in CASCADE_STAGES
+        }
+
+        # Short messages slip under the screens; a payload start runs its decode anyway
+        probed = []
+        if not passed["decode"] and any(stage_for(name) == "decode" for name in names):
+            probed = [name for name in self._probe_payloads(context) if name in names]
+
+        gated = [(name, method) for name, method in selected
+                 if stage_for(name) is not None and (passed[stage_for(name)] or name in probed)]
+        if gated:
+            results.update(self._extract(context, gated, max_workers, tiled, token, recorder))
+
+        output = {}
+        ran = []
+        skipped = []
+        for name in names:
+            stage = stage_for(name)
+            if stage is not None and not passed[stage] and name not in probed:
+                output[name] = {
+                    "skipped": True,
+                    "stage": stage,
+                    "message": f"Skipped: screen scores below the {stage} stage thresholds"
+                }
+                if stage not in skipped:
+                    skipped.append(stage)
+            else:
+                output[name] = results[name]
+                if stage is not None and stage not in ran:
+                    ran.append(stage)
+
+        output["_cascade"] = {
+            "scores": scores,
+            "thresholds": self.cascade_thresholds,
+            "stages_run": ran,
+            "stages_skipped": skipped,
+            "probed": probed
+        }
+        return output
+
+    def _probe_payloads(self, context):
+        """
+        Probe the leading rows of an image for the start of a decode method's payload
+
+        Args:
+            context (ImageContext): The image
+
+        Returns:
+            list: Decode methods whose probe found a payload start; all of them
+                if the probe failed
+        """
+        try:
+            width, height = context.header["size"]
+            rows = min(height, -(-DECODE_PROBE_BITS // (width * 3)))
+            pixels = context.cached_rgb()
+            if pixels is None:
+                # Tiled analysis keeps no RGB array; decode the leading band only
+                with closing(iter_bands(context, rows)) as bands:
+                    pixels, _ = next(bands)
+            parity_window = self._parity_bit_budget(width * height, None)
+            return probe_payloads(pixels[:rows], width * height, parity_window)
+        except Exception:
+            return list(CASCADE_STAGES["decode"])
+
+    def _cached_results(self, context, selected):
+        """
+        Look up the selected methods in the result cache
+
+        Args:
+            context (ImageContext): The image
+            selected (list): (name, method) pairs
+
+        Returns:
+            dict: Cached results keyed by method name
+        """
+        if self.result_cache is None:
+            return {}
+
+        try:
+            key = context.content_hash
+        except Exception:
+            return {}
+
+        cached = {}
+        for name, _ in selected:
+            info = get_method_info(name)
+            if info is not None and self._cacheable(name):
+                result = self.result_cache.get(key, name, info.version)
+                if result is not None:
+                    cached[name] = result
+        return cached
+
+    def _store_results(self, context, results):
+        """
+        Store complete, successful results in the result cache
 
-        for method in self.methods:
+        Args:
+            context (ImageContext): The image
+            results (dict): Results keyed by method name
+        """
+        if self.result_cache is None:
+            return
+
+        for name, result in results.items():
+            info = get_method_info(name)
+            if info is None or "error" in result or result.get("partial") or not self._cacheable(name):
+                continue
             try:
-                method_name = method.__name__
-                result = method(image_path)
-                results[method_name] = result
-            except Exception as e:
-                results[method_name] = {"error": str(e)}
+                self.result_cache.put(context.content_hash, name, info.version, result)
+            except (OSError, TypeError, ValueError):
+                pass
+
+    def _cacheable(self, name):
+        """True if a method's results depend only on the image and method version"""
+        # Cache entries are not keyed by the coefficient source, so only the
+        # default one is cached and engines sharing a cache agree
+        return name != "dct_analysis" or self.dct_source == "pixels"
+
+    def _context(self, image):
+        """
+        Return the image context for an input, using the engine's pixel cache
+
+        Args:
+            image: Path, encoded bytes, file object, PIL image, pixel array or existing context
+
+        Returns:
+            ImageContext: The context
+        """
+        return ImageContext.load(image, self.pixel_cache)
+
+    def _extract_tiled(self, context, selected, token=None, recorder=None):
+        """
+        Run the selected methods in one banded pass over the image
+
+        Pixel statistics are accumulated band by band into the same result
+        schema as the whole-image methods, per-band entries of alpha and
+        16-bit bands included. Methods without a banded form run normally on
+        the context, as does dct_analysis of a JPEG whose quantized
+        coefficients can be read. If the token stops the pass, the banded
+        results cover the bands read so far and are marked partial.
+
+        Args:
+            context (ImageContext): The image
+            selected (list): (name, method) pairs to run
+            token (CancellationToken, optional): Stops the band pass when cancelled or expired
+            recorder (ProfileRecorder, optional): Measures the band pass as "_tiled_pass"
 
+        Returns:
+            dict: Results keyed by method name
+        """
+        names = {name for name, _ in selected}
+        if "dct_analysis" in names and self._reads_jpeg_coefficients(context):
+            # The coefficients need no pixels, so the method runs as it would untiled
+            names.discard("dct_analysis")
+        memory_limit = self.memory_limit or DEFAULT_TILE_MEMORY
+        analysis = TiledAnalysis(
+            histograms=bool(names & {"bit_plane_analysis", "histogram_analysis"}),
+            sample_pairs="sample_pair_analysis" in names,
+            dct="dct_analysis" in names,
+            lsb="lsb_extraction" in names,
+            lsb_byte_limit=memory_limit // 4,
+            band_planes="bit_plane_analysis" in names
+        )
+
+        def band_pass():
+            """Feed the image to the analysis band by band; returns the token's reason if it stopped"""
+            for band, extras in iter_bands(context, band_height_for(width, memory_limit)):
+                if token is not None and token.stop_requested():
+                    return token.reason
+                analysis.add_band(band, extras)
+            return None
+
+        failure = None
+        stopped = None
+        parity_budget = 0
+        try:
+            width, height = context.header["size"]
+            analysis.lsb_bits_available = width * height * 3
+            analysis.parity_bits_available = width * height
+            analysis.band_bits_available = width * height
+            if "parity_bit_extraction" in names:
+                # Read at least a payload header, which may ask for more bits
+                parity_budget = self._parity_bit_budget(width * height, None)
+                analysis.parity_bits_needed = min(max(parity_budget, HEADER_BITS), width * height)
+            if recorder is not None:
+                stopped = recorder.measure("_tiled_pass", band_pass)
+            else:
+                stopped = band_pass()
+        except Exception as e:
+            failure = f"Tiled analysis failed: {str(e)}"
+
+        def stream_lsb(stream, whole_stream):
+            header = stream.lsb_header
+            if header is not None:
+                payload = bytes(stream.lsb_data[HEADER_BITS // 8:HEADER_BITS // 8 + header["length"]])
+                if len(payload) < header["length"]:
+                    return {"message": "No valid data found", "partial": True}
+                return payload_report(header, payload)
+
+            if stream.lsb_terminator_at < 0 and not whole_stream:
+                return None
+            bit_count = stream.lsb_bit_count()
+            if bit_count < 0:
+                return {"message": "No valid data found", "partial": True}
+            if bit_count % 8 != 0:
+                return {"message": "No valid data found"}
+            return self._lsb_report(bytes(stream.lsb_data[:bit_count // 8]))
+
+        def tiled_lsb():
+            # Without a terminator the whole RGB stream is the message, as untiled;
+            # extra bands are reported only when they hold a payload
+            result = stream_lsb(analysis, True)
+            bands = {}
+            for name, stream in analysis.band_streams.items():
+                band_result = stream_lsb(stream, False)
+                if band_result is not None and band_result["message"] != "No valid data found":
+                    bands[name] = band_result
+            if bands:
+                result["bands"] = bands
+            return result
+
+        def tiled_bit_plane():
+            report = self._bit_plane_report(analysis.histograms)
+            if analysis.band_planes:
+                report["bands"] = {
+                    name: self._band_plane_report(counts["bit_depth"], counts["ones"], counts["total"])
+                    for name, counts in analysis.band_planes.items()
+                }
+            return report
+
+        def tiled_parity():
+            bits = analysis.parity_bits()
+            header = analysis.parity_header
+            if header is not None:
+                # Bits collected before the header was read may run past the payload
+                payload_bits = bits[HEADER_BITS:HEADER_BITS + header["length"] * 8]
+                return payload_report(header, np.packbits(payload_bits).tobytes())
+            return self._parity_report(bits[:parity_budget])
+
+        reports = {
+            "lsb_extraction": tiled_lsb,
+            "parity_bit_extraction": tiled_parity,
+            "dct_analysis": lambda: self._dct_report(analysis.dct_stats),
+            "bit_plane_analysis": tiled_bit_plane,
+            "histogram_analysis": lambda: self._histogram_report(analysis.histograms),
+            "sample_pair_analysis": lambda: self._sample_pair_report(analysis.pair_counts)
+        }
+
+        results = {}
+        for name, method in selected:
+            if name not in names or name not in reports:
+                results[name] = self._run_method(method, context, token)
+            elif failure is not None:
+                results[name] = {"error": failure}
+            else:
+                result = self._run_method(lambda image, cancel=None, report=reports[name]: report(), context)
+                if stopped is not None and "error" not in result:
+                    result = dict(result, partial=True, cancelled=stopped)
+                results[name] = result
         return results
 
+    def analyze_batch(self, paths, methods=None, max_workers=None, chunksize=1, ordered=True,
+                      cancel_event=None):
+        """
+        Analyze many images on a pool of worker processes
+
+        Each worker imports the engine once and keeps it warm for the whole
+        batch; worker engines share this engine's memory limit, caches and
+        cascade settings.
+        Results are yielded as they complete; closing the generator or setting
+        cancel_event cancels the images that have not started.
+
+        Args:
+            paths (iterable): Image paths to analyze
+            methods (list, optional): Method names to run; the engine's methods when omitted
+            max_workers (int, optional): Number of worker processes; defaults to the CPU count
+            chunksize (int): Number of images sent to a worker per task
+            ordered (bool): Yield results in input order instead of completion order
+            cancel_event (threading.Event, optional): Stops the batch when set
+
+        Yields:
+            tuple: (path, results) for each image
+        """
+        if methods is None:
+            methods = [info.name for info in self.method_infos]
+
+        return analyze_batch(
+            paths,
+            methods=methods,
+            max_workers=max_workers,
+            chunksize=chunksize,
+            ordered=ordered,
+            cancel_event=cancel_event,
+            engine_options={
+                "memory_limit": self.memory_limit,
+                "pixel_cache": self.pixel_cache,
+                "result_cache": self.result_cache,
+                "cascade": self.cascade,
+                "cascade_thresholds": self.cascade_thresholds,
+                "profile": self.profile,
+                "trace_memory": self.trace_memory,
+                "dct_source": self.dct_source
+            }
+        )
+
+    def _find_method(self, name):
+        """Look up an analysis method by name, or return one that reports it as missing"""
+        info = get_method_info(name)
+        if info is not None:
+            return self._bind(info)
+
+        def missing(image, cancel=None):
+            return {"error": f"Method {name} not found"}
+
+        return missing
+
+    def _bind(self, info):
+        """Return a callable that imports a method's dependencies and runs it on this engine"""
+        def run(image, cancel=None):
+            info.load_dependencies()
+            return info.function(self, image, cancel=cancel)
+
+        return run
+
+    def _method_cost(self, name):
+        """Cost class of a method, for ordering; unregistered names sort as moderate"""
+        info = get_method_info(name)
+        return info.cost if info is not None else COST_MODERATE
+
+    def _run_method(self, method, context, token=None):
+        """
+        Run one method, turning an exception into an error entry
+
+        Args:
+            method (callable): Bound method, called as method(context, cancel=...)
+            context (ImageContext): The image
+            token (CancellationToken, optional): Shared token; the method gets a child
+                of it, so its partial flag is its own
+
+        Returns:
+            dict: The method's result
+        """
+        try:
+            return method(context, cancel=token.child() if token is not None else None)
+        except Exception as e:
+            return {"error": str(e)}
+
+    @register_method(cost=COST_MODERATE, version=4)
     def lsb_extraction(self, image_path):
-        """Extract data using LSB method (from original code)"""
-        img = Image.open(image_path)
-        img = img.convert("RGB")
-        width, height = img.size
-
-        binary_message = ""
-        pixels = img.load()
-        terminator = ''.join(format(ord('#'), '08b') * 4)
-
-        for y in range(height):
-            for x in range(width):
-                r, g, b = pixels[x, y]
-                binary_message += str(r & 1)
-                binary_message += str(g & 1)
-                binary_message += str(b & 1)
-
-                if terminator in binary_message:
-                    binary_message = binary_message[:binary_message.index(terminator)]
-                    break
+        """
+        Extract data hidden in the least significant bits of the RGB channels
+
+        The bits are read in pixel order (R, G, B of each pixel). A framed
+        payload is read to exactly the length in its header; otherwise the
+        bits up to the first occurrence of the legacy "####" terminator, at
+        any bit offset, are returned. Payloads found in an alpha band or in
+        16-bit samples are reported per band under "bands".
+
+        A PNG passed on its own (not as a shared context) is decoded from its
+        first rows: a payload that starts there is read band by band, stopping
+        as soon as it is complete, so a short message costs a few rows rather
+        than the whole image. Without one the image is decoded whole.
+
+        Args:
+            image_path: Path, encoded bytes, file object, PIL image, pixel array or
+                shared ImageContext
+
+        Returns:
+            dict: The extracted message
+        """
+        context = self._context(image_path)
+        if context is not image_path and context.is_encoded and context.cached_rgb() is None:
+            result = self._lsb_extraction_streamed(context)
+            if result is not None:
+                return result
+
+        values = context.rgb.reshape(-1)
+        result = self._lsb_payload(values)
+        if result is None:
+            # No terminator: the whole stream is the message
+            if values.size % 8 != 0:
+                result = {"message": "No valid data found"}
             else:
-                continue
-            break
+                result = self._lsb_report(pack_lsbs(values))
+
+        bands = {}
+        for name, plane in context.extra_bands():
+            band_result = self._lsb_payload(plane.reshape(-1))
+            if band_result is not None and band_result["message"] != "No valid data found":
+                bands[name] = band_result
+        if bands:
+            result["bands"] = bands
+        return result
+
+    def _lsb_payload(self, values):
+        """
+        Read a framed or terminated payload from the LSBs of a value stream
+
+        Args:
+            values (numpy.ndarray): 1-D integer values in embedding order
 
-        if len(binary_message) % 8 != 0:
+        Returns:
+            dict: The extraction result, or None if the stream has neither a
+                payload header nor a terminator
+        """
+        # A framed payload states its length, so only its own bits are read
+        header = parse_header(pack_lsbs(values[:HEADER_BITS]), (values.size - HEADER_BITS) // 8)
+        if header is not None:
+            return payload_report(header, pack_lsbs(values[HEADER_BITS:HEADER_BITS + header["length"] * 8]))
+
+        bit_count = find_lsb_pattern(values, TERMINATOR)
+        if bit_count < 0:
+            return None
+        if bit_count % 8 != 0:
             return {"message": "No valid data found"}
+        return self._lsb_report(pack_lsbs(values[:bit_count]))
+
+    def _lsb_extraction_streamed(self, context):
+        """
+        Extract an LSB payload from the leading rows of a PNG
+
+        The decision is taken on the first rows: without a payload header or
+        a terminator in them, the image is left to the full decode. A framed
+        payload's remaining rows are decoded in one more band, continuing
+        where the first rows ended.
 
+        Args:
+            context (ImageContext): A PNG image that has not been decoded
+
+        Returns:
+            dict: The extracted message, or None if the image is not a PNG that
+                can be streamed, has alpha or 16-bit bands, or shows no payload
+                in its first rows
+        """
         try:
-            message_bytes = bytes(int(binary_message[i:i+8], 2) for i in range(0, len(binary_message), 8))
-            return {"message": message_bytes.decode('utf-8', errors='replace')}
+            with context.open_file() as f:
+                png = PngRowStream(f)
+                if png.has_extra_bands or not png.streams_bands:
+                    # Alpha and 16-bit bands and packed samples are read from the full decode
+                    return None
+                row_bits = png.width * 3
+                total_bits = png.height * row_bits
+                rows = -(-max(HEADER_BITS, LSB_STREAM_PROBE_BITS) // row_bits)
+                if rows * 4 > png.height:
+                    # A small image is decoded whole at little extra cost
+                    return None
+
+                checkpoint()
+                values = png.next_band(rows)[1].reshape(-1)
+                header = parse_header(pack_lsbs(values[:HEADER_BITS]), (total_bits - HEADER_BITS) // 8)
+                if header is None:
+                    bit_count = find_lsb_pattern(values, TERMINATOR)
+                    if bit_count < 0:
+                        # A clean image, the common case, or a long legacy message
+                        return None
+                    if bit_count % 8 != 0:
+                        return {"message": "No valid data found"}
+                    return self._lsb_report(pack_lsbs(values[:bit_count]))
+
+                end = HEADER_BITS + header["length"] * 8
+                if values.size < end:
+                    checkpoint()
+                    rest = png.next_band(-(-(end - values.size) // row_bits))[1].reshape(-1)
+                    values = np.concatenate([values, rest])
+                return payload_report(header, pack_lsbs(values[HEADER_BITS:end]))
+        except (NotImplementedError, ValueError, OSError, SyntaxError, zlib.error):
+            return None
+
+    def _lsb_report(self, message_bytes):
+        """Build the LSB extraction result from the packed bytes of a legacy message"""
+        try:
+            return {"message": message_bytes.decode('utf-8', errors='replace'), "format": "legacy"}
         except:
             return {"message": "Binary data found but not decodable as text"}
 
-    def parity_bit_extraction(self, image_path):
-        """Extract data using parity bit method"""
-        img = Image.open(image_path)
-        img = img.convert("RGB")
-        width, height = img.size
+    @register_method(cost=COST_CHEAP, version=2)
+    def parity_bit_extraction(self, image_path, max_bits=None, until_terminator=False):
+        """
+        Extract data using parity bit method
 
-        binary_data = ""
-        pixels = img.load()
+        Each pixel carries one bit, the parity of r + g + b. Only the pixel rows
+        needed for the requested number of bits are examined. A framed payload
+        is read to exactly the length in its header; max_bits and
+        until_terminator apply to legacy payloads.
 
-        for y in range(height):
-            for x in range(width):
-                r, g, b = pixels[x, y]
-                # Check parity of each color channel
-                binary_data += str((r + g + b) % 2)
+        Args:
+            image_path: Path, encoded bytes, file object, PIL image, pixel array or
+                shared ImageContext
+            max_bits (int, optional): Maximum number of bits to read. Defaults to 1000,
+                or to the whole image when until_terminator is set
+            until_terminator (bool): Read until the legacy "####" terminator and
+                return the UTF-8 text before it
 
-        # Try to interpret as ASCII
+        Returns:
+            dict: The extracted message
+        """
+        pixels = self._context(image_path).rgb
+        height, width = pixels.shape[:2]
+        total_bits = width * height
+
+        header = self._parity_header(read_parity_bits(pixels, HEADER_BITS), total_bits)
+        if header is not None:
+            bits = read_parity_bits(pixels, HEADER_BITS + header["length"] * 8)
+            return payload_report(header, np.packbits(bits[HEADER_BITS:]).tobytes())
+
+        if until_terminator:
+            limit = total_bits if max_bits is None else min(max_bits, total_bits)
+            return self._parity_extract_until_terminator(pixels, limit)
+
+        return self._parity_report(read_parity_bits(pixels, self._parity_bit_budget(total_bits, max_bits)))
+
+    def _parity_header(self, bits, total_bits):
+        """Parse a framed payload header from the leading parity bits, or return None"""
+        if bits.size < HEADER_BITS:
+            return None
+        return parse_header(np.packbits(bits[:HEADER_BITS]).tobytes(), (total_bits - HEADER_BITS) // 8)
+
+    def _parity_bit_budget(self, total_bits, max_bits):
+        """Number of leading parity bits read as whole 8-bit characters"""
+        limit = min(total_bits, DEFAULT_PARITY_BITS if max_bits is None else max_bits)
+        return min(-(-limit // 8), total_bits // 8) * 8
+
+    def _parity_report(self, bits):
+        """Interpret parity bits as 8-bit characters"""
         try:
-            chunks = [binary_data[i:i+8] for i in range(0, min(len(binary_data), 1000), 8)]
-            ascii_text = ''.join(chr(int(chunk, 2)) for chunk in chunks if len(chunk) == 8)
-            return {"message": ascii_text}
+            return {"message": np.packbits(bits).tobytes().decode('latin-1')}
         except:
             return {"message": "No readable text found with parity method"}
 
+    def _parity_extract_until_terminator(self, pixels, max_bits):
+        """
+        Read parity bits in growing row bands until the terminator appears
+
+        Args:
+            pixels (numpy.ndarray): (H, W, 3) RGB array
+            max_bits (int): Maximum number of bits to read
+
+        Returns:
+            dict: The extracted message
+        """
+        height, width = pixels.shape[:2]
+        data = bytearray()
+        pending = np.empty(0, dtype=np.uint8)
+        rows_per_band = max(1, PARITY_BAND_BITS // width)
+        row = 0
+
+        while row < height and len(data) * 8 + pending.size < max_bits:
+            checkpoint()
+            band = pixels[row:row + rows_per_band]
+            row += band.shape[0]
+            rows_per_band *= 2
+
+            bits = np.concatenate([pending, parity_bits(band)])[:max_bits - len(data) * 8]
+            whole = bits.size // 8 * 8
+            search_from = max(0, len(data) - len(TERMINATOR) + 1)
+            data += np.packbits(bits[:whole]).tobytes()
+            pending = bits[whole:]
+
+            index = data.find(TERMINATOR, search_from)
+            if index >= 0:
+                return {"message": bytes(data[:index]).decode('utf-8', errors='replace'), "format": "legacy"}
+
+        return {"message": "No terminated message found with parity method"}
+
+    @register_method(cost=COST_CHEAP, version=1)
     def metadata_extraction(self, image_path):
         """Extract metadata from the image"""
-        img = Image.open(image_path)
+        context = self._context(image_path)
         metadata = {}
 
         # Extract basic metadata
-        metadata["format"] = img.format
-        metadata["mode"] = img.mode
-        metadata["size"] = img.size
+        metadata.update(context.header)
 
-        # Extract EXIF data if available
-        if hasattr(img, '_getexif') and img._getexif():
+        # Extract EXIF data if available, without decoding the pixels
+        tags = context.exif()
+        if tags:
             exif = {
-                str(k): str(v) for k, v in img._getexif().items()
+                str(k): str(v) for k, v in tags.items()
                 if isinstance(v, (str, int, float, bytes))
             }
             metadata["exif"] = exif
 
         return metadata
 
-    def dct_analysis(self, image_path):
+    @register_method(dependencies=("cv2", "scipy.fftpack"), cost=COST_EXPENSIVE, version=5)
+    def dct_analysis(self, image_path, dtype="float64", sample_fraction=None, max_samples=None,
+                     seed=0, source=None):
         """
         Analyze DCT coefficients for signs of steganography
 
+        The grayscale image is split into 8x8 blocks that are transformed in
+        batches; a block is suspicious when most of its coefficients are odd.
+        With the "auto" or "coefficients" source, the quantized coefficients of
+        a baseline JPEG's luminance component are read from the entropy-coded
+        data instead; that is where JPEG steganography embeds. The reader is
+        pure Python and several times slower than the pixel path, so it is
+        opt-in. In "auto", JPEGs without a luminance component (RGB, CMYK,
+        YCCK) use the pixel path.
+        With sample_fraction or max_samples only a seeded random sample of
+        blocks is analyzed, and the result gains a "sampling" entry with the
+        confidence interval of the estimated confidence.
+
         Args:
-            image_path (str): Path to the image file
+            image_path: Path, encoded bytes, file object, PIL image, pixel array or
+                shared ImageContext
+            dtype (str): Floating-point precision of the transform, "float64" or
+                "float32" (half the memory, counts may differ slightly)
+            sample_fraction (float, optional): Fraction of the blocks to sample
+            max_samples (int, optional): Maximum number of blocks to sample
+            seed (int): Random seed of the sample
+            source (str, optional): "pixels", "auto" (quantized coefficients for
+                baseline JPEGs, pixels otherwise) or "coefficients"; defaults to
+                the engine's dct_source, "pixels" unless set
 
         Returns:
             dict: Analysis results
         """
         try:
-            # Read image using OpenCV
-            img = cv2.imread(image_path)
-            if img is None:
-                return {"error": "Could not read image with OpenCV"}
-
-            # Convert to grayscale for simplicity
-            gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-
-            # Divide the image into 8x8 blocks (standard for DCT)
-            h, w = gray.shape
-            block_size = 8
-
-            # Store coefficient statistics
-            dct_stats = {
-                "zero_count": 0,
-                "nonzero_count": 0,
-                "suspicious_blocks": 0,
-                "total_blocks": 0
-            }
+            source = self.dct_source if source is None else source
+            if source not in ("auto", "coefficients", "pixels"):
+                raise ValueError(f"Unknown coefficient source: {source}")
+            context = self._context(image_path)
+
+            luma = None
+            if source == "coefficients" or (source == "auto" and context.is_jpeg):
+                try:
+                    luma = self._jpeg_luma(context)
+                except NotImplementedError:
+                    # Progressive and other JPEG processes, and JPEGs without a
+                    # luminance component, use the pixel path
+                    if source == "coefficients":
+                        raise
+
+            if luma is not None:
+                population = luma.shape[0] * luma.shape[1]
+                size = sample_size(population, sample_fraction, max_samples)
+                if size is not None:
+                    luma = luma.reshape(-1, BLOCK_SIZE, BLOCK_SIZE)[sample_indices(population, size, seed)]
+                report = self._dct_report(quantized_coefficient_statistics(luma), "jpeg_coefficients")
+            else:
+                width, height = context.header["size"]
+                population = (width // BLOCK_SIZE) * (height // BLOCK_SIZE)
+                size = sample_size(population, sample_fraction, max_samples)
+                if size is not None:
+                    blocks = sample_gray_blocks(context.rgb, size, seed)
+                    stats = block_stack_dct_statistics(blocks, dtype=np.dtype(dtype))
+                else:
+                    # All complete 8x8 blocks of the shared grayscale view
+                    stats = block_dct_statistics(context.gray, dtype=np.dtype(dtype))
+                report = self._dct_report(stats)
+
+            if size is not None:
+                low, high = proportion_interval(report["statistics"]["suspicious_blocks"], size, population)
+                report["sampling"] = sampling_report("blocks", size, population, seed, low * 100, high * 100)
+            return report
 
-            # Process each 8x8 block
-            for y in range(0, h-block_size+1, block_size):
-                for x in range(0, w-block_size+1, block_size):
-                    # Extract block
-                    block = gray[y:y+block_size, x:x+block_size].astype(float)
+        except Exception as e:
+            return {"error": f"DCT analysis failed: {str(e)}"}
 
-                    # Apply DCT
-                    block_dct = dct(dct(block.T, norm='ortho').T, norm='ortho')
+    def _jpeg_luma(self, context):
+        """
+        Read the quantized luminance coefficients of an encoded JPEG
 
-                    # Analyze DCT coefficients
-                    # In steganography, often the least significant bits of DCT coefficients are modified
-                    # Look for unusual patterns in the coefficients
+        Only the blocks wholly inside the image are returned, the same block
+        grid the pixel path analyzes.
 
-                    # Count zero and non-zero coefficients
-                    zero_coeffs = np.count_nonzero(block_dct == 0)
-                    nonzero_coeffs = block_size * block_size - zero_coeffs
+        Args:
+            context (ImageContext): Shared image context
 
-                    dct_stats["zero_count"] += zero_coeffs
-                    dct_stats["nonzero_count"] += nonzero_coeffs
-                    dct_stats["total_blocks"] += 1
+        Returns:
+            numpy.ndarray: (block rows, block columns, 8, 8) coefficients
 
-                    # Check for suspicious patterns
-                    # One simple check: unusual number of coefficients with odd values
-                    odd_coeffs = np.count_nonzero(np.abs(block_dct) % 2 > 0.5)
-                    if odd_coeffs > (block_size * block_size * 0.7):  # Threshold can be adjusted
-                        dct_stats["suspicious_blocks"] += 1
+        Raises:
+            ValueError: If the image is not an encoded JPEG
+            NotImplementedError: If the JPEG is not baseline sequential, or has no
+                luminance component (RGB, CMYK and YCCK JPEGs)
+        """
+        for component in context.jpeg_coefficients:
+            if component.luminance:
+                return component.complete_blocks()
+        raise NotImplementedError("The JPEG has no luminance component")
 
-            # Calculate confidence score (simple heuristic)
-            if dct_stats["total_blocks"] > 0:
-                confidence = (dct_stats["suspicious_blocks"] / dct_stats["total_blocks"]) * 100
-            else:
-                confidence = 0
+    def _reads_jpeg_coefficients(self, context):
+        """True if dct_analysis reads the image's quantized coefficients rather than its pixels"""
+        try:
+            if self.dct_source == "pixels" or not context.is_jpeg:
+                return False
+            if self.dct_source == "coefficients":
+                return True
+            self._jpeg_luma(context)
+            return True
+        except NotImplementedError:
+            return False
+        except Exception:
+            # Left to dct_analysis, which reports the error
+            return True
+
+    def _dct_report(self, dct_stats, source="pixels"):
+        """Build the DCT analysis result from the block statistics and their source"""
+        # Calculate confidence score (simple heuristic)
+        if dct_stats["total_blocks"] > 0:
+            confidence = (dct_stats["suspicious_blocks"] / dct_stats["total_blocks"]) * 100
+        else:
+            confidence = 0
+
+        return {
+            "statistics": dct_stats,
+            "source": source,
+            "confidence": confidence,
+            "assessment": "Suspicious" if confidence > 30 else "Likely clean",
+            "message": f"DCT analysis complete. Confidence that steganography is present: {confidence:.2f}%"
+        }
+
+    @register_method(cost=COST_CHEAP, version=3)
+    def bit_plane_analysis(self, image_path, sample_fraction=None, max_samples=None, seed=0):
+        """
+        Analyze bit planes for signs of steganography
 
-            return {
-                "statistics": dct_stats,
-                "confidence": confidence,
-                "assessment": "Suspicious" if confidence > 30 else "Likely clean",
-                "message": f"DCT analysis complete. Confidence that steganography is present: {confidence:.2f}%"
-            }
+        The ones count of every bit plane is read off the value histogram of
+        each channel, which is shared with histogram_analysis. With
+        sample_fraction or max_samples the histograms of a seeded random
+        sample of pixels are used, and the result gains a "sampling" entry
+        with the confidence interval of the estimated confidence. The LSB
+        planes of alpha and 16-bit bands, which the RGB form does not carry,
+        are reported per band under "bands".
+
+        Args:
+            image_path: Path, encoded bytes, file object, PIL image, pixel array or
+                shared ImageContext
+            sample_fraction (float, optional): Fraction of the pixels to sample
+            max_samples (int, optional): Maximum number of pixels to sample
+            seed (int): Random seed of the sample
+
+        Returns:
+            dict: Analysis results with bit plane data
+        """
+        try:
+            context = self._context(image_path)
+            sample = self._sampled_histograms(context, sample_fraction, max_samples, seed)
+            if sample is None:
+                # Histograms shared through the image context
+                return self._with_band_planes(self._bit_plane_report(context.histograms), context)
+
+            histograms, size, population = sample
+            report = self._with_band_planes(self._bit_plane_report(histograms), context)
+
+            # Only the LSB plane can be suspicious (an entropy above 0.95 in any
+            # channel); decide whether it is so for certain or possibly
+            bounds = [entropy_bounds(int(bit_plane_ones(histogram)[0]), size, population)
+                      for histogram in histograms]
+            certain = any(low > 0.95 for low, _ in bounds)
+            possible = any(high > 0.95 for _, high in bounds)
+            report["sampling"] = sampling_report(
+                "pixels", size, population, seed, certain / 24 * 100, possible / 24 * 100
+            )
+            return report
 
         except Exception as e:
-            return {"error": f"DCT analysis failed: {str(e)}"}
+            return {"error": f"Bit plane analysis failed: {str(e)}"}
 
-    def bit_plane_analysis(self, image_path):
+    def _with_band_planes(self, report, context):
         """
-        Analyze bit planes for signs of steganography
+        Add the LSB plane statistics of the alpha and 16-bit bands to a bit-plane report
 
         Args:
-            image_path (str): Path to the image file
+            report (dict): Bit-plane analysis result of the RGB channels
+            context (ImageContext): Shared image context
 
         Returns:
-            dict: Analysis results with bit plane data
+            dict: The report, with a "bands" entry if the image has such bands
         """
-        try:
-            # Open image with PIL
-            img = Image.open(image_path)
-            img = img.convert("RGB")
+        bands = {
+            name: self._band_plane_report(plane.dtype.itemsize * 8, int(np.count_nonzero(plane & 1)), plane.size)
+            for name, plane in context.extra_bands()
+        }
+        if bands:
+            report["bands"] = bands
+        return report
+
+    def _band_plane_report(self, bit_depth, ones, total):
+        """Build the LSB plane statistics of one extra band"""
+        entropy = binary_entropy(ones, total)
+        return {
+            "bit_depth": bit_depth,
+            "lsb": {
+                "ones": ones,
+                "zeros": total - ones,
+                "entropy": entropy,
+                "suspicious": entropy > 0.95
+            }
+        }
 
-            # Convert to numpy array
-            img_array = np.array(img)
-
-            # Extract channels
-            r_channel = img_array[:, :, 0]
-            g_channel = img_array[:, :, 1]
-            b_channel = img_array[:, :, 2]
-
-            # Analyze each bit plane
-            results = {}
-            suspicious_planes = 0
-
-            # Function to analyze a single bit plane
-            def analyze_bit_plane(channel, bit_position):
-                # Extract the bit plane
-                bit_plane = (channel >> bit_position) & 1
-
-                # Calculate statistics
-                ones = np.count_nonzero(bit_plane)
-                zeros = bit_plane.size - ones
-
-                # Calculate entropy (randomness)
-                # More random bit planes might indicate hidden data
-                p_ones = ones / bit_plane.size
-                p_zeros = zeros / bit_plane.size
-
-                entropy = 0
-                if p_ones > 0:
-                    entropy -= p_ones * np.log2(p_ones)
-                if p_zeros > 0:
-                    entropy -= p_zeros * np.log2(p_zeros)
-
-                # Check for suspicious patterns
-                # High entropy in lower bit planes can indicate steganography
-                is_suspicious = False
-                if bit_position == 0 and entropy > 0.95:  # LSB with high entropy
-                    is_suspicious = True
-
-                return {
-                    "ones": ones,
-                    "zeros": zeros,
-                    "entropy": entropy,
-                    "suspicious": is_suspicious
-                }
+    def _sampled_histograms(self, context, sample_fraction, max_samples, seed):
+        """
+        Build the RGB value histograms of a random pixel sample
 
-            # Analyze each bit plane for each channel
-            for bit in range(8):  # 8 bits per channel
-                r_analysis = analyze_bit_plane(r_channel, bit)
-                g_analysis = analyze_bit_plane(g_channel, bit)
-                b_analysis = analyze_bit_plane(b_channel, bit)
+        Args:
+            context (ImageContext): Shared image context
+            sample_fraction (float): Fraction of the pixels to sample, or None
+            max_samples (int): Maximum number of pixels to sample, or None
+            seed (int): Random seed of the sample
 
-                results[f"bit_{bit}"] = {
-                    "red": r_analysis,
-                    "green": g_analysis,
-                    "blue": b_analysis
-                }
+        Returns:
+            tuple: (histograms, sample size, pixel count), or None if the whole
+                image is to be analyzed
+        """
+        width, height = context.header["size"]
+        population = width * height
+        size = sample_size(population, sample_fraction, max_samples)
+        if size is None:
+            return None
+        return channel_histograms(sample_pixels(context.rgb, size, seed)), size, population
+
+    def _bit_plane_report(self, histograms):
+        """Build the bit-plane analysis result from the RGB value histograms"""
+        total = int(histograms[0].sum())
+
+        # Per-channel ones counts for all 8 bit planes
+        channel_ones = {
+            name: bit_plane_ones(histograms[index])
+            for index, name in enumerate(["red", "green", "blue"])
+        }
+
+        # Analyze each bit plane
+        results = {}
+        suspicious_planes = 0
 
-                if r_analysis["suspicious"] or g_analysis["suspicious"] or b_analysis["suspicious"]:
-                    suspicious_planes += 1
+        # Function to analyze a single bit plane from its ones count
+        def analyze_bit_plane(ones, bit_position):
+            ones = int(ones)
 
-            # Calculate overall confidence
-            confidence = (suspicious_planes / 24) * 100  # 24 bit planes total (8 per channel)
+            # Calculate entropy (randomness)
+            # More random bit planes might indicate hidden data
+            entropy = binary_entropy(ones, total)
+
+            # Check for suspicious patterns
+            # High entropy in lower bit planes can indicate steganography
+            is_suspicious = False
+            if bit_position == 0 and entropy > 0.95:  # LSB with high entropy
+                is_suspicious = True
 
             return {
-                "bit_planes": results,
-                "suspicious_planes": suspicious_planes,
-                "confidence": confidence,
-                "assessment": "Suspicious" if confidence > 20 else "Likely clean",
-                "message": f"Bit plane analysis complete. Confidence that steganography is present: {confidence:.2f}%"
+                "ones": ones,
+                "zeros": total - ones,
+                "entropy": entropy,
+                "suspicious": is_suspicious
             }
 
-        except Exception as e:
-            return {"error": f"Bit plane analysis failed: {str(e)}"}
+        # Analyze each bit plane for each channel
+        for bit in range(8):  # 8 bits per channel
+            r_analysis = analyze_bit_plane(channel_ones["red"][bit], bit)
+            g_analysis = analyze_bit_plane(channel_ones["green"][bit], bit)
+            b_analysis = analyze_bit_plane(channel_ones["blue"][bit], bit)
 
-    def histogram_analysis(self, image_path):
+            results[f"bit_{bit}"] = {
+                "red": r_analysis,
+                "green": g_analysis,
+                "blue": b_analysis
+            }
+
+            if r_analysis["suspicious"] or g_analysis["suspicious"] or b_analysis["suspicious"]:
+                suspicious_planes += 1
+
+        # Calculate overall confidence
+        confidence = (suspicious_planes / 24) * 100  # 24 bit planes total (8 per channel)
+
+        return {
+            "bit_planes": results,
+            "suspicious_planes": suspicious_planes,
+            "confidence": confidence,
+            "assessment": "Suspicious" if confidence > 20 else "Likely clean",
+            "message": f"Bit plane analysis complete. Confidence that steganography is present: {confidence:.2f}%"
+        }
+
+    @register_method(cost=COST_CHEAP, version=1)
+    def histogram_analysis(self, image_path, sample_fraction=None, max_samples=None, seed=0):
         """
         Analyze image histograms for signs of steganography
 
+        With sample_fraction or max_samples the histograms of a seeded random
+        sample of pixels are used, and the result gains a "sampling" entry
+        with the confidence interval of the estimated confidence.
+
         Args:
-            image_path (str): Path to the image file
+            image_path: Path, encoded bytes, file object, PIL image, pixel array or
+                shared ImageContext
+            sample_fraction (float, optional): Fraction of the pixels to sample
+            max_samples (int, optional): Maximum number of pixels to sample
+            seed (int): Random seed of the sample
 
         Returns:
             dict: Analysis results with histogram data
         """
         try:
-            # Open image with PIL
-            img = Image.open(image_path)
-            img = img.convert("RGB")
+            context = self._context(image_path)
+            sample = self._sampled_histograms(context, sample_fraction, max_samples, seed)
+            if sample is None:
+                # Histograms shared through the image context (one bincount per channel)
+                return self._histogram_report(context.histograms)
+
+            histograms, size, population = sample
+            report = self._histogram_report(histograms)
+
+            # Average the certain and possible suspicious pair ratios over the channels
+            bounds = [pair_suspicion_bounds(histogram, size, population) for histogram in histograms]
+            low = sum(certain for certain, _ in bounds) / (128 * 3) * 100
+            high = sum(possible for _, possible in bounds) / (128 * 3) * 100
+            report["sampling"] = sampling_report("pixels", size, population, seed, low, high)
+            return report
 
-            # Convert to numpy array
-            img_array = np.array(img)
+        except Exception as e:
+            return {"error": f"Histogram analysis failed: {str(e)}"}
+
+    def _histogram_report(self, histograms):
+        """Build the histogram analysis result from the RGB value histograms"""
+        r_hist, g_hist, b_hist = histograms
+
+        # Analyze histograms for signs of steganography
+        # One approach: check for "pair-wise" patterns in LSB steganography
+        # In LSB steganography, pairs of values (2n, 2n+1) tend to be equalized
+        r_analysis = pair_statistics(r_hist)
+        g_analysis = pair_statistics(g_hist)
+        b_analysis = pair_statistics(b_hist)
+
+        # Calculate overall confidence
+        avg_suspicion = (r_analysis["suspicion_ratio"] +
+                        g_analysis["suspicion_ratio"] +
+                        b_analysis["suspicion_ratio"]) / 3
+
+        confidence = avg_suspicion * 100
+
+        # Generate histogram visualization
+        # This would normally save the visualization, but we'll just return the data
+
+        return {
+            "red_channel": r_analysis,
+            "green_channel": g_analysis,
+            "blue_channel": b_analysis,
+            "confidence": confidence,
+            "assessment": "Suspicious" if confidence > 40 else "Likely clean",
+            "message": f"Histogram analysis complete. Confidence that steganography is present: {confidence:.2f}%"
+        }
+
+    @register_method(cost=COST_CHEAP, version=1)
+    def sample_pair_analysis(self, image_path):
+        """
+        Estimate the LSB embedding rate with sample pair analysis
 
-            # Extract channels
-            r_channel = img_array[:, :, 0]
-            g_channel = img_array[:, :, 1]
-            b_channel = img_array[:, :, 2]
+        Adjacent pixel pairs of each channel are classified with whole-array
+        NumPy passes (see engine/sample_pairs.py), so the estimate costs about
+        as much as the histogram statistics.
 
-            # Calculate histograms
-            r_hist, _ = np.histogram(r_channel, bins=256, range=(0, 256))
-            g_hist, _ = np.histogram(g_channel, bins=256, range=(0, 256))
-            b_hist, _ = np.histogram(b_channel, bins=256, range=(0, 256))
+        Args:
+            image_path: Path, encoded bytes, file object, PIL image, pixel array or
+                shared ImageContext
 
-            # Analyze histograms for signs of steganography
-            # One approach: check for "pair-wise" patterns in LSB steganography
-            # In LSB steganography, pairs of values (2n, 2n+1) tend to be equalized
+        Returns:
+            dict: Analysis results with the estimated embedding rate per channel
+        """
+        try:
+            return self._sample_pair_report(sample_pair_counts(self._context(image_path).rgb))
 
-            def analyze_histogram(hist):
-                pairs_count = 0
-                suspicious_pairs = 0
+        except Exception as e:
+            return {"error": f"Sample pair analysis failed: {str(e)}"}
 
-                for i in range(0, 256, 2):
-                    even_val = hist[i]
-                    odd_val = hist[i+1]
+    def _sample_pair_report(self, counts):
+        """Build the sample pair analysis result from the per-channel pair counts"""
+        results = {}
+        for index, name in enumerate(["red", "green", "blue"]):
+            results[f"{name}_channel"] = {
+                "embedding_rate": embedding_rate(counts[index]),
+                "pairs": dict(zip(PAIR_COUNT_FIELDS, (int(value) for value in counts[index])))
+            }
 
-                    pairs_count += 1
+        # Payloads are spread over all channels, so average the estimates
+        rate = sum(channel["embedding_rate"] for channel in results.values()) / 3
+        confidence = rate * 100
 
-                    # If the values are very close, it might indicate LSB manipulation
-                    if abs(even_val - odd_val) < (even_val + odd_val) * 0.05:  # Within 5%
-                        suspicious_pairs += 1
+        results.update({
+            "embedding_rate": rate,
+            "confidence": confidence,
+            "assessment": "Suspicious" if confidence > 10 else "Likely clean",
+            "message": f"Sample pair analysis complete. Estimated embedding rate: {confidence:.2f}% of pixels"
+        })
+        return results
 
-                return {
-                    "total_pairs": pairs_count,
-                    "suspicious_pairs": suspicious_pairs,
-                    "suspicion_ratio": suspicious_pairs / pairs_count if pairs_count > 0 else 0
-                }
+    def detect_format(self, image_path):
+        """
+        Detect the format of an image file
 
-            r_analysis = analyze_histogram(r_hist)
-            g_analysis = analyze_histogram(g_hist)
-            b_analysis = analyze_histogram(b_hist)
+        Args:
+            image_path: Path, encoded bytes, file object, PIL image or shared ImageContext
 
-            # Calculate overall confidence
-            avg_suspicion = (r_analysis["suspicion_ratio"] +
-                            g_analysis["suspicion_ratio"] +
-                            b_analysis["suspicion_ratio"]) / 3
+        Returns:
+            str: Detected format
+        """
+        try:
+            image_format = self._context(image_path).header["format"]
+            if image_format is None:
+                return "Unknown format: the image has no encoded form"
+            return image_format.lower()
+        except Exception as e:
+            return f"Unknown format: {str(e)}"
 
-            confidence = avg_suspicion * 100
+    def capacity(self, image_path, method="lsb_encoding", payload_format="framed"):
+        """
+        Compute how much an encoder can hide in a cover image
 
-            # Generate histogram visualization
-            # This would normally save the visualization, but we'll just return the data
+        Only the image header is read; no pixels are decoded.
 
-            return {
-                "red_channel": r_analysis,
-                "green_channel": g_analysis,
-                "blue_channel": b_analysis,
-                "confidence": confidence,
-                "assessment": "Suspicious" if confidence > 40 else "Likely clean",
-                "message": f"Histogram analysis complete. Confidence that steganography is present: {confidence:.2f}%"
-            }
+        Args:
+            image_path: Path, encoded bytes, file object, PIL image, pixel array or
+                shared ImageContext
+            method (str): "lsb_encoding" or "parity_bit_encoding"
+            payload_format (str): "framed" or "legacy"
 
+        Returns:
+            dict: method, width, height, mode, capacity_bits (including the
+                header or terminator) and capacity_bytes (the longest message, in bytes)
+        """
+        try:
+            return cover_capacity(image_path, method, payload_format)
         except Exception as e:
-            return {"error": f"Histogram analysis failed: {str(e)}"}
+            return {"error": f"Capacity check failed: {str(e)}"}
 
-    def detect_format(self, image_path):
+    def rank_covers(self, directory, method="lsb_encoding", min_bytes=0, payload_format="framed"):
         """
-        Detect the format of an image file
+        Rank the candidate cover images of a directory by capacity
+
+        Only headers are read, so a directory is ranked in about a
+        millisecond per file. Files that are not images are skipped.
 
         Args:
-            image_path (str): Path to the image file
+            directory (str): Directory of candidate covers
+            method (str): "lsb_encoding" or "parity_bit_encoding"
+            min_bytes (int): Leave out covers too small for a message of this many bytes
+            payload_format (str): "framed" or "legacy"
 
         Returns:
-            str: Detected format
+            list: capacity results with a "path" key, largest first
         """
         try:
-            with Image.open(image_path) as img:
-                return img.format.lower()
+            return rank_covers(directory, method, min_bytes, payload_format)
         except Exception as e:
-            return f"Unknown format: {str(e)}"
+            return {"error": f"Cover ranking failed: {str(e)}"}
 
-    def lsb_encoding(self, image_path, message, output_path):
+    def _oversized_message(self, image_path, message_bits, method):
         """
-        Encode a message using LSB steganography
+        Reject a message that cannot fit in the cover, from the header alone
 
         Args:
             image_path (str): Path to the cover image
-            message (str): Message to hide
-            output_path (str): Path to save the resulting image
+            message_bits (numpy.ndarray): Message bits including the header or terminator
+            method (str): Encoder name
 
         Returns:
-            bool: Success status
+            dict: The failure result, or None if the message fits
         """
-        try:
-            # Open the image
-            img = Image.open(image_path)
-            img = img.convert("RGB")
-            width, height = img.size
+        capacity_bits = cover_capacity(image_path, method)["capacity_bits"]
+        if message_bits.size <= capacity_bits:
+            return None
+        return {
+            "success": False,
+            "error": "Message is too long to hide in this image.",
+            "bits_needed": int(message_bits.size),
+            "capacity": capacity_bits
+        }
+
+    def _payload(self, message, payload_format):
+        """
+        Build the byte stream an encoder embeds
 
-            # Add terminator to the message
-            message_bytes = message.encode() + b"####"
-            binary_message = ''.join(format(byte, '08b') for byte in message_bytes)
-            message_len = len(binary_message)
+        Args:
+            message (str or bytes): Text or binary data
+            payload_format (str): "framed" or "legacy"
 
-            # Check if the image is large enough to hold the message
-            if message_len > width * height * 3:
-                return {
-                    "success": False,
-                    "error": "Message is too long to hide in this image."
-                }
+        Returns:
+            bytes: The header and payload, or the legacy message and terminator
+        """
+        data, binary = message_bytes(message)
+        if payload_format == "framed":
+            return frame_payload(data, binary)
+        if payload_format == "legacy":
+            if binary:
+                raise ValueError("Binary payloads need the framed payload format")
+            return data + TERMINATOR
+        raise ValueError(f"Unknown payload format: {payload_format}")
+
+    def _open_cover(self, image_path):
+        """
+        Open a cover image in a mode the pixel encoders can write
 
-            # Get pixel data
-            pixels = img.load()
-            index = 0
+        Args:
+            image_path (str): Path to the cover image
 
-            # Embed the message
-            for y in range(height):
-                for x in range(width):
-                    r, g, b = pixels[x, y]
+        Returns:
+            PIL.Image.Image: The image as RGB or RGBA; other modes are converted to RGB
+        """
+        img = Image.open(image_path)
+        if img.mode not in ("RGB", "RGBA"):
+            img = img.convert("RGB")
+        return img
 
-                    # Modify the least significant bit of each color channel
-                    if index < message_len:
-                        r = (r & 0xFE) | int(binary_message[index])
-                        index += 1
-                    if index < message_len:
-                        g = (g & 0xFE) | int(binary_message[index])
-                        index += 1
-                    if index < message_len:
-                        b = (b & 0xFE) | int(binary_message[index])
-                        index += 1
+    def lsb_encoding(self, image_path, message, output_path, payload_format="framed"):
+        """
+        Encode a message using LSB steganography
 
-                    pixels[x, y] = (r, g, b)
+        Args:
+            image_path (str): Path to the cover image
+            message (str or bytes): Text, or binary data, to hide
+            output_path (str): Path to save the resulting image
+            payload_format (str): "framed" (header with length and CRC-32) or
+                "legacy" (text followed by the "####" terminator)
 
-                    if index >= message_len:
-                        break
+        Returns:
+            bool: Success status
+        """
+        try:
+            # Frame the message, or add the legacy terminator
+            message_bits = unpack_bits(self._payload(message, payload_format))
+            message_len = message_bits.size
 
-                if index >= message_len:
-                    break
+            # Check from the header that the image can hold the message, before decoding it
+            oversized = self._oversized_message(image_path, message_bits, "lsb_encoding")
+            if oversized:
+                return oversized
+
+            # Open the image; RGBA covers keep their alpha band
+            img = self._open_cover(image_path)
+            width, height = img.size
+
+            # Replace the least significant bit of the first message_len channel values
+            # (R, G, B of each pixel in raster order) with the message bits
+            pixels = np.array(img)
+            head = pixels.reshape(-1, pixels.shape[2])[:-(-message_len // 3), :3]
+            channels = head.reshape(-1)
+            channels[:message_len] = (channels[:message_len] & 0xFE) | message_bits
+            head[...] = channels.reshape(head.shape)
+            img.frombytes(pixels.tobytes())
 
             # Save the image
             img.save(output_path, "PNG")
@@ -439,68 +1430,46 @@ class StegnoxEngine:
                 "error": f"LSB encoding failed: {str(e)}"
             }
 
-    def parity_bit_encoding(self, image_path, message, output_path):
+    def parity_bit_encoding(self, image_path, message, output_path, payload_format="framed"):
         """
         Encode a message using parity bit steganography
 
         Args:
             image_path (str): Path to the cover image
-            message (str): Message to hide
+            message (str or bytes): Text, or binary data, to hide
             output_path (str): Path to save the resulting image
+            payload_format (str): "framed" (header with length and CRC-32) or
+                "legacy" (text followed by the "####" terminator)
 
         Returns:
             bool: Success status
         """
         try:
-            # Open the image
-            img = Image.open(image_path)
-            img = img.convert("RGB")
-            width, height = img.size
-
-            # Convert message to binary
-            message_bytes = message.encode() + b"####"
-            binary_message = ''.join(format(byte, '08b') for byte in message_bytes)
-            message_len = len(binary_message)
+            # Frame the message, or add the legacy terminator
+            message_bits = unpack_bits(self._payload(message, payload_format))
+            message_len = message_bits.size
 
-            # Check if the image is large enough to hold the message
-            if message_len > width * height:
-                return {
-                    "success": False,
-                    "error": "Message is too long to hide in this image."
-                }
-
-            # Get pixel data
-            pixels = img.load()
-            index = 0
-
-            # Embed the message using parity
-            for y in range(height):
-                for x in range(width):
-                    if index < message_len:
-                        r, g, b = pixels[x, y]
-
-                        # Calculate current parity
-                        current_parity = (r + g + b) % 2
+            # Check from the header that the image can hold the message, before decoding it
+            oversized = self._oversized_message(image_path, message_bits, "parity_bit_encoding")
+            if oversized:
+                return oversized
 
-                        # Desired parity based on message bit
-                        desired_parity = int(binary_message[index])
-
-                        # If parity doesn't match, adjust one of the channels
-                        if current_parity != desired_parity:
-                            # Modify the blue channel (least visually noticeable)
-                            if b > 0:
-                                b -= 1
-                            else:
-                                b += 1
-
-                        pixels[x, y] = (r, g, b)
-                        index += 1
-
-                    if index >= message_len:
-                        break
+            # Open the image; RGBA covers keep their alpha band
+            img = self._open_cover(image_path)
+            width, height = img.size
 
-                if index >= message_len:
-                    break
+            # Embed the message using parity: each of the first message_len pixels
+            # gets (r + g + b) % 2 equal to its message bit
+            pixels = np.array(img)
+            head = pixels.reshape(-1, pixels.shape[2])[:message_len]
+            current_parity = head[:, :3].sum(axis=1, dtype=np.uint16) & 1
+            mismatched = current_parity != message_bits
+
+            # Fix mismatches on the blue channel (least visually noticeable):
+            # step down by one, or up when the value is already 0
+            blue = head[mismatched, 2]
+            head[mismatched, 2] = np.where(blue > 0, blue - 1, 1)
+            img.frombytes(pixels.tobytes())
 
             # Save the image
             img.save(output_path, "PNG")
@@ -0,0 +1,316 @@
+"""
+Tiled, memory-bounded analysis for the StegnoX engine
+
+Very large images are processed as horizontal bands of rows. Every band is
+decoded once and fed to accumulators for the histogram, bit-plane, sample
+pair, DCT, LSB and parity statistics of its RGB form, and for the LSB
+statistics and streams of its alpha and 16-bit bands, so no full-size RGB,
+grayscale or floating-point array is ever built. Band heights are multiples
+of the DCT block size, so the block grid is the same as for the whole image.
+
+PNG files are decoded band by band from their compressed data. Other
+formats are cropped from a PIL image, which decodes the whole image into
+its own buffer first; for them the memory limit covers the arrays derived
+from each band, not that buffer.
+"""
+
+import numpy as np
+
+from .bands import extra_bands, has_extra_bands, stored_dtype
+from .bitstream import TERMINATOR, find_bit_pattern, parity_bits
+from .block_dct import BLOCK_SIZE, block_dct_statistics
+from .channel_stats import channel_histograms
+from .payload import HEADER_BITS, HEADER_SIZE, parse_header
+from .png_stream import PngRowStream
+from .sample_pairs import sample_pair_counts
+
+# Working memory per pixel of a band: decoded band and RGB copy, grayscale,
+# bit temporaries and the float64 DCT batch
+TILE_BYTES_PER_PIXEL = 24
+
+# Working memory per pixel when a whole image is analyzed at once
+FULL_BYTES_PER_PIXEL = 12
+
+
+def band_height_for(width, memory_limit):
+    """
+    Choose the band height that keeps band processing under a memory limit
+
+    Args:
+        width (int): Image width in pixels
+        memory_limit (int): Memory ceiling in bytes
+
+    Returns:
+        int: Band height, a positive multiple of the DCT block size
+    """
+    rows = memory_limit // max(1, width * TILE_BYTES_PER_PIXEL)
+    return max(BLOCK_SIZE, rows // BLOCK_SIZE * BLOCK_SIZE)
+
+
+def needs_tiling(width, height, memory_limit):
+    """
+    Decide whether whole-image analysis would exceed a memory limit
+
+    Args:
+        width (int): Image width in pixels
+        height (int): Image height in pixels
+        memory_limit (int, optional): Memory ceiling in bytes; None means no limit
+
+    Returns:
+        bool: True if the image should be analyzed in bands
+    """
+    return memory_limit is not None and width * height * FULL_BYTES_PER_PIXEL > memory_limit
+
+
+def _streamed_png_bands(context, band_height):
+    """Open a PNG whose bands can be decoded from its compressed data, or return None"""
+    if context.header["format"] != "PNG":
+        return None
+    stream = context.open_file()
+    try:
+        png = PngRowStream(stream)
+    except (ValueError, NotImplementedError):
+        stream.close()
+        return None
+    if not png.streams_bands:
+        stream.close()
+        return None
+    return stream, png.iter_bands(band_height)
+
+
+def iter_bands(context, band_height):
+    """
+    Yield horizontal bands of an image, in RGB and with its extra bands
+
+    When the context already holds its decoded arrays, or its pixel cache has
+    them memory-mapped, the bands are views of them. A PNG is otherwise decoded band by band from the
+    file; other images are cropped band by band from the PIL image.
+
+    Args:
+        context (ImageContext): The image
+        band_height (int): Rows per band
+
+    Yields:
+        tuple: ((rows, W, 3) uint8 RGB band, list of (band name, plane) pairs of
+            the band's alpha and 16-bit samples, as ImageContext.extra_bands)
+    """
+    mode = context.header["mode"]
+    wide = has_extra_bands(mode)
+    pixels = context.cached_rgb()
+    extras = context.cached_extra_bands() if wide else []
+    if pixels is not None and extras is not None:
+        for top in range(0, pixels.shape[0], band_height):
+            yield pixels[top:top + band_height], \
+                [(name, plane[top:top + band_height]) for name, plane in extras]
+        return
+
+    streamed = _streamed_png_bands(context, band_height) if context.is_encoded else None
+    if streamed is not None:
+        stream, bands = streamed
+        with stream:
+            for native_band, rgb in bands:
+                yield rgb, extra_bands(native_band, mode) if wide else []
+        return
+
+    with context.opened() as img:
+        width, height = img.size
+        dtype = stored_dtype(img)
+        for top in range(0, height, band_height):
+            band = img.crop((0, top, width, min(height, top + band_height)))
+            extras = []
+            if wide:
+                native_band = np.asarray(band)
+                extras = extra_bands(native_band if dtype is None else native_band.astype(dtype), mode)
+            yield np.asarray(band.convert("RGB")), extras
+
+
+class TiledAnalysis:
+    """Accumulates engine statistics over the row bands of one image"""
+
+    def __init__(self, histograms=True, dct=True, lsb=True, parity_bits_needed=0,
+                 lsb_byte_limit=None, dtype=np.float64, sample_pairs=False, band_planes=False):
+        """
+        Initialize the accumulators
+
+        Args:
+            histograms (bool): Accumulate per-channel value histograms
+            dct (bool): Accumulate block DCT statistics
+            lsb (bool): Collect the LSB stream up to a framed payload's length or
+                the legacy terminator
+            parity_bits_needed (int): Number of leading parity bits to collect; more
+                are collected if they begin with a framed payload header
+            lsb_byte_limit (int, optional): Stop collecting the LSB stream after this many
+                bytes without reaching the end of the payload
+            dtype: Floating-point type of the DCT
+            sample_pairs (bool): Accumulate per-channel sample pair counts
+            band_planes (bool): Count the LSB plane ones of each extra band
+        """
+        self.histograms = np.zeros((3, 256), dtype=np.int64) if histograms else None
+        self.dct_stats = {
+            "zero_count": 0,
+            "nonzero_count": 0,
+            "suspicious_blocks": 0,
+            "total_blocks": 0
+        } if dct else None
+        self.dtype = dtype
+
+        # Sample pair counts; the last row of a band pairs with the next band
+        self.pair_counts = np.zeros((3, 4), dtype=np.int64) if sample_pairs else None
+        self.last_row = None
+
+        # LSB stream state
+        self.lsb_active = lsb
+        self.lsb_byte_limit = lsb_byte_limit
+        self.lsb_data = bytearray()
+        self.lsb_pending = np.empty(0, dtype=np.uint8)
+        self.lsb_tail = np.empty(0, dtype=np.uint8)
+        self.lsb_bits_seen = 0
+        self.lsb_terminator_at = -1
+        self.lsb_overflow = False
+        self.lsb_header = None
+        self.lsb_header_checked = False
+        self.lsb_bits_available = None
+
+        # Parity stream state
+        self.parity_bits_needed = parity_bits_needed
+        self.parity_chunks = []
+        self.parity_count = 0
+        self.parity_header = None
+        self.parity_header_checked = False
+        self.parity_bits_available = None
+
+        # Extra bands: LSB plane counts, and an LSB stream per band when the
+        # RGB stream is collected
+        self.band_planes = {} if band_planes else None
+        self.band_streams = {} if lsb else None
+        self.band_bits_available = None
+
+    def add_band(self, band, extras=()):
+        """
+        Feed one band
+
+        Args:
+            band (numpy.ndarray): (rows, W, 3) uint8 RGB band, following the previous one
+            extras (list): (band name, plane) pairs of the band's alpha and 16-bit samples
+        """
+        for name, plane in extras:
+            self._add_extra_band(name, plane)
+
+        if self.histograms is not None:
+            self.histograms += channel_histograms(band)
+
+        if self.pair_counts is not None:
+            self.pair_counts += sample_pair_counts(band, self.last_row)
+            self.last_row = band[-1].copy()
+
+        if self.dct_stats is not None:
+            import cv2
+
+            gray = cv2.cvtColor(np.ascontiguousarray(band), cv2.COLOR_RGB2GRAY)
+            for key, value in block_dct_statistics(gray, dtype=self.dtype).items():
+                self.dct_stats[key] += value
+
+        if self.lsb_active:
+            self._add_lsb(band.reshape(-1) & 1)
+
+        if self.parity_count < self.parity_bits_needed:
+            self._add_parity(parity_bits(band))
+
+    def _add_extra_band(self, name, plane):
+        """Count the LSB plane of one extra band and extend its LSB stream"""
+        bits = plane.reshape(-1) & 1
+        if self.band_planes is not None:
+            counts = self.band_planes.setdefault(name, {
+                "bit_depth": plane.dtype.itemsize * 8,
+                "ones": 0,
+                "total": 0
+            })
+            counts["ones"] += int(np.count_nonzero(bits))
+            counts["total"] += bits.size
+
+        if self.band_streams is not None:
+            stream = self.band_streams.get(name)
+            if stream is None:
+                stream = TiledAnalysis(histograms=False, dct=False, lsb=True,
+                                       lsb_byte_limit=self.lsb_byte_limit)
+                stream.lsb_bits_available = self.band_bits_available
+                self.band_streams[name] = stream
+            if stream.lsb_active:
+                stream._add_lsb(bits.astype(np.uint8, copy=False))
+
+    def _add_parity(self, bits):
+        """Collect the leading parity bits, extending the count to a framed payload's length"""
+        used = 0
+        while self.parity_count < self.parity_bits_needed and used < bits.size:
+            chunk = bits[used:used + self.parity_bits_needed - self.parity_count]
+            used += chunk.size
+            self.parity_chunks.append(chunk)
+            self.parity_count += chunk.size
+
+            if not self.parity_header_checked and self.parity_count >= HEADER_BITS:
+                self.parity_header_checked = True
+                self.parity_header = parse_header(np.packbits(self.parity_bits()[:HEADER_BITS]).tobytes(),
+                                                  self._max_payload(self.parity_bits_available))
+                if self.parity_header is not None:
+                    self.parity_bits_needed = HEADER_BITS + self.parity_header["length"] * 8
+
+    def _add_lsb(self, bits):
+        """Append LSBs to the packed stream and look for the end of the payload"""
+        window = np.concatenate([self.lsb_tail, bits])
+
+        combined = np.concatenate([self.lsb_pending, bits])
+        whole = combined.size // 8 * 8
+        self.lsb_data += np.packbits(combined[:whole]).tobytes()
+        self.lsb_pending = combined[whole:]
+
+        if not self.lsb_header_checked and len(self.lsb_data) >= HEADER_SIZE:
+            self.lsb_header_checked = True
+            self.lsb_header = parse_header(self.lsb_data[:HEADER_SIZE],
+                                           self._max_payload(self.lsb_bits_available))
+
+        if self.lsb_header is not None:
+            # A framed payload ends at the length in its header
+            if len(self.lsb_data) >= HEADER_SIZE + self.lsb_header["length"]:
+                self.lsb_active = False
+        else:
+            offset = find_bit_pattern(window, TERMINATOR)
+            if offset >= 0:
+                self.lsb_terminator_at = self.lsb_bits_seen - self.lsb_tail.size + offset
+                self.lsb_active = False
+
+        self.lsb_bits_seen += bits.size
+        self.lsb_tail = window[-(len(TERMINATOR) * 8 - 1):]
+
+        if self.lsb_active and self.lsb_byte_limit is not None and len(self.lsb_data) > self.lsb_byte_limit:
+            self.lsb_overflow = True
+            self.lsb_active = False
+
+    def _max_payload(self, bits_available):
+        """Largest framed payload length, in bytes, that fits in a stream of the given size"""
+        if bits_available is None:
+            return None
+        return (bits_available - HEADER_BITS) // 8
+
+    def lsb_bit_count(self):
+        """
+        Number of message bits before the legacy terminator
+
+        Returns:
+            int: Bit count, or -1 if the stream was cut off by the byte limit
+        """
+        if self.lsb_terminator_at >= 0:
+            return self.lsb_terminator_at
+        if self.lsb_overflow:
+            return -1
+        return self.lsb_bits_seen
+
+    def parity_bits(self):
+        """
+        The collected leading parity bits
+
+        Returns:
+            numpy.ndarray: 0/1 array
+        """
+        if not self.parity_chunks:
+            return np.empty(0, dtype=np.uint8)
+        return np.concatenate(self.parity_chunks)
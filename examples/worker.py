@@ -16,24 +16,42 @@ import datetime
 # Add parent directory to path to allow imports
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from queue.job_queue import JobQueue, JobStatus, JobPriority
+from engine.profiling import MetricsAggregator
 from engine.stegnox_engine import StegnoxEngine
 from storage.storage_service import StorageService
 
 class Worker:
-    def __init__(self, worker_id=None, storage_dir="data"):
+    def __init__(self, worker_id=None, storage_dir="data", time_budget=None, profile=False,
+                 trace_memory=False, pixel_cache_size=0):
         """
         Initialize a worker
         
         Args:
             worker_id (str, optional): Worker ID. If None, a UUID will be generated.
             storage_dir (str): Directory for storage
+            time_budget (float, optional): Seconds each job's analysis may take; methods
+                still running at the deadline return partial results
+            profile (bool): Measure each analysis method and aggregate the numbers in the stats
+            trace_memory (bool): Also measure each method's memory peak with tracemalloc
+            pixel_cache_size (int): Size limit in bytes of the decoded pixel cache; 0 disables it
         """
         self.worker_id = worker_id or f"worker_{uuid.uuid4()}"
         self.queue = JobQueue(storage_dir=os.path.join(storage_dir, "queue"))
-        self.engine = StegnoxEngine()
-        self.storage = StorageService(storage_dir=os.path.join(storage_dir, "storage"))
+        self.storage = StorageService(storage_dir=os.path.join(storage_dir, "storage"),
+                                      pixel_cache_size=pixel_cache_size)
+        self.method_metrics = MetricsAggregator()
+        self.engine = StegnoxEngine(
+            pixel_cache=self.storage.pixel_cache,
+            result_cache=self.storage.result_cache,
+            profile=profile,
+            metrics_sink=self.method_metrics,
+            trace_memory=trace_memory
+        )
+        self.time_budget = time_budget
         self.running = False
         self.thread = None
+        # Set by stop(); the job in progress stops at its next checkpoint
+        self.cancel_event = threading.Event()
         
         # Statistics
         self.stats = {
@@ -51,6 +69,7 @@ class Worker:
             return
         
         self.running = True
+        self.cancel_event = threading.Event()
         self.stats["start_time"] = datetime.datetime.now()
         self.thread = threading.Thread(target=self._worker_loop)
         self.thread.daemon = True
@@ -64,6 +83,7 @@ class Worker:
             return
         
         self.running = False
+        self.cancel_event.set()
         if self.thread:
             self.thread.join(timeout=5)
         print(f"Worker {self.worker_id} stopped")
@@ -84,8 +104,12 @@ class Worker:
                         print(f"Worker {self.worker_id}: Processing job {job['job_id']}")
                         image_path = job["image_path"]
                         
-                        # Run all extraction methods
-                        results = self.engine.extract_all_methods(image_path)
+                        # Run all extraction methods within the time budget
+                        results = self.engine.extract_all_methods(
+                            image_path, budget=self.time_budget, cancel=self.cancel_event
+                        )
+                        if self.cancel_event.is_set():
+                            raise RuntimeError("Worker stopped before the analysis finished")
                         
                         # Save results to storage
                         self.storage.save_results(job["job_id"], results)
@@ -122,16 +146,27 @@ class Worker:
         # Add queue stats
         stats["queue"] = self.queue.get_queue_stats()
         
+        # Add per-method timings, when profiling
+        stats["methods"] = self.method_metrics.summary()
+        
         return stats
 
 def main():
     parser = argparse.ArgumentParser(description="StegnoX Worker")
     parser.add_argument("--worker-id", help="Worker ID")
     parser.add_argument("--storage-dir", default="data", help="Storage directory")
+    parser.add_argument("--time-budget", type=float, help="Seconds each job's analysis may take")
+    parser.add_argument("--profile", action="store_true", help="Report per-method timings")
+    parser.add_argument("--trace-memory", action="store_true",
+                        help="With --profile, also report per-method memory peaks")
+    parser.add_argument("--pixel-cache-size", type=int, default=0,
+                        help="Size limit in bytes of the decoded pixel cache; 0 disables it")
     args = parser.parse_args()
     
     # Create worker
-    worker = Worker(worker_id=args.worker_id, storage_dir=args.storage_dir)
+    worker = Worker(worker_id=args.worker_id, storage_dir=args.storage_dir, time_budget=args.time_budget,
+                    profile=args.profile, trace_memory=args.trace_memory,
+                    pixel_cache_size=args.pixel_cache_size)
     
     # Handle signals for graceful shutdown
     def signal_handler(sig, frame):
@@ -159,6 +194,9 @@ def main():
                   f"{stats['queue']['processing']} processing, "
                   f"{stats['queue']['completed']} completed, "
                   f"{stats['queue']['failed']} failed")
+            for method, metrics in stats["methods"].items():
+                print(f"  {method}: {metrics['count']} runs, {metrics['mean_wall_time']:.3f}s mean, "
+                      f"{metrics['max_wall_time']:.3f}s max")
     except KeyboardInterrupt:
         worker.stop()
 
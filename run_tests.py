@@ -8,6 +8,7 @@ This script runs all tests for the StegnoX project and generates a coverage repo
 import os
 import sys
 import argparse
+import subprocess
 import unittest
 import coverage
 import time
@@ -22,6 +23,12 @@ def parse_args():
     parser.add_argument('--coverage', action='store_true', help='Generate coverage report')
     parser.add_argument('--html', action='store_true', help='Generate HTML coverage report')
     parser.add_argument('--verbose', '-v', action='store_true', help='Verbose output')
+    parser.add_argument('--bench', action='store_true', help='Run the engine benchmark suite instead of the tests')
+    parser.add_argument('--bench-sizes', type=float, nargs='+', help='Benchmark image sizes in megapixels')
+    parser.add_argument('--bench-output', default='bench_results.json', help='Benchmark results JSON file')
+    parser.add_argument('--baseline', default=os.path.join('benchmarks', 'baseline.json'),
+                        help='Benchmark baseline to compare against, if it exists')
+    parser.add_argument('--update-baseline', action='store_true', help='Store the benchmark results as the baseline')
     return parser.parse_args()
 
 def run_tests(test_type=None, verbose=False):
@@ -56,10 +63,24 @@ def run_tests(test_type=None, verbose=False):
 
     return result.wasSuccessful()
 
+def run_benchmarks(args):
+    """Run the engine benchmark suite in a fresh interpreter, so its RSS figures are its own"""
+    print("Running engine benchmarks...")
+    command = [sys.executable, os.path.join('benchmarks', 'bench_engine.py'),
+               '--output', args.bench_output, '--baseline', args.baseline]
+    if args.bench_sizes:
+        command += ['--sizes'] + [str(size) for size in args.bench_sizes]
+    if args.update_baseline:
+        command.append('--update-baseline')
+    return subprocess.call(command)
+
 def main():
     """Main function"""
     args = parse_args()
 
+    if args.bench:
+        return run_benchmarks(args)
+
     # Determine which tests to run
     run_unit = args.unit or not (args.integration or args.e2e or args.desktop)
     run_integration = args.integration or not (args.unit or args.e2e or args.desktop)
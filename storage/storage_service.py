@@ -12,23 +12,37 @@ import datetime
 from PIL import Image
 from io import BytesIO
 
+from engine.pixel_cache import PixelCache
+from engine.result_cache import DEFAULT_RESULT_CACHE_BYTES, ResultCache
+
 class StorageService:
-    def __init__(self, storage_dir="storage"):
+    def __init__(self, storage_dir="storage", pixel_cache_size=0,
+                 result_cache_size=DEFAULT_RESULT_CACHE_BYTES):
         """
         Initialize the storage service
 
         Args:
             storage_dir (str): Directory to store files
+            pixel_cache_size (int): Size limit in bytes of the decoded pixel cache,
+                filled by the engine as it analyzes images; 0, the default, disables it
+            result_cache_size (int): Size limit in bytes of the analysis result cache;
+                0 disables the cache
         """
         self.storage_dir = storage_dir
         self.images_dir = os.path.join(storage_dir, "images")
         self.results_dir = os.path.join(storage_dir, "results")
         self.temp_dir = os.path.join(storage_dir, "temp")
+        self.pixels_dir = os.path.join(storage_dir, "pixels")
+        self.cache_dir = os.path.join(storage_dir, "cache")
 
         # Create directories if they don't exist
         for directory in [self.storage_dir, self.images_dir, self.results_dir, self.temp_dir]:
             os.makedirs(directory, exist_ok=True)
 
+        # Decoded images and analysis results shared with the engine
+        self.pixel_cache = PixelCache(self.pixels_dir, pixel_cache_size) if pixel_cache_size else None
+        self.result_cache = ResultCache(self.cache_dir, result_cache_size) if result_cache_size else None
+
     def save_image(self, image_data, filename=None):
         """
         Save an image to storage
@@ -70,6 +84,30 @@ class StorageService:
             print(f"Error saving image: {str(e)}")
             return None
 
+    def cache_pixels(self, image_path):
+        """
+        Decode an image into the pixel cache unless it is already there
+
+        The engine fills the cache itself on an image's first analysis; this
+        warms it ahead of time, e.g. in a background job.
+
+        Args:
+            image_path (str): Path to the image file
+
+        Returns:
+            str: The content hash of the image, or None if it could not be cached
+        """
+        if self.pixel_cache is None:
+            return None
+
+        try:
+            with open(image_path, 'rb') as f:
+                return self.pixel_cache.add(f.read())
+
+        except Exception as e:
+            print(f"Error caching pixels: {str(e)}")
+            return None
+
     def save_results(self, job_id, results):
         """
         Save analysis results
@@ -2,12 +2,39 @@ import unittest
 import os
 import sys
 import tempfile
+import shutil
+import subprocess
+import threading
+import time
+from unittest import mock
+import io
+import struct
+import zlib
+import tracemalloc
+import base64
 import numpy as np
-from PIL import Image
+from PIL import Image, ImageFile
 
 # Add parent directory to path to allow imports
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from engine.stegnox_engine import StegnoxEngine
+from engine.image_context import ImageContext
+from engine.payload import HEADER_SIZE, frame_payload
+from engine.jpeg_coefficients import read_jpeg_coefficients
+from engine.block_dct import block_dct_statistics
+from engine.cancellation import CancellationToken
+from engine.executors import process_context, thread_pool_executor
+from engine.channel_stats import bit_plane_ones, channel_histogram, pair_statistics
+from engine.tiling import band_height_for
+from engine.png_stream import PngRowStream
+from engine.pixel_cache import PixelCache
+from engine.profiling import MetricsAggregator
+from engine.sample_pairs import sample_pair_counts
+from engine.result_cache import MAX_CACHED_MESSAGE, ResultCache
+from engine.registry import (
+    COST_CHEAP, COST_EXPENSIVE, get_method_info, method_versions, register_method,
+    registered_methods, unregister_method
+)
 
 class TestStegnoxEngine(unittest.TestCase):
     def setUp(self):
@@ -29,6 +56,32 @@ class TestStegnoxEngine(unittest.TestCase):
         self.assertIn('mode', result)
         self.assertIn('size', result)
 
+    def test_metadata_extraction_decodes_nothing(self):
+        # EXIF is read without decoding the pixels, also from an eXIf chunk after
+        # the image data, so extract_all_methods decodes a PNG only once
+        exif = Image.Exif()
+        exif[0x010F] = "StegnoX"
+        buffer = io.BytesIO()
+        Image.new('RGB', (64, 48), color='white').save(buffer, "PNG")
+        chunk = b"eXIf" + exif.tobytes()[6:]
+        data = buffer.getvalue()
+        data = data[:-12] + struct.pack(">I", len(chunk) - 4) + chunk + struct.pack(">I", zlib.crc32(chunk)) + data[-12:]
+
+        decoded = []
+        load = ImageFile.ImageFile.load
+
+        def counting_load(image):
+            if image.tile and image.size == (64, 48):
+                decoded.append(image)
+            return load(image)
+
+        with mock.patch.object(ImageFile.ImageFile, "load", counting_load):
+            self.assertEqual(self.engine.metadata_extraction(data)["exif"], {"271": "StegnoX"})
+            self.assertEqual(decoded, [])
+            results = self.engine.extract_all_methods(data)
+        self.assertEqual(len(decoded), 1)
+        self.assertEqual(results["metadata_extraction"]["exif"], {"271": "StegnoX"})
+
     def test_extract_all_methods(self):
         # Test that all extraction methods run
         results = self.engine.extract_all_methods(self.test_image.name)
@@ -39,6 +92,466 @@ class TestStegnoxEngine(unittest.TestCase):
         self.assertIn('bit_plane_analysis', results)
         self.assertIn('histogram_analysis', results)
 
+    def test_extract_all_methods_with_shared_context(self):
+        # A context passed in is reused, and gives the same results as a path
+        context = ImageContext.load(self.test_image.name)
+        self.assertIs(ImageContext.load(context), context)
+
+        results = self.engine.extract_all_methods(context)
+        self.assertIsNotNone(context._rgb)
+        self.assertIsNotNone(context._gray)
+        self.assertEqual(results, self.engine.extract_all_methods(self.test_image.name))
+
+    def test_extract_all_methods_parallel(self):
+        # Thread-pool execution keeps method order, results and error isolation
+        @register_method()
+        def failing_method(engine, image):
+            raise RuntimeError("boom")
+
+        try:
+            names = [info.name for info in registered_methods()]
+            names.remove('failing_method')
+            names.insert(1, 'failing_method')
+            engine = StegnoxEngine(max_workers=4, methods=names)
+            results = engine.extract_all_methods(self.test_image.name)
+        finally:
+            unregister_method('failing_method')
+
+        self.assertEqual(list(results)[:2], ['lsb_extraction', 'failing_method'])
+        self.assertEqual(results['failing_method'], {"error": "boom"})
+        del results['failing_method']
+        self.assertEqual(results, self.engine.extract_all_methods(self.test_image.name))
+
+    def test_cancellation(self):
+        # Methods stop at their checkpoints with partial results, budgets run
+        # methods cheapest first, and stopped results are not cached
+        class ExpiringToken(CancellationToken):
+            """Expires after a number of checks"""
+
+            def __init__(self, checks):
+                super().__init__()
+                self.checks = checks
+
+            @property
+            def reason(self):
+                self.checks -= 1
+                return "deadline" if self.checks < 0 else None
+
+        stop = threading.Event()
+        stop.set()
+        self.assertEqual(self.engine.histogram_analysis(self.test_image.name, cancel=stop),
+                         {"error": "Not started: cancelled", "cancelled": "cancelled"})
+
+        context = ImageContext.load(self.test_image.name)
+        full = self.engine.dct_analysis(context)
+        with mock.patch("engine.block_dct.BATCH_COEFFICIENTS", 64 * 64):
+            partial = self.engine.dct_analysis(context, cancel=ExpiringToken(3))
+        self.assertTrue(partial["partial"])
+        self.assertEqual(partial["cancelled"], "deadline")
+        self.assertLess(partial["statistics"]["total_blocks"], full["statistics"]["total_blocks"])
+        self.assertGreater(partial["statistics"]["total_blocks"], 0)
+
+        calls = []
+
+        @register_method(cost=COST_EXPENSIVE)
+        def expensive_probe(engine, image):
+            calls.append("expensive")
+            return {}
+
+        @register_method(cost=COST_CHEAP)
+        def cheap_probe(engine, image):
+            calls.append("cheap")
+            return {}
+
+        try:
+            results = self.engine.extract_all_methods(
+                self.test_image.name, methods=["expensive_probe", "cheap_probe"], budget=60
+            )
+        finally:
+            unregister_method("expensive_probe")
+            unregister_method("cheap_probe")
+        self.assertEqual(calls, ["cheap", "expensive"])
+        self.assertEqual(list(results), ["expensive_probe", "cheap_probe"])
+
+        cache_dir = tempfile.mkdtemp()
+        try:
+            engine = StegnoxEngine(result_cache=ResultCache(cache_dir))
+            results = engine.extract_all_methods(self.test_image.name, budget=0)
+            self.assertTrue(all(result["cancelled"] == "deadline" for result in results.values()))
+            results = engine.extract_all_methods(self.test_image.name, budget=60)
+            self.assertEqual(results, self.engine.extract_all_methods(self.test_image.name))
+        finally:
+            shutil.rmtree(cache_dir)
+
+    def test_profiling(self):
+        # Profiling mode measures each method that runs and feeds the sink;
+        # results are otherwise unchanged. Memory is only traced on request
+        metrics = MetricsAggregator()
+        engine = StegnoxEngine(profile=True, metrics_sink=metrics)
+        results = engine.extract_all_methods(self.test_image.name)
+        profile = results.pop("_profile")
+        self.assertEqual(results, self.engine.extract_all_methods(self.test_image.name))
+
+        self.assertEqual(profile["pixels"], 100 * 100)
+        self.assertEqual(set(profile["methods"]), set(results))
+        for method_profile in profile["methods"].values():
+            self.assertGreater(method_profile["wall_time"], 0)
+            self.assertGreaterEqual(method_profile["cpu_time"], 0)
+            self.assertEqual(method_profile["pixels"], 100 * 100)
+            self.assertGreater(method_profile["pixels_per_second"], 0)
+            self.assertIsNone(method_profile["peak_memory"])
+        self.assertFalse(tracemalloc.is_tracing())
+
+        with mock.patch("engine.profiling.tracemalloc.start", wraps=tracemalloc.start) as start:
+            traced = engine.extract_all_methods(self.test_image.name, methods=["dct_analysis"], trace_memory=True)
+        self.assertEqual(start.called, hasattr(tracemalloc, "reset_peak"))
+        self.assertGreater(traced["_profile"]["methods"]["dct_analysis"]["peak_memory"] or 1, 0)
+        self.assertFalse(tracemalloc.is_tracing())
+
+        # The traced peak is process-wide, so traced methods never share the thread pool
+        threaded = StegnoxEngine(max_workers=4, profile=True)
+        with mock.patch("engine.stegnox_engine.thread_pool_executor",
+                        wraps=thread_pool_executor) as pool:
+            threaded.extract_all_methods(self.test_image.name, trace_memory=True)
+            # Python 3.8 cannot measure a peak, so it traces nothing and keeps its threads
+            self.assertEqual(pool.called, not hasattr(tracemalloc, "reset_peak"))
+            threaded.extract_all_methods(self.test_image.name)
+            self.assertTrue(pool.called)
+        self.assertNotIn("_profile", engine.extract_all_methods(self.test_image.name, profile=False))
+        summary = metrics.summary()
+        self.assertEqual(summary["dct_analysis"]["count"], 2)
+        self.assertEqual(summary["histogram_analysis"]["count"], 1)
+        self.assertGreaterEqual(summary["dct_analysis"]["max_wall_time"], summary["dct_analysis"]["mean_wall_time"])
+
+        tiled = StegnoxEngine().extract_all_methods(self.test_image.name, tiled=True, profile=True)
+        self.assertIn("_tiled_pass", tiled["_profile"]["methods"])
+        self.assertNotIn("dct_analysis", tiled["_profile"]["methods"])
+        self.assertIn("metadata_extraction", tiled["_profile"]["methods"])
+
+    def test_method_registry(self):
+        # Engines run a subset of the registered methods in the given order
+        engine = StegnoxEngine(methods=['histogram_analysis', 'metadata_extraction'])
+        self.assertEqual(list(engine.extract_all_methods(self.test_image.name)),
+                         ['histogram_analysis', 'metadata_extraction'])
+        with self.assertRaises(ValueError):
+            StegnoxEngine(methods=['no_such_method'])
+
+        dct_info = get_method_info('dct_analysis')
+        self.assertEqual(dct_info.cost, COST_EXPENSIVE)
+        self.assertIn('scipy.fftpack', dct_info.dependencies)
+
+        # Heavy dependencies are not imported with the engine
+        code = ("import sys; import engine.stegnox_engine; "
+                "print(any(name in sys.modules for name in ('cv2', 'scipy', 'matplotlib')))")
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        output = subprocess.run([sys.executable, "-c", code], cwd=root,
+                                capture_output=True, text=True, check=True).stdout
+        self.assertEqual(output.strip(), "False")
+
+    def test_analyze_batch(self):
+        # Process-pool batches match single-image analysis in either order mode
+        paths = [self.test_image.name, self.test_image.name + ".missing", self.test_image.name]
+        expected = self.engine.extract_all_methods(self.test_image.name)
+
+        ordered = list(self.engine.analyze_batch(paths, max_workers=2, chunksize=2))
+        self.assertEqual([path for path, _ in ordered], paths)
+        self.assertEqual(ordered[0][1], expected)
+        self.assertIn("error", ordered[1][1]["lsb_extraction"])
+
+        unordered = list(self.engine.analyze_batch(
+            paths, methods=["histogram_analysis"], max_workers=2, ordered=False
+        ))
+        self.assertEqual(sorted(path for path, _ in unordered), sorted(paths))
+        self.assertEqual(list(unordered[0][1]), ["histogram_analysis"])
+
+        # Closing the generator cancels what is still pending
+        batch = self.engine.analyze_batch(paths * 5, max_workers=1)
+        self.assertEqual(next(batch)[0], paths[0])
+        batch.close()
+
+        # ...and does not wait for the chunk that is running
+        @register_method()
+        def slow_probe(engine, image):
+            time.sleep(2)
+            return {}
+
+        try:
+            batch = self.engine.analyze_batch(paths * 3, methods=["slow_probe"], max_workers=1)
+            next(batch)
+            start = time.perf_counter()
+            batch.close()
+            self.assertLess(time.perf_counter() - start, 1)
+
+            # A cancel event is seen while a chunk is still running
+            for ordered in (True, False):
+                cancel_event = threading.Event()
+                batch = self.engine.analyze_batch(paths, methods=["slow_probe"], max_workers=1,
+                                                  ordered=ordered, cancel_event=cancel_event)
+                threading.Timer(0.5, cancel_event.set).start()
+                start = time.perf_counter()
+                self.assertEqual(list(batch), [])
+                self.assertLess(time.perf_counter() - start, 1.5)
+        finally:
+            unregister_method("slow_probe")
+
+    def test_analyze_batch_spawned_workers(self):
+        # Spawned workers, the default on macOS and Windows, import the
+        # standard library queue module rather than the repository's package
+        expected = self.engine.extract_all_methods(self.test_image.name, methods=["histogram_analysis"])
+        with mock.patch("engine.batch.process_context", lambda: process_context("spawn")):
+            results = list(self.engine.analyze_batch(
+                [self.test_image.name] * 2, methods=["histogram_analysis"], max_workers=2
+            ))
+        self.assertEqual([result for _, result in results], [expected, expected])
+
+    def test_tiled_analysis_matches_whole_image(self):
+        # Banded analysis reports the same results as whole-image analysis
+        rng = np.random.default_rng(17)
+        pixels = rng.integers(0, 256, size=(70, 45, 3), dtype=np.uint8)
+        pixels[:20] = 120
+        cover = tempfile.NamedTemporaryFile(suffix='.png', delete=False).name
+        stego = tempfile.NamedTemporaryFile(suffix='.png', delete=False).name
+        Image.fromarray(pixels).save(cover)
+
+        try:
+            self.engine.lsb_encoding(cover, "tiled message", stego)
+            tiled_engine = StegnoxEngine(memory_limit=45 * 70 * 3)
+            self.assertEqual(band_height_for(45, 45 * 70 * 3), 8)
+            for path in (cover, stego):
+                expected = self.engine.extract_all_methods(path)
+                self.assertEqual(tiled_engine.extract_all_methods(path), expected)
+                self.assertEqual(
+                    tiled_engine.extract_all_methods(ImageContext.load(path), tiled=True), expected
+                )
+            self.assertEqual(tiled_engine.extract_all_methods(stego)["lsb_extraction"]["message"], "tiled message")
+            self.engine.parity_bit_encoding(cover, "tiled parity", stego)
+            result = tiled_engine.extract_all_methods(stego, methods=["parity_bit_extraction"])
+            self.assertEqual(result["parity_bit_extraction"]["message"], "tiled parity")
+
+            # A small ceiling cuts the LSB search short and marks it as partial
+            small_engine = StegnoxEngine(memory_limit=1024)
+            result = small_engine.extract_all_methods(cover, methods=["lsb_extraction"])
+            self.assertTrue(result["lsb_extraction"]["partial"])
+
+            # Alpha and 16-bit bands keep their per-band entries, PNGs are decoded
+            # band by band from the file, and a JPEG keeps the coefficient source it opted into
+            coefficient_engine = StegnoxEngine(dct_source="auto")
+            tiled_coefficient_engine = StegnoxEngine(memory_limit=45 * 70 * 3, dct_source="auto")
+            samples = rng.integers(0, 65536, size=(70, 45)).astype(np.uint16)
+            payload_bits = np.unpackbits(np.frombuffer(frame_payload(b"Tiled band"), dtype=np.uint8))
+            flat = samples.reshape(-1)
+            flat[:payload_bits.size] = (flat[:payload_bits.size] & 0xFFFE) | payload_bits
+            rgba = Image.fromarray(np.dstack([pixels, (samples >> 8).astype(np.uint8)]), "RGBA")
+            for image, fmt in ((rgba, "PNG"), (rgba.convert("LA"), "PNG"), (Image.fromarray(samples), "PNG"),
+                               (Image.fromarray(pixels), "JPEG")):
+                image.save(cover, fmt)
+                expected = coefficient_engine.extract_all_methods(cover)
+                context = ImageContext.load(cover)
+                self.assertEqual(tiled_coefficient_engine.extract_all_methods(context, tiled=True), expected)
+                if fmt == "PNG":
+                    self.assertIsNone(context.cached_native())
+                    self.assertIn("bands", expected["bit_plane_analysis"])
+                else:
+                    self.assertEqual(expected["dct_analysis"]["source"], "jpeg_coefficients")
+        finally:
+            os.unlink(cover)
+            os.unlink(stego)
+
+    def test_pixel_cache(self):
+        # Cached images are memory-mapped instead of decoded and give the same results
+        cache_dir = tempfile.mkdtemp()
+        try:
+            cache = PixelCache(cache_dir)
+            engine = StegnoxEngine(pixel_cache=cache)
+            expected = self.engine.extract_all_methods(self.test_image.name)
+
+            self.assertEqual(engine.extract_all_methods(self.test_image.name), expected)
+            context = ImageContext.load(self.test_image.name, cache)
+            self.assertIsNotNone(cache.get(context.content_hash))
+            self.assertIsInstance(context.rgb, np.memmap)
+            self.assertEqual(context.header["size"], (100, 100))
+            self.assertEqual(engine.extract_all_methods(context), expected)
+
+            # Alpha and 16-bit bands are cached too, so a hit never decodes for them
+            rng = np.random.default_rng(7)
+            for index, pixels in enumerate((rng.integers(0, 256, size=(40, 30, 4)).astype(np.uint8),
+                                            rng.integers(0, 65536, size=(40, 30)).astype(np.uint16))):
+                path = os.path.join(cache_dir, f"wide{index}.png")
+                Image.fromarray(pixels).save(path)
+                methods = ["lsb_extraction", "bit_plane_analysis"]
+                expected = self.engine.extract_all_methods(path, methods=methods)
+                self.assertEqual(engine.extract_all_methods(path, methods=methods), expected)
+                context = ImageContext.load(path, cache)
+                self.assertIsInstance(context.rgb, np.memmap)
+                bands = context.extra_bands()
+                self.assertIsNone(context._native)
+                self.assertEqual([name for name, _ in bands], ["A"] if pixels.ndim == 3 else ["I"])
+                np.testing.assert_array_equal(bands[0][1], pixels[..., 3] if pixels.ndim == 3 else pixels)
+                self.assertEqual(engine.extract_all_methods(context, methods=methods), expected)
+                self.assertIsNone(context._native)
+
+            # The least recently used entries are evicted first
+            keys = []
+            for seed in range(3):
+                pixels = np.random.default_rng(seed).integers(0, 256, size=(10, 10, 3), dtype=np.uint8)
+                buffer = io.BytesIO()
+                Image.fromarray(pixels).save(buffer, format="PNG")
+                keys.append(cache.add(buffer.getvalue()))
+                os.utime(os.path.join(cache_dir, keys[-1] + ".json"), (seed, seed))
+            cache.max_bytes = cache.size() - 1
+            self.assertEqual(cache.evict(), 1)
+            self.assertIsNone(cache.get(keys[0]))
+            self.assertIsNotNone(cache.get(keys[1]))
+        finally:
+            shutil.rmtree(cache_dir)
+
+    def test_result_cache(self):
+        # Repeat analyses are served from the cache; a version bump only
+        # invalidates that method's entries
+        cache_dir = tempfile.mkdtemp()
+        dct_info = get_method_info("dct_analysis")
+        try:
+            cache = ResultCache(cache_dir)
+            engine = StegnoxEngine(result_cache=cache)
+            count = len(registered_methods())
+            first = engine.extract_all_methods(self.test_image.name)
+            self.assertEqual(cache.stats()["misses"], count)
+            self.assertEqual(cache.stats()["entries"], count)
+
+            second = engine.extract_all_methods(self.test_image.name)
+            self.assertEqual(cache.stats()["hits"], count)
+            self.assertEqual(second["histogram_analysis"], first["histogram_analysis"])
+            self.assertEqual(list(second), list(first))
+
+            dct_info.version += 1
+            engine.extract_all_methods(self.test_image.name, methods=["dct_analysis", "lsb_extraction"])
+            self.assertEqual(cache.stats()["hits"], count + 1)
+            self.assertEqual(cache.stats()["misses"], count + 1)
+            self.assertEqual(cache.remove_stale(method_versions()), 1)
+
+            # Errors are never cached
+            engine.extract_all_methods(self.test_image.name + ".missing", methods=["lsb_extraction"])
+            self.assertEqual(cache.stats()["entries"], count)
+
+            # The whole-image LSB noise of a clean cover is cached as a short preview
+            noisy = io.BytesIO()
+            Image.fromarray(np.random.default_rng(3).integers(0, 256, size=(200, 200, 3), dtype=np.uint8)).save(
+                noisy, "PNG")
+            full = engine.lsb_extraction(noisy.getvalue())
+            engine.extract_all_methods(noisy.getvalue(), methods=["lsb_extraction"])
+            cached = engine.extract_all_methods(noisy.getvalue(), methods=["lsb_extraction"])["lsb_extraction"]
+            self.assertGreater(len(full["message"]), MAX_CACHED_MESSAGE)
+            self.assertEqual(cached["message"], full["message"][:MAX_CACHED_MESSAGE])
+            self.assertTrue(cached["truncated"])
+            self.assertNotIn("truncated", full)
+
+            cache.max_bytes = 0
+            cache.evict()
+            self.assertEqual(cache.stats()["entries"], 0)
+        finally:
+            dct_info.version -= 1
+            shutil.rmtree(cache_dir)
+
+    def test_in_memory_inputs(self):
+        # Encoded bytes, file objects, PIL images and arrays need no file on disk
+        expected = self.engine.extract_all_methods(self.test_image.name)
+        with open(self.test_image.name, 'rb') as f:
+            data = f.read()
+
+        for image in (data, bytearray(data), memoryview(data), io.BytesIO(data)):
+            self.assertEqual(self.engine.extract_all_methods(image), expected)
+
+        pil_image = Image.open(self.test_image.name)
+        self.assertEqual(self.engine.extract_all_methods(pil_image), expected)
+        self.assertEqual(pil_image.getpixel((0, 0)), (255, 255, 255))
+        self.assertEqual(self.engine.detect_format(data), "png")
+
+        pixels = np.asarray(pil_image.convert("RGB"))
+        results = self.engine.extract_all_methods(pixels)
+        self.assertIs(ImageContext.load(pixels).rgb, pixels)
+        for name in ("lsb_extraction", "dct_analysis", "histogram_analysis"):
+            self.assertEqual(results[name], expected[name])
+        self.assertEqual(results["metadata_extraction"]["size"], (100, 100))
+
+        # In-memory images are keyed by their native pixels and layout, so
+        # alpha and grayscale images do not share the key of their RGB form
+        gray = np.random.default_rng(2).integers(0, 256, size=(20, 30), dtype=np.uint8)
+        rgb = np.repeat(gray[:, :, None], 3, axis=2)
+        rgba = np.dstack([rgb, np.full(gray.shape, 7, dtype=np.uint8)])
+        other_alpha = rgba.copy()
+        other_alpha[0, 0, 3] = 8
+        keys = [ImageContext.load(image).content_hash
+                for image in (gray, rgb, rgba, other_alpha, Image.fromarray(rgba, "RGBA"))]
+        self.assertEqual(len(set(keys[:4])), 4)
+        self.assertEqual(keys[4], keys[2])
+
+        with self.assertRaises(TypeError):
+            ImageContext.load(12345)
+
+    def test_cascade_mode(self):
+        # A clean, flat image skips the gated stages; zero thresholds run them all
+        engine = StegnoxEngine(cascade=True)
+        results = engine.extract_all_methods(self.test_image.name)
+        expected = self.engine.extract_all_methods(self.test_image.name)
+
+        self.assertEqual(results["_cascade"]["stages_skipped"], ["decode", "dct"])
+        self.assertEqual(results["_cascade"]["scores"]["pair_confidence"], 0)
+        self.assertTrue(results["dct_analysis"]["skipped"])
+        self.assertTrue(results["lsb_extraction"]["skipped"])
+        self.assertEqual(results["histogram_analysis"], expected["histogram_analysis"])
+
+        # Screens run even when their methods are not requested, but are not returned
+        results = engine.extract_all_methods(self.test_image.name, methods=["dct_analysis"])
+        self.assertEqual(list(results), ["dct_analysis", "_cascade"])
+
+        permissive = StegnoxEngine(cascade_thresholds={
+            "decode": {"pair_confidence": 0, "lsb_entropy": 0},
+            "dct": {"pair_confidence": 0, "lsb_entropy": 0, "embedding_rate": 0}
+        })
+        results = permissive.extract_all_methods(self.test_image.name, cascade=True)
+        self.assertEqual(results.pop("_cascade")["stages_run"], ["decode", "dct"])
+        self.assertEqual(results, expected)
+
+        # A short message leaves the screens clean, but the probe of the leading
+        # bits finds its header and runs that decode method anyway
+        output = tempfile.NamedTemporaryFile(suffix='.png', delete=False).name
+        try:
+            for encode, name in ((self.engine.lsb_encoding, "lsb_extraction"),
+                                 (self.engine.parity_bit_encoding, "parity_bit_extraction")):
+                self.assertTrue(encode(self.test_image.name, "Short", output)["success"])
+                results = engine.extract_all_methods(output)
+                self.assertEqual(results["_cascade"]["probed"], [name])
+                self.assertEqual(results[name]["message"], "Short")
+                self.assertTrue(results["dct_analysis"]["skipped"])
+
+            results = engine.extract_all_methods(output, tiled=True)
+            self.assertEqual(results["parity_bit_extraction"]["message"], "Short")
+        finally:
+            os.unlink(output)
+
+    def test_sampled_estimation(self):
+        # Sampled scores come with an interval that contains the exact score
+        rng = np.random.default_rng(11)
+        pixels = rng.integers(0, 256, size=(96, 128, 3), dtype=np.uint8)
+
+        for method, population in [("dct_analysis", 12 * 16), ("bit_plane_analysis", 96 * 128),
+                                   ("histogram_analysis", 96 * 128)]:
+            analyze = getattr(self.engine, method)
+            exact = analyze(pixels)
+            sampled = analyze(pixels, sample_fraction=0.5, seed=1)
+
+            sampling = sampled["sampling"]
+            self.assertEqual(sampling["sample_size"], population // 2)
+            self.assertEqual(sampling["population"], population)
+            low, high = sampling["confidence_interval"]
+            self.assertLessEqual(low, exact["confidence"])
+            self.assertGreaterEqual(high, exact["confidence"])
+
+            # The same seed draws the same sample; a full sample is the exact analysis
+            self.assertEqual(analyze(pixels, sample_fraction=0.5, seed=1), sampled)
+            self.assertEqual(analyze(pixels, sample_fraction=1), exact)
+            self.assertEqual(analyze(pixels, max_samples=10)["sampling"]["sample_size"], 10)
+
     def test_dct_analysis(self):
         # Test DCT analysis
         result = self.engine.dct_analysis(self.test_image.name)
@@ -46,6 +559,89 @@ class TestStegnoxEngine(unittest.TestCase):
         self.assertIn('assessment', result)
         self.assertIn('statistics', result)
 
+    def test_batched_dct_matches_per_block_dct(self):
+        # The block tensor transform gives the same counts as one DCT per block
+        from scipy.fftpack import dct
+
+        rng = np.random.default_rng(5)
+        gray = rng.integers(0, 256, size=(43, 61), dtype=np.uint8)
+        gray[:16] = 200
+
+        expected = {"zero_count": 0, "nonzero_count": 0, "suspicious_blocks": 0, "total_blocks": 0}
+        for y in range(0, 43 - 7, 8):
+            for x in range(0, 61 - 7, 8):
+                block = gray[y:y+8, x:x+8].astype(float)
+                block_dct = dct(dct(block.T, norm='ortho').T, norm='ortho')
+                zeros = np.count_nonzero(block_dct == 0)
+                expected["zero_count"] += zeros
+                expected["nonzero_count"] += 64 - zeros
+                expected["total_blocks"] += 1
+                if np.count_nonzero(np.abs(block_dct) % 2 > 0.5) > 64 * 0.7:
+                    expected["suspicious_blocks"] += 1
+
+        self.assertEqual(block_dct_statistics(gray), expected)
+        single = block_dct_statistics(gray, dtype=np.float32)
+        self.assertEqual(single["total_blocks"], expected["total_blocks"])
+
+    def test_jpeg_coefficients(self):
+        # Dequantized and inverse-transformed, the coefficients give back the
+        # luminance plane the JPEG decoder produces
+        from scipy.fftpack import idct
+
+        rng = np.random.default_rng(4)
+        pixels = np.clip(
+            np.cumsum(rng.normal(0, 6, size=(75, 93, 3)), axis=1) + 128, 0, 255
+        ).astype(np.uint8)
+        for options in [{"quality": 85}, {"quality": 95, "subsampling": 0},
+                        {"quality": 75, "restart_marker_blocks": 2}]:
+            buffer = io.BytesIO()
+            Image.fromarray(pixels).save(buffer, "JPEG", **options)
+            components = read_jpeg_coefficients(buffer.getvalue())
+            self.assertEqual(len(components), 3)
+
+            luma = components[0]
+            self.assertEqual([component.luminance for component in components], [True, False, False])
+            self.assertEqual(luma.coefficients.shape, (10, 12, 8, 8))
+            blocks = idct(idct(luma.coefficients * luma.quantization.astype(float), axis=-2, norm='ortho'),
+                          axis=-1, norm='ortho') + 128
+            plane = np.clip(np.round(blocks.swapaxes(1, 2).reshape(80, 96)[:75, :93]), 0, 255)
+
+            decoded = Image.open(io.BytesIO(buffer.getvalue()))
+            decoded.draft("YCbCr", decoded.size)
+            reference = np.asarray(decoded)[:, :, 0]
+            self.assertLessEqual(np.abs(plane - reference).max(), 1)
+
+        # By default dct_analysis takes the faster pixel path and never runs the
+        # pure-Python coefficient reader
+        with mock.patch("engine.image_context.read_jpeg_coefficients") as reader:
+            pixel_result = self.engine.dct_analysis(buffer.getvalue())
+            self.engine.extract_all_methods(buffer.getvalue(), tiled=True)
+        reader.assert_not_called()
+        self.assertEqual(pixel_result["source"], "pixels")
+
+        # Opted in, it reads JPEG coefficients, and falls back to pixels otherwise.
+        # Both count the complete blocks of the 75x93 image only, not the edge
+        # blocks and MCU padding of the 4:2:0 coefficient grid
+        result = self.engine.dct_analysis(buffer.getvalue(), source="auto")
+        self.assertEqual(result["source"], "jpeg_coefficients")
+        self.assertEqual(result["statistics"]["total_blocks"], 9 * 11)
+        self.assertEqual(StegnoxEngine(dct_source="auto").dct_analysis(buffer.getvalue()), result)
+        self.assertEqual(pixel_result["statistics"]["total_blocks"], 9 * 11)
+        self.assertEqual(self.engine.dct_analysis(self.test_image.name, source="auto")["source"], "pixels")
+
+        # CMYK JPEGs have no luminance component
+        cmyk = io.BytesIO()
+        Image.fromarray(pixels).convert("CMYK").save(cmyk, "JPEG")
+        self.assertEqual([component.luminance for component in read_jpeg_coefficients(cmyk.getvalue())],
+                         [False] * 4)
+        self.assertEqual(self.engine.dct_analysis(cmyk.getvalue(), source="auto")["source"], "pixels")
+        self.assertIn("error", self.engine.dct_analysis(cmyk.getvalue(), source="coefficients"))
+
+        progressive = io.BytesIO()
+        Image.fromarray(pixels).save(progressive, "JPEG", progressive=True)
+        self.assertEqual(self.engine.dct_analysis(progressive.getvalue(), source="auto")["source"], "pixels")
+        self.assertIn("error", self.engine.dct_analysis(progressive.getvalue(), source="coefficients"))
+
     def test_bit_plane_analysis(self):
         # Test bit plane analysis
         result = self.engine.bit_plane_analysis(self.test_image.name)
@@ -53,6 +649,31 @@ class TestStegnoxEngine(unittest.TestCase):
         self.assertIn('assessment', result)
         self.assertIn('bit_planes', result)
 
+    def test_bit_plane_ones_from_histogram(self):
+        # Ones counts derived from the histogram match shifting every bit plane
+        rng = np.random.default_rng(11)
+        channel = rng.integers(0, 256, size=(37, 53), dtype=np.uint8)
+        expected = [np.count_nonzero((channel >> bit) & 1) for bit in range(8)]
+        self.assertEqual(list(bit_plane_ones(channel_histogram(channel))), expected)
+
+    def test_histogram_pairs_and_shared_histograms(self):
+        # The vectorized pair test counts the same pairs as a per-pair loop
+        rng = np.random.default_rng(13)
+        histogram = rng.integers(0, 50, size=256)
+        expected = sum(
+            1 for i in range(0, 256, 2)
+            if abs(histogram[i] - histogram[i+1]) < (histogram[i] + histogram[i+1]) * 0.05
+        )
+        self.assertEqual(pair_statistics(histogram)["suspicious_pairs"], expected)
+
+        # Bit-plane and histogram analysis share the context's histograms
+        context = ImageContext.load(self.test_image.name)
+        self.engine.bit_plane_analysis(context)
+        histograms = context.histograms
+        self.engine.histogram_analysis(context)
+        self.assertIs(context.histograms, histograms)
+        self.assertEqual(histograms.shape, (3, 256))
+
     def test_histogram_analysis(self):
         # Test histogram analysis
         result = self.engine.histogram_analysis(self.test_image.name)
@@ -62,6 +683,81 @@ class TestStegnoxEngine(unittest.TestCase):
         self.assertIn('green_channel', result)
         self.assertIn('blue_channel', result)
 
+
+    def test_sample_pair_analysis(self):
+        # The vectorized counts match a loop over the adjacent pairs
+        rng = np.random.default_rng(2)
+        small = rng.integers(0, 256, size=(9, 7, 3), dtype=np.uint8)
+        expected = np.zeros((3, 4), dtype=np.int64)
+        for channel in range(3):
+            plane = small[:, :, channel].astype(int)
+            pairs = [(plane[y, x], plane[y, x + 1]) for y in range(9) for x in range(6)]
+            pairs += [(plane[y, x], plane[y + 1, x]) for y in range(8) for x in range(7)]
+            for u, v in pairs:
+                expected[channel] += [(u < v and v % 2 == 0) or (u > v and v % 2 == 1),
+                                      (u > v and v % 2 == 0) or (u < v and v % 2 == 1),
+                                      u // 2 == v // 2, 1]
+        np.testing.assert_array_equal(sample_pair_counts(small), expected)
+
+        # A smooth cover is clean; randomizing the LSBs of half the pixels is
+        # estimated close to an embedding rate of 0.5
+        y, x = np.mgrid[0:128, 0:128]
+        cover = np.stack([x * 2, y * 2, x + y], axis=-1) + rng.normal(0, 2, (128, 128, 3))
+        cover = np.clip(cover, 0, 255).astype(np.uint8)
+        embedded = rng.random(cover.shape) < 0.5
+        stego = np.where(embedded, (cover & 0xFE) | rng.integers(0, 2, cover.shape, dtype=np.uint8), cover)
+
+        clean = self.engine.sample_pair_analysis(cover)
+        result = self.engine.sample_pair_analysis(stego)
+        self.assertEqual(clean["assessment"], "Likely clean")
+        self.assertEqual(result["assessment"], "Suspicious")
+        self.assertAlmostEqual(result["embedding_rate"], 0.5, delta=0.1)
+
+        # Band-wise counting pairs the rows across band edges
+        engine = StegnoxEngine(memory_limit=1)
+        tiled = engine.extract_all_methods(stego, methods=["sample_pair_analysis"], tiled=True)
+        self.assertEqual(tiled["sample_pair_analysis"], result)
+
+    def test_capacity(self):
+        # Capacity comes from the header; a message of exactly capacity_bytes fits
+        capacity = self.engine.capacity(self.test_image.name)
+        self.assertEqual(capacity["capacity_bits"], 100 * 100 * 3)
+        parity = self.engine.capacity(self.test_image.name, "parity_bit_encoding")
+        self.assertEqual(parity["capacity_bits"], 100 * 100)
+        self.assertIn("error", self.engine.capacity(self.test_image.name, "metadata_encoding"))
+
+        temp_dir = tempfile.mkdtemp()
+        try:
+            output = os.path.join(temp_dir, "stego.png")
+            for method, result in [("lsb_encoding", capacity), ("parity_bit_encoding", parity)]:
+                encode = getattr(self.engine, method)
+                self.assertTrue(encode(self.test_image.name, "a" * result["capacity_bytes"], output)["success"])
+                too_long = encode(self.test_image.name, "a" * (result["capacity_bytes"] + 1), output)
+                self.assertFalse(too_long["success"])
+                self.assertEqual(too_long["capacity"], result["capacity_bits"])
+
+            # Oversized messages are rejected before the pixels are decoded
+            truncated = os.path.join(temp_dir, "truncated.png")
+            with open(self.test_image.name, "rb") as source, open(truncated, "wb") as target:
+                target.write(source.read()[:64])
+            result = self.engine.lsb_encoding(truncated, "a" * 4000, output)
+            self.assertEqual(result["error"], "Message is too long to hide in this image.")
+
+            # Covers are ranked by capacity; non-images are skipped
+            covers = os.path.join(temp_dir, "covers")
+            os.mkdir(covers)
+            Image.new("RGB", (40, 30)).save(os.path.join(covers, "small.png"))
+            Image.new("L", (80, 60)).save(os.path.join(covers, "large.jpg"))
+            Image.new("RGB", (10, 10)).save(os.path.join(covers, "tiny.png"))
+            with open(os.path.join(covers, "notes.txt"), "w") as f:
+                f.write("not an image")
+            ranked = self.engine.rank_covers(covers, min_bytes=400)
+            self.assertEqual([os.path.basename(item["path"]) for item in ranked],
+                             ["large.jpg", "small.png"])
+            self.assertEqual(ranked[0]["capacity_bits"], 80 * 60 * 3)
+        finally:
+            shutil.rmtree(temp_dir)
+
     def test_lsb_encoding_decoding(self):
         # Test LSB encoding and decoding
         test_message = "This is a test message for steganography"
@@ -82,6 +778,38 @@ class TestStegnoxEngine(unittest.TestCase):
             if os.path.exists(output_file.name):
                 os.unlink(output_file.name)
 
+    def test_lsb_extraction_matches_pixel_loop(self):
+        # The vectorized extractor must agree with the original per-pixel loop
+        def legacy_lsb_message(pixels):
+            terminator = ''.join(format(ord('#'), '08b') * 4)
+            bits = ''.join(str(value & 1) for value in pixels.reshape(-1))
+            if terminator in bits:
+                bits = bits[:bits.index(terminator)]
+            if len(bits) % 8 != 0:
+                return "No valid data found"
+            data = bytes(int(bits[i:i+8], 2) for i in range(0, len(bits), 8))
+            return data.decode('utf-8', errors='replace')
+
+        rng = np.random.default_rng(42)
+        unaligned = rng.integers(0, 256, size=(20, 20, 3), dtype=np.uint8)
+        flat = unaligned.reshape(-1)
+        terminator_bits = np.unpackbits(np.frombuffer(b"####", dtype=np.uint8))
+        flat[101:101 + terminator_bits.size] = (flat[101:101 + terminator_bits.size] & 0xFE) | terminator_bits
+
+        cases = [
+            rng.integers(0, 256, size=(20, 20, 3), dtype=np.uint8),
+            rng.integers(0, 256, size=(21, 20, 3), dtype=np.uint8),
+            unaligned,
+        ]
+        for pixels in cases:
+            path = tempfile.NamedTemporaryFile(suffix='.png', delete=False).name
+            try:
+                Image.fromarray(pixels).save(path)
+                result = self.engine.lsb_extraction(path)
+                self.assertEqual(result["message"], legacy_lsb_message(pixels))
+            finally:
+                os.unlink(path)
+
     def test_parity_encoding_decoding(self):
         # Test parity encoding and decoding
         test_message = "Testing parity encoding"
@@ -103,6 +831,202 @@ class TestStegnoxEngine(unittest.TestCase):
             if os.path.exists(output_file.name):
                 os.unlink(output_file.name)
 
+    def test_vectorized_encoders_touch_only_payload_bits(self):
+        # LSB encoding rewrites only low bits of the first channels, parity
+        # encoding only nudges blue values by one (upwards when they are 0)
+        rng = np.random.default_rng(7)
+        pixels = rng.integers(0, 256, size=(30, 40, 3), dtype=np.uint8)
+        pixels[0, :, 2] = 0
+        cover = tempfile.NamedTemporaryFile(suffix='.png', delete=False).name
+        output = tempfile.NamedTemporaryFile(suffix='.png', delete=False).name
+        Image.fromarray(pixels).save(cover)
+        message_bits = np.unpackbits(np.frombuffer(frame_payload(b"vectorized"), dtype=np.uint8))
+        count = message_bits.size
+
+        try:
+            self.assertTrue(self.engine.lsb_encoding(cover, "vectorized", output)["success"])
+            encoded = np.array(Image.open(output)).reshape(-1)
+            np.testing.assert_array_equal(encoded[:count] & 1, message_bits)
+            np.testing.assert_array_equal(encoded[:count] >> 1, pixels.reshape(-1)[:count] >> 1)
+            np.testing.assert_array_equal(encoded[count:], pixels.reshape(-1)[count:])
+
+            self.assertTrue(self.engine.parity_bit_encoding(cover, "vectorized", output)["success"])
+            encoded = np.array(Image.open(output)).reshape(-1, 3).astype(int)
+            original = pixels.reshape(-1, 3).astype(int)
+            np.testing.assert_array_equal(encoded[:count].sum(axis=1) % 2, message_bits)
+            np.testing.assert_array_equal(encoded[:, :2], original[:, :2])
+            np.testing.assert_array_equal(encoded[count:], original[count:])
+            blue_change = encoded[:count, 2] - original[:count, 2]
+            self.assertTrue(np.all(np.abs(blue_change) <= 1))
+            self.assertTrue(np.all(blue_change[original[:count, 2] == 0] >= 0))
+        finally:
+            os.unlink(cover)
+            os.unlink(output)
+
+    def test_parity_extraction_bounded_and_terminated(self):
+        # max_bits bounds the plain read of a legacy payload; until_terminator
+        # returns the exact message
+        test_message = "Parity message long enough to span several rows of the cover image"
+        output_file = tempfile.NamedTemporaryFile(suffix='.png', delete=False)
+        output_file.close()
+
+        try:
+            self.engine.parity_bit_encoding(self.test_image.name, test_message, output_file.name,
+                                            payload_format="legacy")
+
+            result = self.engine.parity_bit_extraction(output_file.name, max_bits=48)
+            self.assertEqual(result["message"], test_message[:6])
+
+            result = self.engine.parity_bit_extraction(output_file.name, until_terminator=True)
+            self.assertEqual(result["message"], test_message)
+
+            result = self.engine.parity_bit_extraction(output_file.name, max_bits=64, until_terminator=True)
+            self.assertNotEqual(result["message"], test_message)
+        finally:
+            if os.path.exists(output_file.name):
+                os.unlink(output_file.name)
+
+    def test_framed_payloads(self):
+        # Framed payloads round-trip text and binary data containing the legacy
+        # terminator, flag corruption, and legacy payloads are still decoded
+        text = "Framed message with a #### inside"
+        data = bytes(range(256)) + b"####" + bytes(40)
+        output = tempfile.NamedTemporaryFile(suffix='.png', delete=False).name
+
+        try:
+            methods = (
+                (self.engine.lsb_encoding, self.engine.lsb_extraction, {}),
+                (self.engine.parity_bit_encoding, self.engine.parity_bit_extraction, {"until_terminator": True})
+            )
+            for encode, extract, legacy_options in methods:
+                self.assertTrue(encode(self.test_image.name, text, output)["success"])
+                result = extract(output)
+                self.assertEqual(result["message"], text)
+                self.assertEqual(result["format"], "framed")
+                self.assertEqual(result["length"], len(text.encode()))
+
+                self.assertTrue(encode(self.test_image.name, data, output)["success"])
+                result = extract(output)
+                self.assertTrue(result["binary"])
+                self.assertEqual(base64.b64decode(result["data"]), data)
+
+                self.assertTrue(encode(self.test_image.name, "Old style", output, payload_format="legacy")["success"])
+                result = extract(output, **legacy_options)
+                self.assertEqual(result["message"], "Old style")
+                self.assertEqual(result["format"], "legacy")
+
+                self.assertFalse(encode(self.test_image.name, data, output, payload_format="legacy")["success"])
+                self.assertFalse(encode(self.test_image.name, text, output, payload_format="zip")["success"])
+
+            # Flip a payload bit: the header still frames it, the checksum fails
+            self.engine.lsb_encoding(self.test_image.name, text, output)
+            pixels = np.array(Image.open(output))
+            pixels.reshape(-1)[HEADER_SIZE * 8 + 3] ^= 1
+            Image.fromarray(pixels).save(output)
+            result = self.engine.lsb_extraction(output)
+            self.assertTrue(result["corrupted"])
+
+            # The header costs a few bytes more than the terminator
+            framed = self.engine.capacity(self.test_image.name)["capacity_bytes"]
+            legacy = self.engine.capacity(self.test_image.name, payload_format="legacy")["capacity_bytes"]
+            self.assertEqual(legacy - framed, HEADER_SIZE - 4)
+        finally:
+            os.unlink(output)
+
+    def test_streamed_lsb_extraction(self):
+        # A PNG payload is read from the leading rows only: a file cut off
+        # after them still yields the message, and every path agrees
+        rng = np.random.default_rng(5)
+        cover = tempfile.NamedTemporaryFile(suffix='.png', delete=False).name
+        output = tempfile.NamedTemporaryFile(suffix='.png', delete=False).name
+        Image.fromarray(rng.integers(0, 256, size=(400, 300, 3), dtype=np.uint8)).save(cover)
+
+        try:
+            for payload_format in ("framed", "legacy"):
+                self.engine.lsb_encoding(cover, "Near the top", output, payload_format=payload_format)
+                with open(output, 'rb') as f:
+                    data = f.read()
+                expected = self.engine.lsb_extraction(ImageContext(image_path=output))
+                self.assertEqual(expected["message"], "Near the top")
+                self.assertEqual(self.engine.lsb_extraction(output), expected)
+                self.assertEqual(self.engine.lsb_extraction(data[:len(data) // 4]), expected)
+
+            # Other formats and covers without a payload take the full decode
+            bitmap = io.BytesIO()
+            Image.open(output).save(bitmap, "BMP")
+            self.assertEqual(self.engine.lsb_extraction(bitmap.getvalue())["message"], "Near the top")
+            self.assertEqual(self.engine.lsb_extraction(cover),
+                             self.engine.lsb_extraction(ImageContext(image_path=cover)))
+
+            # A clean cover is decided on its first band, and a payload longer
+            # than that band decodes each of its rows once
+            decode = PngRowStream._decode
+            with mock.patch.object(PngRowStream, "_decode", autospec=True, side_effect=decode) as decoded:
+                self.engine.lsb_extraction(cover)
+                self.assertEqual(decoded.call_count, 1)
+                decoded.reset_mock()
+                message = "x" * 2000
+                self.engine.lsb_encoding(cover, message, output)
+                self.assertEqual(self.engine.lsb_extraction(output)["message"], message)
+                rows = [call.args[2] for call in decoded.call_args_list]
+                self.assertEqual(len(rows), 2)
+                self.assertLessEqual(sum(rows) - 1, -(-(2000 + HEADER_SIZE) * 8 // 900))
+        finally:
+            os.unlink(cover)
+            os.unlink(output)
+
+    def test_native_band_layouts(self):
+        # RGB forms are views of the native decode, alpha and 16-bit LSBs are
+        # reported per band, and RGBA covers keep their alpha band
+        rng = np.random.default_rng(11)
+        pixels = rng.integers(0, 256, size=(40, 30, 4), dtype=np.uint8)
+        payload_bits = np.unpackbits(np.frombuffer(frame_payload(b"In the alpha band"), dtype=np.uint8))
+        alpha = pixels[:, :, 3].reshape(-1)
+        alpha[:payload_bits.size] = (alpha[:payload_bits.size] & 0xFE) | payload_bits
+        pixels[:, :, 3] = alpha.reshape(40, 30)
+
+        samples = rng.integers(0, 65536, size=(40, 30)).astype(np.uint16)
+        payload_bits = np.unpackbits(np.frombuffer(frame_payload(b"Sixteen bits"), dtype=np.uint8))
+        flat = samples.reshape(-1)
+        flat[:payload_bits.size] = (flat[:payload_bits.size] & 0xFFFE) | payload_bits
+
+        output = tempfile.NamedTemporaryFile(suffix='.png', delete=False).name
+        try:
+            for mode in ("RGBA", "LA", "L"):
+                encoded = io.BytesIO()
+                Image.fromarray(pixels, "RGBA").convert(mode).save(encoded, "PNG")
+                context = ImageContext(raw_bytes=encoded.getvalue())
+                self.assertTrue(np.shares_memory(context.rgb, context.native))
+                converted = ImageContext(pixels=np.array(Image.open(encoded).convert("RGB")))
+                for method in ("histogram_analysis", "parity_bit_extraction", "sample_pair_analysis"):
+                    self.assertEqual(getattr(self.engine, method)(context), getattr(self.engine, method)(converted))
+
+            encoded = io.BytesIO()
+            Image.fromarray(pixels, "RGBA").save(encoded, "PNG")
+            result = self.engine.lsb_extraction(encoded.getvalue())
+            self.assertEqual(result["bands"]["A"]["message"], "In the alpha band")
+            self.assertTrue(self.engine.bit_plane_analysis(encoded.getvalue())["bands"]["A"]["lsb"]["suspicious"])
+
+            encoded = io.BytesIO()
+            Image.fromarray(samples).save(encoded, "PNG")
+            # Pillow releases before 10 open 16-bit grayscale PNGs as "I"
+            self.assertIn(Image.open(encoded).mode, ("I;16", "I"))
+            result = self.engine.lsb_extraction(encoded.getvalue())
+            self.assertEqual(result["bands"]["I"]["message"], "Sixteen bits")
+            self.assertEqual(self.engine.bit_plane_analysis(encoded.getvalue())["bands"]["I"]["bit_depth"], 16)
+
+            cover = io.BytesIO()
+            Image.fromarray(pixels, "RGBA").save(cover, "PNG")
+            for encode, extract in ((self.engine.lsb_encoding, self.engine.lsb_extraction),
+                                    (self.engine.parity_bit_encoding, self.engine.parity_bit_extraction)):
+                cover.seek(0)
+                self.assertTrue(encode(cover, "Keeps alpha", output)["success"])
+                stego = np.array(Image.open(output))
+                np.testing.assert_array_equal(stego[:, :, 3], pixels[:, :, 3])
+                self.assertEqual(extract(output)["message"], "Keeps alpha")
+        finally:
+            os.unlink(output)
+
     def test_metadata_encoding(self):
         # Test metadata encoding
         test_message = "Hidden in metadata"
@@ -9,6 +9,8 @@ from PIL import Image
 # Add parent directory to path to allow imports
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from storage.storage_service import StorageService
+from engine.pixel_cache import content_key
+from engine.stegnox_engine import StegnoxEngine
 
 class TestStorageService(unittest.TestCase):
     def setUp(self):
@@ -45,6 +47,27 @@ class TestStorageService(unittest.TestCase):
         self.assertIsNotNone(image_path)
         self.assertTrue(os.path.exists(image_path))
 
+    def test_pixel_cache_is_opt_in(self):
+        # The pixel cache is off by default, and saving an image never decodes it
+        self.assertIsNone(self.storage.pixel_cache)
+        self.assertIsNone(self.storage.cache_pixels(self.test_image.name))
+        self.assertIsNotNone(self.storage.result_cache)
+
+        storage = StorageService(storage_dir=os.path.join(self.test_dir, "cached"), pixel_cache_size=2 ** 20)
+        image_path = storage.save_image(self.test_image.name, "test_cached.png")
+        with open(image_path, 'rb') as f:
+            key = content_key(f.read())
+        self.assertIsNone(storage.pixel_cache.get(key))
+
+        # The engine fills it on the first analysis
+        StegnoxEngine(pixel_cache=storage.pixel_cache).extract_all_methods(image_path)
+        entry = storage.pixel_cache.get(key)
+        self.assertIsNotNone(entry)
+        pixels, header = entry
+        self.assertEqual(pixels.shape, (100, 100, 3))
+        self.assertEqual(header["size"], (100, 100))
+        self.assertEqual(storage.cache_pixels(image_path), key)
+
     def test_save_image_auto_filename(self):
         # Test auto-generated filename
         image_path = self.storage.save_image(self.test_image.name)